@@ -1,27 +1,63 @@
 # reaction_video_maker_pro_v2.py
 
+import time
+_MODULE_START = time.perf_counter()
+
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, colorchooser
 import ttkbootstrap as ttkb
 from ttkbootstrap.constants import *
 from ttkbootstrap.tooltip import ToolTip
 from PIL import Image, ImageTk, ImageDraw
-import cv2
 import numpy as np
-import moviepy.editor as mp
-from moviepy.audio.fx.all import audio_loop
+import importlib
+import argparse
+import statistics
 import threading
 import queue
 import subprocess
 import sys
 import json
 import logging
+import os
+import hashlib
+import shutil
+import tempfile
+import copy
+import dataclasses
+import typing
 from pathlib import Path
 from dataclasses import dataclass, asdict, field
 import math
-import time
+import collections
+import traceback
+import cProfile
+import pstats
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import itertools
+import socket
+import ipaddress
+import hmac
 from typing import Tuple, Optional, Dict, Any, List
 
+# --- Lazy Import Modul Berat ---
+class _LazyModule:
+    # MoviePy (imageio, dll.) dan OpenCV baru di-import saat atribut pertama kali diakses
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+cv2 = _LazyModule("cv2")
+
 # --- Konfigurasi Logging ---
 log_format = '%(asctime)s - %(levelname)s - [%(threadName)s] - %(message)s'
 logging.basicConfig(level=logging.INFO, format=log_format)
@@ -39,10 +75,24 @@ STRINGS = {
         "status_render_error": "Error! Failed to render video.",
         "status_render_cancelled": "Render cancelled by user.",
         "status_batch_done": "Batch rendering complete! {count} videos processed.",
+        "confirm_resume_batch": "A previous batch journal was found in this folder.\n{done} of {total} videos are already finished.\n\nResume and skip the finished videos?",
         "tooltip_pip_scale": "Scale the reaction video size (percentage of the shorter output dimension).",
         "tooltip_crf": "Angka lebih kecil = kualitas lebih tinggi (file lebih besar). 18–23 adalah sweet spot. 0 = lossless.",
         "tooltip_fps": "Auto mengambil FPS dari video sumber. 24/30 untuk umum, 60 untuk gerakan cepat, 120 untuk khusus.",
         "tooltip_preset": "Preset lebih lambat = kompresi lebih baik (file lebih kecil, encode lebih lama). 'fast' adalah pilihan seimbang.",
+        "tooltip_audio_passthrough": "Jika hanya satu track audio yang dipakai tanpa mixing, paket audio sumber disalin langsung (-c:a copy) tanpa encode ulang.",
+        "tooltip_multi_output": "Preset yang dicentang dirender bersamaan dengan preset aktif. Video hanya di-decode sekali; tiap preset memakai layout PiP-nya sendiri dan disimpan sebagai <nama>_<preset>.mp4.",
+        "tooltip_in_point": "Set the render start at the playhead (I).",
+        "tooltip_out_point": "Set the render end at the playhead (O). Only the marked range is decoded and rendered.",
+        "tooltip_clear_markers": "Clear the in/out markers and render the full video (X).",
+        "tooltip_reaction_offset": "Reaction time = base time + offset, in preview and render. Positive skips into the reaction video; negative means the reaction starts that many seconds after the base, so the render starts there too.",
+        "tooltip_auto_sync": "Detect the offset from the audio: onset envelopes of both tracks (from the cached waveform peaks) are cross-correlated with an FFT. The result is applied only when the match is clear.",
+        "tooltip_waveform": "Audio peaks of the base (top) and reaction (bottom) track. Click or drag to seek, mouse wheel to zoom at the cursor, Shift+wheel to pan.",
+        "tooltip_filmstrip": "Keyframe thumbnails of the base video, following the waveform zoom. While dragging the slider the preview shows these thumbnails; the exact frame is decoded on release.",
+        "tooltip_profile_render": "Profile the frame window below on every following render (cProfile + stack sampling). Reports are saved next to the output as .pstats, .collapsed (flamegraph) and .txt.",
+        "tooltip_mp4_layout": "Standard: moov index at the end. Faststart: index moved to the front after encoding, so playback and seeking start before the whole file is downloaded. Fragmented: the file is playable and uploadable while it is still being encoded (the in-progress file is <name>.part.mp4).",
+        "tooltip_draft_mode": "Render a quick review copy: half resolution, at most 15 fps, ultrafast encode, no stroke, audio stream-copied when possible. Framing matches the final render.",
+        "tooltip_frame_cache": "Keep downscaled preview frames in a memory-mapped file per source (up to {budget} MB, least recently used frames are dropped). Scrubbing back to a frame you've seen skips decoding, also after reopening the project.",
         "confirm_cancel_render": "Are you sure you want to cancel the current rendering job?",
         "ffmpeg_not_found_title": "FFmpeg Not Found",
         "ffmpeg_not_found_msg": "This application requires FFmpeg to render videos. Please install FFmpeg and ensure its location is in your system's PATH.\n\nDownload from: https://ffmpeg.org/download.html"
@@ -66,6 +116,11 @@ class TimelineState:
     duration_sec: float = 0.0
     is_playing: bool = False
     is_scrubbing: bool = False
+    # Rentang render (detik pada video base); out_point_sec None = sampai akhir video
+    in_point_sec: float = 0.0
+    out_point_sec: Optional[float] = None
+    # Waktu reaction = waktu base + offset; negatif = reaction baru mulai setelah base (render dimulai dari titik itu)
+    reaction_offset_sec: float = 0.0
 
 @dataclass
 class ProjectState:
@@ -77,6 +132,11 @@ class ProjectState:
     safe_area: SafeAreaState = field(default_factory=SafeAreaState)
     processing_mode: str = "Single"
     output_dir: str = ""
+    # Layout PiP terakhir per preset: {preset: {"output_resolution": ..., "pip_layout": {...}}}
+    preset_layouts: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    # Cache frame preview di disk (memmap), dibagi rata untuk Video 1 & Video 2
+    frame_cache_enabled: bool = True
+    frame_cache_budget_mb: int = 4096
 
 @dataclass
 class PipShadowState:
@@ -124,6 +184,2129 @@ class ExportState:
     audio_codec: str = "aac"
     audio_bitrate: str = "192k"
     video_codec: str = "libx264"
+    audio_passthrough: bool = True
+    # Preset tambahan yang dirender bersamaan dari satu decode
+    multi_output_presets: List[str] = field(default_factory=list)
+    # Profil draft untuk review: resolusi & FPS dikurangi, encode ultrafast, tanpa stroke
+    draft_mode: bool = False
+    draft_scale_percent: int = 50
+    draft_max_fps: int = 15
+    # Tata letak MP4: "Standard" (moov di akhir), "Faststart" (moov dipindah ke depan) atau "Fragmented" (bisa dibaca selama encode)
+    mp4_layout: str = "Standard"
+
+def _cache_dir() -> Path:
+    if sys.platform == "win32": base = os.environ.get("LOCALAPPDATA") or str(Path.home() / "AppData" / "Local")
+    else: base = os.environ.get("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+    path = Path(base) / "reaction_video_maker"
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+# --- Probe Kapabilitas Encoder ---
+AUTO_CODEC = "Auto (fastest working)"
+ENCODER_CANDIDATES = ["libx264", "libx265", "libsvtav1", "h264_nvenc", "hevc_nvenc", "h264_qsv", "hevc_qsv", "h264_vaapi", "hevc_vaapi"]
+VAAPI_DEVICE = "/dev/dri/renderD128"
+
+# Nama preset x264 dipetakan ke skala masing-masing encoder
+NVENC_PRESETS = {"ultrafast": "p1", "superfast": "p1", "veryfast": "p2", "faster": "p3", "fast": "p4", "medium": "p5", "slow": "p6", "slower": "p7", "veryslow": "p7"}
+QSV_PRESETS = {"ultrafast": "veryfast", "superfast": "veryfast"}
+SVTAV1_PRESETS = {"ultrafast": "12", "superfast": "11", "veryfast": "10", "faster": "9", "fast": "8", "medium": "6", "slow": "4", "slower": "3", "veryslow": "2"}
+
+def encoder_input_args(codec: str) -> List[str]:
+    if "vaapi" in codec: return ["-vaapi_device", VAAPI_DEVICE]
+    return []
+
+def encoder_output_args(codec: str, crf: int, preset: str) -> List[str]:
+    if "nvenc" in codec:
+        # NVENC menggunakan -cq atau -qp untuk VBR, bukan -crf
+        return ["-rc", "vbr", "-cq", str(crf), "-preset", NVENC_PRESETS.get(preset, "p4"), "-pix_fmt", "yuv420p"]
+    if "qsv" in codec:
+        return ["-global_quality", str(max(crf, 1)), "-preset", QSV_PRESETS.get(preset, preset), "-pix_fmt", "nv12"]
+    if "vaapi" in codec:
+        return ["-vf", "format=nv12,hwupload", "-qp", str(max(crf, 1))]
+    if codec == "libsvtav1":
+        # Skala CRF AV1 (0-63) lebih lebar dari x264 (0-51)
+        return ["-crf", str(min(63, int(crf * 1.4))), "-preset", SVTAV1_PRESETS.get(preset, "8"), "-pix_fmt", "yuv420p"]
+    # CPU codecs (libx264, libx265)
+    return ["-crf", str(crf), "-preset", preset, "-pix_fmt", "yuv420p"]
+
+def resolve_codec(requested: str, available: Optional[Dict[str, float]]) -> str:
+    # available = {encoder: fps terukur}; None berarti probe belum/tidak bisa dijalankan
+    if requested == AUTO_CODEC:
+        if not available: return "libx264"
+        return max(available, key=available.get)
+    if available is None or requested in available:
+        return requested
+    return "libx264"
+
+class EncoderProbe:
+    # Test-encode beberapa frame sintetis per encoder; hasil di-cache per binary FFmpeg
+    CACHE_FILE = "encoders.json"
+    CACHE_TTL_SEC = 7 * 24 * 3600
+    PROBE_FRAMES = 60
+    PROBE_SIZE = "640x360"
+
+    def __init__(self, ffmpeg_path: Optional[str]):
+        self.ffmpeg_path = ffmpeg_path
+        self.cache_path = _cache_dir() / self.CACHE_FILE
+
+    def _fingerprint(self) -> str:
+        st = os.stat(self.ffmpeg_path)
+        return f"{self.ffmpeg_path}|{st.st_size}|{int(st.st_mtime)}"
+
+    def load_or_probe(self, force: bool = False) -> Dict[str, float]:
+        if not self.ffmpeg_path: return {}
+        fingerprint = self._fingerprint()
+        if not force and self.cache_path.exists():
+            try:
+                with open(self.cache_path, 'r', encoding='utf-8') as f: cached = json.load(f)
+                if cached.get("ffmpeg") == fingerprint and time.time() - cached.get("time", 0) < self.CACHE_TTL_SEC:
+                    return cached["encoders"]
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Cache encoder tidak valid, probe ulang: {e}")
+
+        listed = self._listed_encoders()
+        results = {}
+        for encoder in ENCODER_CANDIDATES:
+            if encoder not in listed: continue
+            fps = self._benchmark(encoder)
+            if fps: results[encoder] = round(fps, 1)
+        logger.info(f"Encoder yang berfungsi: {results}")
+        try:
+            with open(self.cache_path, 'w', encoding='utf-8') as f:
+                json.dump({"ffmpeg": fingerprint, "time": time.time(), "encoders": results}, f, indent=4)
+        except OSError as e:
+            logger.warning(f"Gagal menyimpan cache encoder: {e}")
+        return results
+
+    def _listed_encoders(self) -> set:
+        try:
+            result = subprocess.run([self.ffmpeg_path, "-hide_banner", "-encoders"], capture_output=True, text=True, encoding='utf-8', timeout=15)
+        except (OSError, subprocess.SubprocessError) as e:
+            logger.error(f"Gagal membaca daftar encoder FFmpeg: {e}")
+            return set()
+        return {parts[1] for parts in (line.split() for line in result.stdout.splitlines()) if len(parts) > 1}
+
+    def _benchmark(self, encoder: str) -> Optional[float]:
+        cmd = [self.ffmpeg_path, "-hide_banner", "-loglevel", "error", "-nostdin"] + encoder_input_args(encoder)
+        cmd += ["-f", "lavfi", "-i", f"testsrc2=size={self.PROBE_SIZE}:rate=30", "-frames:v", str(self.PROBE_FRAMES), "-c:v", encoder]
+        cmd += encoder_output_args(encoder, 23, "fast") + ["-f", "null", "-"]
+        start = time.perf_counter()
+        try:
+            result = subprocess.run(cmd, capture_output=True, text=True, encoding='utf-8', timeout=60)
+        except (OSError, subprocess.SubprocessError) as e:
+            logger.warning(f"Probe {encoder} gagal: {e}")
+            return None
+        elapsed = time.perf_counter() - start
+        if result.returncode != 0:
+            logger.info(f"Encoder {encoder} terdaftar tapi tidak bisa dibuka: {result.stderr.strip()[:200]}")
+            return None
+        return self.PROBE_FRAMES / elapsed if elapsed > 0 else None
+
+# --- Utilitas FFmpeg/FFprobe ---
+def find_ffprobe(ffmpeg_path: Optional[str]) -> Optional[str]:
+    if ffmpeg_path:
+        sibling = Path(ffmpeg_path).with_name("ffprobe.exe" if sys.platform == "win32" else "ffprobe")
+        if sibling.exists(): return str(sibling)
+    return shutil.which("ffprobe")
+
+def run_ffmpeg(cmd: List[str]):
+    result = subprocess.run(cmd, capture_output=True, text=True, encoding='utf-8', errors='replace')
+    if result.returncode != 0:
+        raise RuntimeError(f"FFmpeg gagal (exit {result.returncode}): {result.stderr.strip()[-500:]}")
+
+def source_fingerprint(path: str) -> Dict[str, int]:
+    # Ukuran + mtime: sama dengan kunci _media_cache_path, jadi sidik jari sama = semua cache analisis masih berlaku
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+def _media_cache_path(source_path: str, kind: str, ext: str) -> Path:
+    # Cache per file sumber; kunci berubah jika ukuran/mtime file berubah
+    st = os.stat(source_path)
+    key = hashlib.sha1(f"{Path(source_path).resolve()}|{st.st_size}|{st.st_mtime_ns}".encode('utf-8')).hexdigest()[:24]
+    folder = _cache_dir() / kind
+    folder.mkdir(exist_ok=True)
+    return folder / f"{key}.{ext}"
+
+def probe_media(path: str, ffprobe_path: Optional[str]) -> Dict[str, Any]:
+    cache_path = _media_cache_path(path, "probe", "json")
+    if cache_path.exists():
+        with open(cache_path, 'r', encoding='utf-8') as f: return json.load(f)
+    if not ffprobe_path: raise RuntimeError("FFprobe tidak ditemukan.")
+    result = subprocess.run([ffprobe_path, "-v", "error", "-print_format", "json", "-show_format", "-show_streams", path], capture_output=True, text=True, encoding='utf-8', errors='replace')
+    if result.returncode != 0:
+        raise RuntimeError(f"FFprobe gagal membaca {Path(path).name}: {result.stderr.strip()[-300:]}")
+    data = json.loads(result.stdout)
+    video = next((st for st in data.get("streams", []) if st.get("codec_type") == "video"), {})
+    audio = next((st for st in data.get("streams", []) if st.get("codec_type") == "audio"), {})
+    info = {
+        "duration": float(data.get("format", {}).get("duration") or video.get("duration") or 0.0),
+        "video_codec": video.get("codec_name"), "width": video.get("width", 0), "height": video.get("height", 0),
+        "avg_frame_rate": video.get("avg_frame_rate"), "r_frame_rate": video.get("r_frame_rate"),
+        "audio_codec": audio.get("codec_name"), "audio_channels": audio.get("channels"), "audio_sample_rate": audio.get("sample_rate"),
+        "rotation": _stream_rotation(video),
+    }
+    with open(cache_path, 'w', encoding='utf-8') as f: json.dump(info, f, indent=4)
+    return info
+
+def _stream_rotation(stream: Dict[str, Any]) -> int:
+    # Video HP menyimpan rotasi di tag lama "rotate" atau di display matrix
+    rotation = stream.get("tags", {}).get("rotate")
+    for side_data in stream.get("side_data_list", []):
+        if "rotation" in side_data: rotation = side_data["rotation"]
+    try:
+        return int(float(rotation or 0)) % 360
+    except ValueError:
+        return 0
+
+def _parse_rate(rate: Optional[str]) -> float:
+    try:
+        num, _, den = (rate or "0/1").partition("/")
+        return float(num) / float(den or 1)
+    except (ValueError, ZeroDivisionError):
+        return 0.0
+
+def media_fps(info: Dict[str, Any]) -> float:
+    # avg_frame_rate lebih tepat untuk rekaman VFR; r_frame_rate sebagai cadangan
+    fps = _parse_rate(info.get("avg_frame_rate"))
+    if not 0 < fps <= 240: fps = _parse_rate(info.get("r_frame_rate"))
+    if not 0 < fps <= 240: raise RuntimeError("FPS video sumber tidak dapat dibaca.")
+    return fps
+
+def media_frame_size(info: Dict[str, Any]) -> Tuple[int, int]:
+    # FFmpeg memutar frame otomatis saat decode, jadi ukuran ikut ditukar untuk rotasi 90/270
+    w, h = int(info.get("width") or 0), int(info.get("height") or 0)
+    if not w or not h: raise RuntimeError("Ukuran video sumber tidak dapat dibaca.")
+    return (h, w) if info.get("rotation", 0) % 180 == 90 else (w, h)
+
+# --- Indeks Keyframe (Seek Akurat untuk Preview) ---
+class KeyframeIndex:
+    # Timestamp tampil semua frame video (detik dari awal file, urut tampil) + nomor frame keyframe.
+    # Dipakai untuk memetakan waktu <-> frame pada sumber VFR dan untuk seek ke keyframe terdekat.
+    SEEK_EPSILON = 0.001
+
+    def __init__(self, pts: np.ndarray, keyframes: np.ndarray):
+        self.pts = pts
+        self.keyframes = keyframes if len(keyframes) and keyframes[0] == 0 else np.concatenate(([0], keyframes)).astype(np.int64)
+
+    @property
+    def frame_count(self) -> int:
+        return len(self.pts)
+
+    @property
+    def duration(self) -> float:
+        if len(self.pts) < 2: return 0.0
+        return float(self.pts[-1] + (self.pts[-1] - self.pts[0]) / (len(self.pts) - 1))
+
+    @property
+    def fps(self) -> float:
+        # FPS rata-rata; hanya untuk tampilan dan langkah seek, bukan untuk pemetaan frame
+        return (len(self.pts) / self.duration) if self.duration > 0 else 30.0
+
+    def time_of(self, frame: int) -> float:
+        if not len(self.pts): return 0.0
+        return float(self.pts[min(max(int(frame), 0), len(self.pts) - 1)])
+
+    def frame_at(self, t: float) -> int:
+        # Frame yang sedang tampil pada waktu t
+        if not len(self.pts): return 0
+        return min(max(int(np.searchsorted(self.pts, t + 1e-6, side="right")) - 1, 0), len(self.pts) - 1)
+
+    def keyframe_before(self, frame: int) -> int:
+        i = int(np.searchsorted(self.keyframes, frame, side="right")) - 1
+        return int(self.keyframes[max(i, 0)])
+
+    def seek_time(self, frame: int) -> float:
+        # Nilai -ss (relatif terhadap awal file) yang mendarat tepat di frame tersebut
+        return max(0.0, self.time_of(frame) - self.SEEK_EPSILON)
+
+def load_keyframe_index(path: str, ffprobe_path: Optional[str]) -> KeyframeIndex:
+    # Dibangun sekali per sumber dari data paket (tanpa decode), lalu di-cache di disk
+    cache_path = _media_cache_path(path, "keyframes", "npz")
+    if cache_path.exists():
+        try:
+            with np.load(cache_path) as data: return KeyframeIndex(data["pts"], data["keyframes"])
+        except (OSError, ValueError, KeyError):
+            logger.warning(f"Cache indeks keyframe rusak, dibangun ulang: {cache_path}")
+    if not ffprobe_path: raise RuntimeError("FFprobe tidak ditemukan.")
+    result = subprocess.run([ffprobe_path, "-v", "error", "-select_streams", "v:0", "-show_entries", "packet=pts_time,dts_time,flags:format=start_time",
+                             "-print_format", "json", path], capture_output=True, text=True, encoding='utf-8', errors='replace')
+    if result.returncode != 0:
+        raise RuntimeError(f"FFprobe gagal membaca paket {Path(path).name}: {result.stderr.strip()[-300:]}")
+    data = json.loads(result.stdout)
+    pts, is_key = [], []
+    for packet in data.get("packets", []):
+        flags = packet.get("flags", "")
+        if "D" in flags: continue # Paket yang dibuang edit list tidak pernah tampil
+        stamp = packet.get("pts_time", "N/A")
+        if stamp == "N/A": stamp = packet.get("dts_time", "N/A")
+        if stamp == "N/A": continue
+        pts.append(float(stamp))
+        is_key.append("K" in flags)
+    if not pts: raise RuntimeError(f"Tidak ada frame video di {Path(path).name}.")
+    pts_arr = np.array(pts, dtype=np.float64)
+    order = np.argsort(pts_arr, kind="stable")
+    # -ss dihitung dari start_time container, jadi timestamp disimpan relatif terhadapnya
+    start = float(data.get("format", {}).get("start_time") or 0.0)
+    index = KeyframeIndex(pts_arr[order] - start, np.nonzero(np.array(is_key)[order])[0].astype(np.int64))
+    tmp_path = cache_path.with_suffix(".tmp")
+    with open(tmp_path, 'wb') as f: np.savez(f, pts=index.pts, keyframes=index.keyframes)
+    os.replace(tmp_path, cache_path)
+    return index
+
+# --- Cache Frame Preview (numpy.memmap di Disk) ---
+class FrameCache:
+    # Frame sumber yang sudah diperkecil, disimpan per slot di satu file memmap per sumber.
+    # Indeks frame -> slot disimpan di file JSON terpisah dengan urutan LRU (lama -> baru).
+    MAX_DIM = 640
+    FLUSH_EVERY = 200
+
+    def __init__(self, source_path: str, source_size: Tuple[int, int], budget_bytes: int):
+        self.source_size = source_size
+        src_w, src_h = source_size
+        scale = min(1.0, self.MAX_DIM / max(src_w, src_h, 1))
+        self.size = (max(2, int(src_w * scale) // 2 * 2), max(2, int(src_h * scale) // 2 * 2))
+        w, h = self.size
+        self.capacity = max(1, budget_bytes // (w * h * 3))
+        self.data_path = _media_cache_path(source_path, "frames", f"{w}x{h}.raw")
+        self.index_path = self.data_path.with_suffix(".json")
+        self._slots: "collections.OrderedDict[int, int]" = collections.OrderedDict()
+        expected_bytes = self.capacity * w * h * 3
+        reuse = self.data_path.exists() and self.data_path.stat().st_size == expected_bytes and self._load_index()
+        if not reuse:
+            self._slots.clear()
+            self.index_path.unlink(missing_ok=True)
+        # File dibuat sparse; ruang disk baru terpakai saat slot benar-benar ditulis
+        self.frames = np.memmap(self.data_path, dtype=np.uint8, mode="r+" if reuse else "w+", shape=(self.capacity, h, w, 3))
+        used = set(self._slots.values())
+        self._free = [slot for slot in range(self.capacity - 1, -1, -1) if slot not in used]
+        self._pending_writes = 0
+
+    def _load_index(self) -> bool:
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f: data = json.load(f)
+            if tuple(data["size"]) != self.size or data["capacity"] != self.capacity: return False
+            self._slots.update((int(frame), int(slot)) for frame, slot in data["slots"])
+            return True
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+
+    def get(self, frame_index: int) -> Optional[np.ndarray]:
+        # Salinan, bukan view memmap: slot bisa dipakai ulang (eviction) selagi frame masih ditampilkan
+        slot = self._slots.get(frame_index)
+        if slot is None: return None
+        self._slots.move_to_end(frame_index)
+        return self.frames[slot].copy()
+
+    def put(self, frame_index: int, frame: np.ndarray) -> np.ndarray:
+        # frame harus sudah berukuran self.size; slot tertua dipakai ulang jika cache penuh
+        if frame_index in self._slots: return self.get(frame_index)
+        slot = self._free.pop() if self._free else self._slots.popitem(last=False)[1]
+        self.frames[slot] = frame
+        self._slots[frame_index] = slot
+        self._pending_writes += 1
+        if self._pending_writes >= self.FLUSH_EVERY: self.flush()
+        return self.frames[slot].copy()
+
+    def flush(self):
+        # Data ditulis dulu, baru indeks, agar indeks tidak pernah menunjuk slot yang belum tersimpan
+        if not self._pending_writes: return
+        self.frames.flush()
+        tmp_path = self.index_path.with_suffix(".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"size": list(self.size), "capacity": self.capacity, "slots": list(self._slots.items())}, f)
+        os.replace(tmp_path, self.index_path)
+        self._pending_writes = 0
+
+    def close(self):
+        # Mapping dilepas oleh GC setelah view terakhir (mis. frame preview) tidak dipakai lagi
+        self.flush()
+        self.frames = None
+
+def prune_frame_cache(budget_bytes: int, keep: Tuple[Path, ...] = ()):
+    # Hapus cache frame yang paling lama tidak dipakai sampai total ukuran di bawah budget
+    folder = _cache_dir() / "frames"
+    if not folder.exists(): return
+    entries = []
+    for data_path in folder.glob("*.raw"):
+        st = data_path.stat()
+        index_path = data_path.with_suffix(".json")
+        last_used = index_path.stat().st_mtime if index_path.exists() else st.st_mtime
+        entries.append((last_used, st.st_size, data_path))
+    total = sum(size for _t, size, _p in entries)
+    for _t, size, data_path in sorted(entries):
+        if total <= budget_bytes: break
+        if data_path in keep: continue
+        data_path.unlink(missing_ok=True)
+        data_path.with_suffix(".json").unlink(missing_ok=True)
+        total -= size
+
+# --- Waveform Timeline (Peak Audio di Cache) ---
+WAVEFORM_SAMPLE_RATE = 8000
+WAVEFORM_PEAKS_PER_SEC = 100 # Bucket 10 ms = resolusi zoom terdalam
+WAVEFORM_READ_BYTES = 1 << 20
+WAVEFORM_MIN_SPAN_SEC = 0.5
+
+class WaveformPeaks:
+    # Min/max amplitudo mono (int16) per bucket; zoom apa pun digabung ulang dari sini tanpa decode lagi
+    def __init__(self, mins: np.ndarray, maxs: np.ndarray, rate: int = WAVEFORM_PEAKS_PER_SEC):
+        self.mins, self.maxs, self.rate = mins, maxs, rate
+
+    @property
+    def duration(self) -> float:
+        return len(self.mins) / self.rate
+
+    def column_peaks(self, edges: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        # Min/max (-1..1) per kolom layar; kolom i = waktu edges[i]..edges[i+1], di luar durasi = hening
+        columns = max(len(edges) - 1, 0)
+        if not len(self.mins) or not columns: return np.zeros(columns, np.float32), np.zeros(columns, np.float32)
+        idx = np.floor(np.asarray(edges, dtype=np.float64) * self.rate).astype(np.int64)
+        valid = (idx[:-1] >= 0) & (idx[:-1] < len(self.mins))
+        # reduceat: indeks sama berurutan (zoom lebih dalam dari bucket) mengambil satu bucket saja
+        safe = np.clip(idx, 0, len(self.mins) - 1)
+        lo = np.minimum.reduceat(self.mins, safe)[:-1].astype(np.float32) / 32768.0
+        hi = np.maximum.reduceat(self.maxs, safe)[:-1].astype(np.float32) / 32768.0
+        return np.where(valid, lo, 0.0), np.where(valid, hi, 0.0)
+
+def load_waveform_peaks(path: str, ffmpeg_path: Optional[str]) -> WaveformPeaks:
+    # Audio di-stream sekali dari FFmpeg (mono, sample rate rendah), min/max per bucket dihitung per blok dengan numpy
+    cache_path = _media_cache_path(path, "waveform", "npz")
+    if cache_path.exists():
+        try:
+            with np.load(cache_path) as data: return WaveformPeaks(data["mins"], data["maxs"], int(data["rate"]))
+        except (OSError, ValueError, KeyError):
+            logger.warning(f"Cache waveform rusak, dibangun ulang: {cache_path}")
+    if not ffmpeg_path: raise RuntimeError("FFmpeg tidak ditemukan.")
+    bucket = WAVEFORM_SAMPLE_RATE // WAVEFORM_PEAKS_PER_SEC
+    cmd = [ffmpeg_path, "-v", "error", "-nostdin", "-i", path, "-map", "0:a:0", "-vn", "-ac", "1", "-ar", str(WAVEFORM_SAMPLE_RATE), "-f", "s16le", "-"]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    mins, maxs, carry = [], [], b""
+    # stderr dibaca thread terpisah agar pipe tidak penuh saat file bermasalah
+    stderr_chunks: List[bytes] = []
+    stderr_thread = threading.Thread(target=lambda: stderr_chunks.append(proc.stderr.read()), daemon=True)
+    stderr_thread.start()
+    try:
+        while True:
+            data = proc.stdout.read(WAVEFORM_READ_BYTES)
+            if not data: break
+            data = carry + data
+            usable = len(data) // (bucket * 2) * bucket * 2
+            carry = data[usable:]
+            if not usable: continue
+            samples = np.frombuffer(data, dtype=np.int16, count=usable // 2).reshape(-1, bucket)
+            mins.append(samples.min(axis=1))
+            maxs.append(samples.max(axis=1))
+        if len(carry) >= 2:
+            tail = np.frombuffer(carry, dtype=np.int16, count=len(carry) // 2)
+            mins.append(tail.min(keepdims=True))
+            maxs.append(tail.max(keepdims=True))
+    finally:
+        proc.stdout.close()
+        returncode = proc.wait()
+        stderr_thread.join()
+    if returncode != 0:
+        message = b"".join(stderr_chunks).decode('utf-8', errors='replace').strip()[-300:]
+        raise RuntimeError(f"FFmpeg gagal membaca audio {Path(path).name}: {message}")
+    peaks = WaveformPeaks(np.concatenate(mins) if mins else np.zeros(0, np.int16), np.concatenate(maxs) if maxs else np.zeros(0, np.int16))
+    tmp_path = cache_path.with_suffix(".tmp")
+    with open(tmp_path, 'wb') as f: np.savez(f, mins=peaks.mins, maxs=peaks.maxs, rate=peaks.rate)
+    os.replace(tmp_path, cache_path)
+    return peaks
+
+# --- Sinkronisasi Audio Otomatis (Korelasi Onset via FFT) ---
+SYNC_MIN_OVERLAP = 0.25 # Lag dengan tumpang tindih < 25% track terpendek diabaikan (puncak palsu di tepi)
+SYNC_MIN_CONFIDENCE = 8.0
+
+def onset_envelope(peaks: WaveformPeaks) -> np.ndarray:
+    # Kenaikan amplitudo per bucket peak = onset ucapan/ketukan. Amplitudo linear (bukan log) agar noise
+    # mikrofon reaction tidak menggeser titik onset; beda volume antar rekaman hilang di normalisasi.
+    amp = peaks.maxs.astype(np.float32) - peaks.mins.astype(np.float32)
+    onset = np.maximum(np.diff(amp, prepend=amp[:1]), 0.0)
+    onset = np.convolve(onset, np.array([0.25, 0.5, 0.25], dtype=np.float32), mode="same") # Toleransi jitter satu bucket
+    onset -= onset.mean()
+    return onset / (onset.std() + 1e-9)
+
+def estimate_sync_offset(base: WaveformPeaks, reaction: WaveformPeaks) -> Tuple[float, float]:
+    # (offset, keyakinan): waktu reaction = waktu base + offset. Keyakinan = tinggi puncak korelasi dalam simpangan baku.
+    if base.rate != reaction.rate: raise ValueError("Resolusi peak audio kedua sumber berbeda.")
+    b, r = onset_envelope(base), onset_envelope(reaction)
+    if min(len(b), len(r)) < base.rate: raise RuntimeError("Audio terlalu pendek untuk sinkronisasi (< 1 detik).")
+    n = 1 << int(math.ceil(math.log2(len(b) + len(r))))
+    corr = np.fft.irfft(np.fft.rfft(r, n) * np.conj(np.fft.rfft(b, n)), n)
+    # corr[L] = sum r[t + L] * b[t]; lag negatif ada di ujung array
+    lags = np.concatenate((np.arange(len(r)), np.arange(1 - len(b), 0)))
+    values = np.concatenate((corr[:len(r)], corr[n - len(b) + 1:]))
+    overlap = np.minimum(len(r) - lags, len(b)) - np.maximum(-lags, 0)
+    valid = overlap >= SYNC_MIN_OVERLAP * min(len(b), len(r))
+    lags, values = lags[valid], values[valid]
+    order = np.argsort(lags)
+    lags, values = lags[order], values[order]
+    best = int(np.argmax(values))
+    confidence = float((values[best] - np.median(values)) / (values.std() + 1e-9))
+    shift = 0.0
+    if 0 < best < len(values) - 1:
+        # Interpolasi parabola: offset lebih halus dari satu bucket
+        y0, y1, y2 = values[best - 1], values[best], values[best + 1]
+        denom = y0 - 2 * y1 + y2
+        if denom < 0: shift = float(0.5 * (y0 - y2) / denom)
+    return (lags[best] + shift) / base.rate, confidence
+
+# --- Filmstrip Thumbnail (Sprite Sheet Keyframe) ---
+THUMB_HEIGHT = 90
+THUMB_INTERVAL_SEC = 2.0
+THUMB_MAX_COUNT = 600 # Sumber panjang: jarak thumbnail diperlebar, bukan jumlahnya
+THUMB_SHEET_COLUMNS = 20
+
+class ThumbnailStrip:
+    # Thumbnail BGR kecil tiap `interval` detik (isi = keyframe terakhir pada waktu itu), disimpan di disk sebagai satu sprite sheet JPEG
+    def __init__(self, tiles: np.ndarray, interval: float):
+        self.tiles, self.interval = tiles, interval
+
+    @property
+    def tile_size(self) -> Tuple[int, int]:
+        return self.tiles.shape[2], self.tiles.shape[1]
+
+    def index_at(self, t: float) -> int:
+        return min(max(int(t / self.interval + 1e-6), 0), len(self.tiles) - 1)
+
+    def thumbnail_at(self, t: float) -> np.ndarray:
+        return self.tiles[self.index_at(t)]
+
+    def to_sheet(self) -> np.ndarray:
+        count, th, tw = self.tiles.shape[:3]
+        rows = -(-count // THUMB_SHEET_COLUMNS)
+        grid = np.zeros((rows * THUMB_SHEET_COLUMNS, th, tw, 3), dtype=np.uint8)
+        grid[:count] = self.tiles
+        return grid.reshape(rows, THUMB_SHEET_COLUMNS, th, tw, 3).transpose(0, 2, 1, 3, 4).reshape(rows * th, THUMB_SHEET_COLUMNS * tw, 3)
+
+    @classmethod
+    def from_sheet(cls, sheet: np.ndarray, count: int, tile_size: Tuple[int, int], interval: float) -> "ThumbnailStrip":
+        tw, th = tile_size
+        rows = sheet.shape[0] // th
+        tiles = sheet.reshape(rows, th, THUMB_SHEET_COLUMNS, tw, 3).transpose(0, 2, 1, 3, 4).reshape(-1, th, tw, 3)[:count]
+        return cls(np.ascontiguousarray(tiles), interval)
+
+def thumbnail_interval(duration: float) -> float:
+    return max(THUMB_INTERVAL_SEC, duration / THUMB_MAX_COUNT)
+
+def load_thumbnail_strip(path: str, ffmpeg_path: Optional[str], ffprobe_path: Optional[str]) -> ThumbnailStrip:
+    # Hanya keyframe yang di-decode (-skip_frame nokey); filter fps mengulang keyframe terakhir untuk tiap titik interval
+    sheet_path = _media_cache_path(path, "thumbs", f"{THUMB_HEIGHT}p.jpg")
+    meta_path = sheet_path.with_suffix(".json")
+    if sheet_path.exists() and meta_path.exists():
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f: meta = json.load(f)
+            with Image.open(sheet_path) as img: sheet = np.asarray(img.convert("RGB"))[:, :, ::-1]
+            return ThumbnailStrip.from_sheet(sheet, meta["count"], tuple(meta["tile_size"]), meta["interval"])
+        except (OSError, ValueError, KeyError):
+            logger.warning(f"Cache thumbnail rusak, dibangun ulang: {sheet_path}")
+    if not ffmpeg_path: raise RuntimeError("FFmpeg tidak ditemukan.")
+    info = probe_media(path, ffprobe_path)
+    w, h = media_frame_size(info)
+    tw, th = max(2, int(round(THUMB_HEIGHT * w / h / 2)) * 2), THUMB_HEIGHT
+    interval = thumbnail_interval(info.get("duration", 0.0))
+    cmd = [ffmpeg_path, "-v", "error", "-nostdin", "-skip_frame", "nokey", "-i", path, "-map", "0:v:0", "-an", "-sn",
+           "-vf", f"fps=1/{interval:.6f}:eof_action=pass,scale={tw}:{th}:flags=area", "-f", "rawvideo", "-pix_fmt", "bgr24", "-"]
+    result = subprocess.run(cmd, capture_output=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"FFmpeg gagal membuat thumbnail {Path(path).name}: {result.stderr.decode('utf-8', errors='replace').strip()[-300:]}")
+    count = len(result.stdout) // (tw * th * 3)
+    if not count: raise RuntimeError(f"Tidak ada keyframe yang dapat di-decode di {Path(path).name}.")
+    strip = ThumbnailStrip(np.frombuffer(result.stdout, dtype=np.uint8, count=count * th * tw * 3).reshape(count, th, tw, 3), interval)
+    tmp_path = sheet_path.with_suffix(".tmp")
+    Image.fromarray(np.ascontiguousarray(strip.to_sheet()[:, :, ::-1])).save(tmp_path, format="JPEG", quality=85)
+    os.replace(tmp_path, sheet_path)
+    _write_json_atomic(meta_path, {"count": count, "tile_size": [tw, th], "interval": interval})
+    return strip
+
+# --- Mixing Audio Native via FFmpeg ---
+# Codec audio yang boleh di-stream-copy ke dalam container MP4
+MP4_AUDIO_COPY_CODECS = {"aac", "mp3", "alac", "ac3", "eac3", "opus"}
+
+def build_audio_mix_command(ffmpeg_path: str, base_path: str, reaction_path: str, base_info: Dict[str, Any], reaction_info: Dict[str, Any],
+                            audio: AudioState, duration: float, output_path: str, audio_codec: str, audio_bitrate: str,
+                            allow_passthrough: bool = True, base_start: float = 0.0, reaction_start: float = 0.0) -> Optional[List[str]]:
+    # Padanan mode Base/Reaction/Mix dari CompositeAudioClip, tetapi dijalankan oleh filter graph FFmpeg
+    use_base = bool(base_info.get("audio_codec")) and not audio.v1_mute
+    use_reaction = bool(reaction_info.get("audio_codec")) and not audio.v2_mute
+    if use_base and use_reaction:
+        if audio.mode == "Reaction only": use_base = False
+        elif audio.mode != "Mix": use_reaction = False
+        # Mix 0% / 100% sama dengan satu track saja
+        elif audio.mix_level <= 0: use_reaction = False
+        elif audio.mix_level >= 100: use_base = False
+    if not use_base and not use_reaction: return None
+
+    cmd = [ffmpeg_path, "-y", "-hide_banner", "-loglevel", "error", "-nostdin"]
+    inputs = []
+    # -ss sebelum -i: seek di demuxer, bagian sebelum in point tidak pernah di-decode
+    if use_base:
+        if base_start > 0: cmd += ["-ss", f"{base_start:.3f}"]
+        cmd += ["-i", base_path]
+        inputs.append(1.0 - audio.mix_level / 100.0)
+    if use_reaction:
+        # Reaction yang lebih pendek di-loop tanpa decode ulang di Python
+        if reaction_info.get("duration", 0) - reaction_start < duration: cmd += ["-stream_loop", "-1"]
+        if reaction_start > 0: cmd += ["-ss", f"{reaction_start:.3f}"]
+        cmd += ["-i", reaction_path]
+        inputs.append(audio.mix_level / 100.0)
+
+    if len(inputs) == 2:
+        graph = f"[0:a:0]volume={inputs[0]:.3f}[a0];[1:a:0]volume={inputs[1]:.3f}[a1];[a0][a1]amix=inputs=2:duration=longest:dropout_transition=0:normalize=0[aout]"
+        cmd += ["-filter_complex", graph, "-map", "[aout]", "-t", f"{duration:.3f}", "-vn", "-c:a", audio_codec, "-b:a", audio_bitrate, output_path]
+        return cmd
+
+    # Satu track tanpa perubahan volume: salin paket audio apa adanya jika container mendukung
+    source_codec = (base_info if use_base else reaction_info).get("audio_codec")
+    cmd += ["-map", "0:a:0", "-t", f"{duration:.3f}", "-vn"]
+    # Stream copy setelah -ss ikut membawa paket sebelum titik seek, jadi rentang terpotong tetap di-encode
+    trimmed = (base_start if use_base else reaction_start) > 0
+    if allow_passthrough and not trimmed and source_codec in MP4_AUDIO_COPY_CODECS:
+        logger.info(f"Audio passthrough ({source_codec}), tanpa encode ulang.")
+        cmd += ["-c:a", "copy", output_path]
+    else:
+        cmd += ["-c:a", audio_codec, "-b:a", audio_bitrate, output_path]
+    return cmd
+
+# --- Preset Output & Geometri PiP ---
+OUTPUT_PRESETS = ["YouTube Video (16:9)", "YouTube Shorts (9:16)", "TikTok (9:16)", "IG Reels (9:16)", "IG Square (1:1)"]
+PRESET_TAGS = {"YouTube Video (16:9)": "youtube", "YouTube Shorts (9:16)": "shorts", "TikTok (9:16)": "tiktok", "IG Reels (9:16)": "reels", "IG Square (1:1)": "square"}
+
+def default_resolution_for_preset(preset: str) -> str:
+    if "9:16" in preset: return "1080x1920"
+    if "1:1" in preset: return "1080x1080"
+    return "1920x1080"
+
+def parse_resolution(resolution: str) -> Tuple[int, int]:
+    w_str, h_str = resolution.split('x')
+    return int(w_str), int(h_str)
+
+def pip_size_for_scale(scale_percent: float, out_w: int, out_h: int, aspect_ratio: float) -> Tuple[int, int]:
+    shorter_side = min(out_w, out_h)
+    target_h = shorter_side * (scale_percent / 100.0)
+    target_w = target_h * aspect_ratio
+    return int(target_w), int(target_h)
+
+def pip_position_for_preset(preset: str, out_w: int, out_h: int, pip_w: int, pip_h: int, default: Tuple[int, int]) -> Tuple[int, int]:
+    margin = int(min(out_w, out_h) * 0.02)
+    pos_map = {
+        "Kiri-Atas": (margin, margin), "Kanan-Atas": (out_w - pip_w - margin, margin),
+        "Kiri-Bawah": (margin, out_h - pip_h - margin), "Kanan-Bawah": (out_w - pip_w - margin, out_h - pip_h - margin),
+        "Tengah-Atas": ((out_w - pip_w) // 2, margin), "Tengah": ((out_w - pip_w) // 2, (out_h - pip_h) // 2),
+        "Tengah-Bawah": ((out_w - pip_w) // 2, out_h - pip_h - margin)
+    }
+    return pos_map.get(preset, default)
+
+def _dataclass_from_dict(cls, data: Dict[str, Any]):
+    # Kebalikan dari asdict(); key yang tidak dikenal diabaikan agar file lama/baru tetap bisa dibaca
+    hints = typing.get_type_hints(cls)
+    kwargs = {}
+    for f in dataclasses.fields(cls):
+        if f.name not in data: continue
+        value = data[f.name]
+        if dataclasses.is_dataclass(hints[f.name]) and isinstance(value, dict):
+            value = _dataclass_from_dict(hints[f.name], value)
+        kwargs[f.name] = value
+    return cls(**kwargs)
+
+# --- Compositor Frame ---
+MASK_CACHE_LIMIT = 256
+
+def create_pip_mask(size: Tuple[int, int], shape_style: ShapeStyleState, is_stroke: bool = False, cache: Optional[Dict] = None) -> np.ndarray:
+    w, h = size
+    if w <= 0 or h <= 0: return np.zeros((h, w), dtype=np.uint8)
+
+    stroke_width = shape_style.stroke_width if is_stroke else 0
+    cache_key = (w, h, is_stroke, shape_style.shape, shape_style.corner_radius, shape_style.polygon_sides, stroke_width)
+    if cache is not None and cache_key in cache:
+        return cache[cache_key]
+
+    img = Image.new('L', (w, h), 0)
+    draw = ImageDraw.Draw(img)
+    shape = shape_style.shape
+    shape_box = [0, 0, w, h]
+
+    if shape == "Full (No Mask)": draw.rectangle(shape_box, fill=255)
+    elif shape == "Kotak (Square)":
+        min_dim = min(w, h)
+        offset_x, offset_y = (w - min_dim) // 2, (h - min_dim) // 2
+        draw.rectangle([offset_x, offset_y, w - offset_x, h - offset_y], fill=255)
+    elif shape == "Bulat (Circle)":
+        min_dim = min(w, h)
+        offset_x, offset_y = (w - min_dim) // 2, (h - min_dim) // 2
+        draw.ellipse([offset_x, offset_y, w - offset_x, h - offset_y], fill=255)
+    elif shape == "Rounded Rect": draw.rounded_rectangle(shape_box, radius=shape_style.corner_radius, fill=255)
+    elif shape == "Polygon":
+        sides, center_x, center_y, radius = shape_style.polygon_sides, w / 2, h / 2, min(w, h) / 2
+        points = [(center_x + radius * math.cos(math.radians(360/sides*i - 90)), center_y + radius * math.sin(math.radians(360/sides*i - 90))) for i in range(sides)]
+        draw.polygon(points, fill=255)
+
+    mask = np.array(img)
+
+    if is_stroke and shape_style.stroke_width > 0:
+        kernel = np.ones((3, 3), np.uint8)
+        dilated = cv2.dilate(mask, kernel, iterations=int(shape_style.stroke_width / 1.5))
+        mask = cv2.subtract(dilated, mask)
+
+    if cache is not None:
+        # Resize PiP interaktif menghasilkan banyak ukuran; cache dibatasi agar tidak tumbuh tanpa batas
+        if len(cache) >= MASK_CACHE_LIMIT: cache.clear()
+        cache[cache_key] = mask
+    return mask
+
+DUP_COMPARE_BLOCK = 1 << 18
+
+def frames_equal(a: np.ndarray, b: np.ndarray) -> bool:
+    # Perbandingan eksak (tanpa risiko tabrakan hash): sampel baris dulu agar frame yang berbeda cepat ditolak,
+    # lalu seluruh buffer dibandingkan per blok uint64 (berhenti di blok pertama yang berbeda, tanpa array bool sebesar frame)
+    if not np.array_equal(a[::32], b[::32]): return False
+    flat_a, flat_b = a.reshape(-1), b.reshape(-1)
+    if flat_a.nbytes % 8 == 0: flat_a, flat_b = flat_a.view(np.uint64), flat_b.view(np.uint64)
+    for i in range(0, len(flat_a), DUP_COMPARE_BLOCK):
+        if not np.array_equal(flat_a[i:i + DUP_COMPARE_BLOCK], flat_b[i:i + DUP_COMPARE_BLOCK]): return False
+    return True
+
+def mark_duplicate_frames(frames: np.ndarray, dup: np.ndarray, prev: Optional[np.ndarray] = None) -> np.ndarray:
+    # Lengkapi dup[i] dari decoder (indeks sumber berulang / sumber habis) dengan frame yang isinya sama persis;
+    # `prev` = frame terakhir chunk sebelumnya (untuk dup[0])
+    for i in range(len(frames)):
+        if dup[i]: continue
+        before = frames[i - 1] if i else prev
+        dup[i] = before is not None and frames_equal(frames[i], before)
+    return dup
+
+def _true_runs(mask: np.ndarray) -> List[Tuple[int, int]]:
+    # Rentang [awal, akhir) berurutan yang bernilai True
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], mask.astype(np.int8), [0]))))
+    return list(zip(edges[::2].tolist(), edges[1::2].tolist()))
+
+class FrameCompositor:
+    # Menggabungkan base + PiP untuk satu layout output; tidak bergantung pada state GUI.
+    # Bekerja per chunk (N, H, W, 3): resize per frame ke buffer yang dipakai ulang,
+    # lalu blend mask/stroke dikerjakan sekali untuk seluruh chunk.
+    def __init__(self, out_size: Tuple[int, int], fit_mode: str, pip_rect: Tuple[int, int, int, int], shape_style: ShapeStyleState,
+                 mask_cache: Optional[Dict] = None, channel_order: str = "BGR", interpolation: Optional[int] = None):
+        self.out_w, self.out_h = out_size
+        self.fit_mode = fit_mode
+        self.pip_x, self.pip_y, self.pip_w, self.pip_h = pip_rect
+        self.shape_style = shape_style
+        self.mask_cache = mask_cache if mask_cache is not None else {}
+        rgb = tuple(int(shape_style.stroke_color.lstrip('#')[i:i+2], 16) for i in (0, 2, 4))
+        self.stroke_color = np.array(rgb if channel_order == "RGB" else rgb[::-1], dtype=np.uint8)
+        # None = INTER_AREA (kualitas terbaik untuk downscale); draft memakai INTER_LINEAR
+        self.interpolation = interpolation
+        self._prepared_for = None
+        self._pip_prepared = False
+        self._pip_buf: Optional[np.ndarray] = None
+        # Cache layer per run frame identik (hanya dipakai RenderEngine; satu compositor per thread)
+        self._base_run = self._pip_run = self._composite_key = None
+        self._base_layer: Optional[np.ndarray] = None
+        self._pip_layer: Optional[np.ndarray] = None
+        self._composite: Optional[np.ndarray] = None
+
+    @classmethod
+    def for_layout(cls, project: ProjectState, pip_layout: PipLayoutState, shape_style: ShapeStyleState, **kwargs) -> "FrameCompositor":
+        pip_rect = (pip_layout.x, pip_layout.y, pip_layout.width, pip_layout.height)
+        return cls(parse_resolution(project.output_resolution), project.fit_mode, pip_rect, shape_style, **kwargs)
+
+    @property
+    def out_size(self) -> Tuple[int, int]:
+        return self.out_w, self.out_h
+
+    def _prepare(self, base_shape: Tuple[int, ...]):
+        # Geometri & mask hanya dihitung ulang jika ukuran frame sumber berubah
+        if self._prepared_for == base_shape: return
+        out_w, out_h = self.out_w, self.out_h
+        h, w = base_shape[:2]
+        scale = min(out_w / w, out_h / h) if self.fit_mode == "Contain" else max(out_w / w, out_h / h)
+        new_w, new_h = max(1, int(w * scale)), max(1, int(h * scale))
+        self._base_size = (new_w, new_h)
+        self._base_buf = np.empty((new_h, new_w, 3), dtype=np.uint8)
+        # Mode Cover memotong bagian tengah; Contain menyisakan bar hitam
+        crop_w, crop_h = min(new_w, out_w), min(new_h, out_h)
+        crop_x, crop_y = (new_w - crop_w) // 2, (new_h - crop_h) // 2
+        x_off, y_off = (out_w - crop_w) // 2, (out_h - crop_h) // 2
+        self._base_src = (slice(crop_y, crop_y + crop_h), slice(crop_x, crop_x + crop_w))
+        self._base_dst = (slice(y_off, y_off + crop_h), slice(x_off, x_off + crop_w))
+        self._bars = (y_off, y_off + crop_h, x_off, x_off + crop_w)
+        # Kasus umum (rasio sumber = rasio output): resize langsung ke frame output tanpa salinan
+        self._base_direct = (new_w, new_h) == (out_w, out_h)
+        self._base_run = self._composite_key = None
+        self._prepared_for = base_shape
+
+    def _prepare_pip(self):
+        # Geometri PiP tidak bergantung pada frame sumber, cukup dihitung sekali
+        if self._pip_prepared: return
+        out_w, out_h = self.out_w, self.out_h
+        self._pip_region = None
+        pip_w, pip_h = self.pip_w, self.pip_h
+        if pip_w > 0 and pip_h > 0:
+            x, y = self.pip_x, self.pip_y
+            x1, y1 = max(x, 0), max(y, 0)
+            x2, y2 = min(x + pip_w, out_w), min(y + pip_h, out_h)
+            if x2 > x1 and y2 > y1:
+                src = (slice(y1 - y, y2 - y), slice(x1 - x, x2 - x))
+                inner = create_pip_mask((pip_w, pip_h), self.shape_style, cache=self.mask_cache) > 0
+                self._inner_where = inner[src][None, :, :, None]
+                self._stroke_where = None
+                if self.shape_style.stroke_width > 0:
+                    stroke = create_pip_mask((pip_w, pip_h), self.shape_style, is_stroke=True, cache=self.mask_cache) > 0
+                    self._stroke_where = (stroke & ~inner)[src][None, :, :, None]
+                self._pip_region = ((slice(y1, y2), slice(x1, x2)), src)
+        self._pip_prepared = True
+
+    def composite(self, base_frame: np.ndarray, pip_frame: np.ndarray) -> np.ndarray:
+        return self.composite_batch(base_frame[None], pip_frame[None])[0]
+
+    def composite_batch(self, base_frames: np.ndarray, pip_frames: np.ndarray, out: Optional[np.ndarray] = None,
+                        base_runs: Optional[np.ndarray] = None, pip_runs: Optional[np.ndarray] = None, start: int = 0) -> np.ndarray:
+        # *_runs[i] = indeks global frame pertama dari deretan frame sumber yang identik dengan frame i (lihat RenderEngine);
+        # `start` = indeks global frame ke-0 chunk ini. Frame dengan run yang sama memakai ulang layer hasil resize,
+        # dan jika run base & PiP sama-sama berulang, seluruh hasil composite disalin.
+        if base_runs is None or pip_runs is None:
+            out = self.render_base(base_frames, out)
+            return self.blend_pip(out, pip_frames)
+        n = len(base_frames)
+        keys = list(zip(base_runs.tolist(), pip_runs.tolist()))
+        skip = np.array([(i > 0 and key == keys[i - 1]) or key == self._composite_key for i, key in enumerate(keys)])
+        out = self.render_base(base_frames, out, runs=base_runs, start=start, skip=skip)
+        out = self.blend_pip(out, pip_frames, runs=pip_runs, start=start, skip=skip)
+        for i in np.flatnonzero(skip):
+            out[i] = out[i - 1] if i > 0 and keys[i] == keys[i - 1] else self._composite
+        if max(keys[-1]) < start + n - 1:
+            # Frame terakhir mengulang frame sebelumnya: kemungkinan besar chunk berikutnya juga, simpan untuk thread ini
+            if self._composite is None: self._composite = np.empty_like(out[0])
+            self._composite[...] = out[n - 1]
+            self._composite_key = keys[-1]
+        return out
+
+    def render_base(self, base_frames: np.ndarray, out: Optional[np.ndarray] = None,
+                    runs: Optional[np.ndarray] = None, start: int = 0, skip: Optional[np.ndarray] = None) -> np.ndarray:
+        # Layer base saja (tanpa PiP); preview menyimpannya agar drag PiP tidak perlu resize base lagi
+        n = len(base_frames)
+        self._prepare(base_frames.shape[1:])
+        if out is None: out = np.empty((n, self.out_h, self.out_w, 3), dtype=np.uint8)
+
+        # --- Layer base: resize per frame (cv2), salin ke posisi di kanvas, bar dikosongkan sekaligus ---
+        interpolation = cv2.INTER_AREA if self.interpolation is None else self.interpolation
+        (src_y, src_x), (dst_y, dst_x) = self._base_src, self._base_dst
+        last = -1
+        for i in range(n):
+            if skip is not None and skip[i]: continue
+            if runs is not None:
+                # Frame identik: salin layer dari frame sebelumnya di chunk ini atau dari cache thread
+                if last >= 0 and runs[i] == runs[last]:
+                    out[i, dst_y, dst_x] = out[last, dst_y, dst_x]
+                    last = i
+                    continue
+                if runs[i] == self._base_run:
+                    out[i, dst_y, dst_x] = self._base_layer[dst_y, dst_x]
+                    last = i
+                    continue
+            last = i
+            if self._base_direct:
+                cv2.resize(base_frames[i], self._base_size, dst=out[i], interpolation=interpolation)
+                continue
+            cv2.resize(base_frames[i], self._base_size, dst=self._base_buf, interpolation=interpolation)
+            out[i, dst_y, dst_x] = self._base_buf[src_y, src_x]
+        if runs is not None and last >= 0 and runs[last] < start + last and runs[last] != self._base_run:
+            if self._base_layer is None: self._base_layer = np.empty_like(out[0])
+            self._base_layer[dst_y, dst_x] = out[last, dst_y, dst_x]
+            self._base_run = runs[last]
+        top, bottom, left, right = self._bars
+        if top > 0: out[:, :top] = 0
+        if bottom < self.out_h: out[:, bottom:] = 0
+        if left > 0: out[:, :, :left] = 0
+        if right < self.out_w: out[:, :, right:] = 0
+        return out
+
+    def blend_pip(self, out: np.ndarray, pip_frames: np.ndarray, runs: Optional[np.ndarray] = None, start: int = 0,
+                  skip: Optional[np.ndarray] = None) -> np.ndarray:
+        # PiP di-blend di tempat ke atas layer base di `out`
+        n = len(pip_frames)
+        self._prepare_pip()
+        if self._pip_region is None: return out
+        interpolation = cv2.INTER_AREA if self.interpolation is None else self.interpolation
+
+        # --- Layer PiP: resize ke buffer chunk, lalu stroke + mask di-blend untuk N frame sekaligus ---
+        pip_w, pip_h = self.pip_w, self.pip_h
+        if self._pip_buf is None or len(self._pip_buf) < n:
+            self._pip_buf = np.empty((n, pip_h, pip_w, 3), dtype=np.uint8)
+        last = -1
+        for i in range(n):
+            if skip is not None and skip[i]: continue
+            if runs is not None:
+                if last >= 0 and runs[i] == runs[last]:
+                    self._pip_buf[i] = self._pip_buf[last]
+                    last = i
+                    continue
+                if runs[i] == self._pip_run:
+                    self._pip_buf[i] = self._pip_layer
+                    last = i
+                    continue
+            last = i
+            cv2.resize(pip_frames[i], (pip_w, pip_h), dst=self._pip_buf[i], interpolation=interpolation)
+        if runs is not None and last >= 0 and runs[last] < start + last and runs[last] != self._pip_run:
+            if self._pip_layer is None: self._pip_layer = np.empty_like(self._pip_buf[0])
+            self._pip_layer[...] = self._pip_buf[last]
+            self._pip_run = runs[last]
+        (dst_y, dst_x), (src_y, src_x) = self._pip_region
+        for a, b in ([(0, n)] if skip is None else _true_runs(~skip)):
+            roi = out[a:b, dst_y, dst_x]
+            if self._stroke_where is not None:
+                np.copyto(roi, self.stroke_color, where=self._stroke_where)
+            np.copyto(roi, self._pip_buf[a:b, src_y, src_x], where=self._inner_where)
+        return out
+
+# --- Render Engine (Headless) ---
+class RenderCancelled(Exception):
+    pass
+
+@dataclass
+class RenderTarget:
+    output_path: str
+    project: ProjectState
+    pip_layout: PipLayoutState
+
+@dataclass
+class RenderJob:
+    base_path: str
+    reaction_path: str
+    targets: List[RenderTarget]
+    shape_style: ShapeStyleState
+    audio: AudioState
+    export: ExportState
+    timeline: TimelineState = field(default_factory=TimelineState)
+
+def render_range(timeline: TimelineState, base_duration: float, reaction_duration: float) -> Tuple[float, float, float]:
+    # (awal base, durasi, awal reaction) dari in/out point dan offset reaction
+    start = min(max(0.0, timeline.in_point_sec, -timeline.reaction_offset_sec), base_duration)
+    end = base_duration if timeline.out_point_sec is None else min(max(0.0, timeline.out_point_sec), base_duration)
+    if end - start <= 0: raise RuntimeError("Out point harus setelah in point.")
+    reaction_start = max(0.0, start + timeline.reaction_offset_sec)
+    if reaction_duration > 0: reaction_start %= reaction_duration
+    return start, end - start, reaction_start
+
+def scaled_layout(project: ProjectState, pip_layout: PipLayoutState, size: Tuple[int, int]) -> Tuple[ProjectState, PipLayoutState]:
+    # Layout yang sama pada resolusi output lain (draft, preview)
+    out_w, out_h = parse_resolution(project.output_resolution)
+    sx, sy = size[0] / out_w, size[1] / out_h
+    pip = pip_layout
+    scaled_pip = dataclasses.replace(pip, x=int(round(pip.x * sx)), y=int(round(pip.y * sy)), width=max(1, int(round(pip.width * sx))), height=max(1, int(round(pip.height * sy))))
+    return dataclasses.replace(project, output_resolution=f"{size[0]}x{size[1]}"), scaled_pip
+
+def draft_render_job(job: RenderJob) -> RenderJob:
+    # Layout yang sama diskalakan ke resolusi draft, jadi framing draft identik dengan hasil final
+    scale = job.export.draft_scale_percent / 100.0
+    targets = []
+    for target in job.targets:
+        out_w, out_h = parse_resolution(target.project.output_resolution)
+        project, pip_layout = scaled_layout(target.project, target.pip_layout, (max(2, int(out_w * scale) // 2 * 2), max(2, int(out_h * scale) // 2 * 2)))
+        targets.append(RenderTarget(target.output_path, project, pip_layout))
+    # Stroke (dilasi mask) dilewati; audio disalin apa adanya jika tidak perlu mixing
+    shape_style = dataclasses.replace(job.shape_style, stroke_width=0, corner_radius=int(job.shape_style.corner_radius * scale))
+    export = dataclasses.replace(job.export, preset="ultrafast", audio_passthrough=True)
+    return dataclasses.replace(job, targets=targets, shape_style=shape_style, export=export)
+
+def partial_output_path(output_path: str) -> str:
+    # Nama sementara tetap berakhiran ekstensi asli agar FFmpeg mengenali container-nya
+    p = Path(output_path)
+    return str(p.with_name(f"{p.stem}.part{p.suffix}"))
+
+MP4_LAYOUTS = ["Standard", "Faststart", "Fragmented"]
+MP4_CONTAINER_SUFFIXES = {".mp4", ".m4v", ".mov"}
+
+def mp4_layout_args(layout: str, output_path: str) -> List[str]:
+    # Faststart: setelah encode, moov digeser ke depan di file yang sama (tanpa salinan kedua).
+    # Fragmented: moov kosong di awal + satu fragmen per keyframe, jadi file yang masih tumbuh sudah bisa diputar/di-upload.
+    if Path(output_path).suffix.lower() not in MP4_CONTAINER_SUFFIXES: return []
+    if layout == "Faststart": return ["-movflags", "+faststart"]
+    if layout == "Fragmented": return ["-movflags", "+frag_keyframe+empty_moov+default_base_moof"]
+    return []
+
+class FfmpegVideoWriter:
+    # Pipe rawvideo RGB ke satu proses FFmpeg; penulisan dilakukan thread sendiri
+    # agar beberapa encoder bisa menerima frame secara paralel.
+    # Item antrean boleh berupa satu frame (H, W, 3) atau satu chunk (N, H, W, 3).
+    QUEUE_SIZE = 2
+
+    def __init__(self, ffmpeg_path: str, output_path: str, size: Tuple[int, int], fps: float, codec: str, export: ExportState, audio_path: Optional[str] = None):
+        w, h = size
+        cmd = [ffmpeg_path, "-y", "-hide_banner", "-loglevel", "error", "-nostdin"] + encoder_input_args(codec)
+        cmd += ["-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{w}x{h}", "-r", f"{fps}", "-i", "-"]
+        if audio_path:
+            cmd += ["-i", audio_path, "-map", "0:v:0", "-map", "1:a:0", "-c:a", "copy"]
+        cmd += ["-c:v", codec] + encoder_output_args(codec, export.crf, export.preset) + mp4_layout_args(export.mp4_layout, output_path) + [output_path]
+        self.output_path = output_path
+        self._stderr = tempfile.TemporaryFile()
+        self.process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=self._stderr)
+        self._frames = queue.Queue(maxsize=self.QUEUE_SIZE)
+        self._error: Optional[Exception] = None
+        self._thread = threading.Thread(target=self._drain, daemon=True, name=f"Writer-{Path(output_path).stem}")
+        self._thread.start()
+
+    def _drain(self):
+        while True:
+            item = self._frames.get()
+            if item is None: break
+            frame, on_done = item
+            if not self._error:
+                try:
+                    self.process.stdin.write(np.ascontiguousarray(frame).data)
+                except OSError as e:
+                    self._error = e
+            # Buffer dikembalikan ke pemiliknya setelah selesai ditulis
+            if on_done: on_done()
+
+    def write(self, frame: np.ndarray, on_done=None):
+        if self._error: raise RuntimeError(f"Encoder untuk {Path(self.output_path).name} berhenti: {self._read_stderr() or self._error}")
+        self._frames.put((frame, on_done))
+
+    def _read_stderr(self) -> str:
+        self._stderr.seek(0)
+        return self._stderr.read().decode('utf-8', errors='replace').strip()[-500:]
+
+    def close(self):
+        self._frames.put(None)
+        self._thread.join()
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        returncode = self.process.wait()
+        if returncode != 0 or self._error:
+            raise RuntimeError(f"FFmpeg gagal menulis {Path(self.output_path).name} (exit {returncode}): {self._read_stderr()}")
+        self._stderr.close()
+
+    def abort(self):
+        if self.process.poll() is None: self.process.kill()
+        while True:
+            try:
+                self._frames.put_nowait(None)
+                break
+            except queue.Full:
+                try: self._frames.get_nowait()
+                except queue.Empty: pass
+        self._thread.join(timeout=5)
+        self.process.wait()
+        self._stderr.close()
+
+class PipelineStopped(Exception):
+    pass
+
+def _pipeline_get(q: queue.Queue, stop: threading.Event):
+    # get() yang tetap bisa dihentikan saat stage lain gagal atau render dibatalkan
+    while True:
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            if stop.is_set(): raise PipelineStopped()
+
+def source_frame_map(total_frames: int, render_fps: float, source_fps: float, start_sec: float = 0.0) -> np.ndarray:
+    # Indeks frame sumber untuk setiap frame output (sama seperti get_frame(t) MoviePy), tidak pernah turun.
+    # Sumber yang di-loop tidak memakai modulo: indeksnya terus naik melewati akhir file dan reader membaca
+    # dengan -stream_loop, jadi decoder hanya bergerak maju.
+    t = start_sec + np.arange(total_frames) / render_fps
+    return np.floor(t * source_fps + 1e-5).astype(np.int64)
+
+def frame_step(index_map: np.ndarray) -> int:
+    # Kelipatan langkah indeks (mis. 2 untuk 60 -> 30 fps): frame di antaranya tidak perlu dikirim lewat pipe
+    steps = np.diff(index_map)
+    steps = steps[steps > 0]
+    return int(np.gcd.reduce(steps)) if len(steps) else 1
+
+class FfmpegFrameReader:
+    # Decode rawvideo RGB dari satu pipe FFmpeg, hanya bergerak maju.
+    # Mundur atau lompatan jauh membuka ulang proses dengan -ss sebelum -i.
+    # step > 1: FFmpeg sendiri membuang frame di antara (fps + framestep) sebelum konversi warna dan pipe.
+    SEEK_AHEAD_SEC = 2.0
+
+    def __init__(self, ffmpeg_path: str, path: str, size: Tuple[int, int], fps: float, pix_fmt: str = "rgb24",
+                 step: int = 1, loop: bool = False):
+        self.ffmpeg_path = ffmpeg_path
+        self.path = path
+        self.width, self.height = size
+        self.fps = fps
+        self.pix_fmt = pix_fmt
+        self.step = step
+        self.loop = loop
+        self.frame_bytes = self.width * self.height * 3
+        self.process: Optional[subprocess.Popen] = None
+        self.pos = -1  # indeks frame terakhir yang sudah dibaca
+        self.eof = False
+        self._scratch = np.empty((self.height, self.width, 3), dtype=np.uint8)
+
+    def _seek_args(self, index: int) -> Tuple[List[str], int]:
+        # (argumen sebelum -i, indeks frame pertama yang akan keluar). -ss tidak bisa digabung dengan
+        # -stream_loop (putaran berikutnya mulai dari frame yang salah), jadi reader loop memakai trim di _timing_args
+        return (["-ss", f"{index / self.fps:.6f}"] if index > 0 and not self.loop else []), index
+
+    def _timing_args(self, first_index: int) -> List[str]:
+        # Output CFR: frame ke-n selalu berada di n / fps
+        filters = [f"fps={self.fps}"]
+        if self.loop and first_index > 0: filters.append(f"trim=start_frame={first_index}")
+        if self.step > 1: filters.append(f"framestep={self.step}")
+        if len(filters) > 1: return ["-vf", ",".join(filters), "-vsync", "passthrough"]
+        return ["-r", f"{self.fps}"]
+
+    def _needs_seek(self, index: int) -> bool:
+        # Reader loop tidak bisa seek ke indeks yang sudah melewati akhir file, jadi hanya dibuka sekali
+        if self.loop: return self.process is None
+        return self.process is None or index <= self.pos or index - self.pos > self.SEEK_AHEAD_SEC * self.fps
+
+    def _open(self, index: int):
+        self.close()
+        seek_args, first_index = self._seek_args(index)
+        cmd = [self.ffmpeg_path, "-hide_banner", "-loglevel", "error", "-nostdin"] + (["-stream_loop", "-1"] if self.loop else []) + seek_args
+        cmd += ["-i", self.path, "-an", "-sn"] + self._timing_args(first_index) + ["-f", "rawvideo", "-pix_fmt", self.pix_fmt, "-"]
+        self.process = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=self.frame_bytes)
+        self.pos = first_index - self.step
+        self.eof = False
+
+    def _read_next(self, out: np.ndarray) -> bool:
+        view = memoryview(out).cast('B')
+        got = 0
+        while got < self.frame_bytes:
+            n = self.process.stdout.readinto(view[got:])
+            if not n:
+                self.eof = True
+                return False
+            got += n
+        self.pos += self.step
+        return True
+
+    def read(self, index: int, out: np.ndarray) -> bool:
+        # Isi `out` dengan frame ke-index; False jika sumber sudah habis. Dengan step > 1, index harus
+        # sejajar dengan indeks pembuka (dijamin oleh frame_step)
+        if self._needs_seek(index):
+            self._open(index)
+        while not self.eof and self.pos < index - self.step:
+            self._read_next(self._scratch)
+        return not self.eof and self._read_next(out)
+
+    def close(self):
+        if self.process is None: return
+        if self.process.poll() is None: self.process.kill()
+        self.process.stdout.close()
+        self.process.wait()
+        self.process = None
+
+class IndexedFrameReader(FfmpegFrameReader):
+    # Reader untuk preview: frame diberi nomor menurut urutan tampil dari KeyframeIndex (aman untuk VFR).
+    # Seek selalu mendarat di keyframe sebelum frame tujuan, lalu decode maju seperlunya.
+    def __init__(self, ffmpeg_path: str, path: str, size: Tuple[int, int], index: "KeyframeIndex", pix_fmt: str = "bgr24"):
+        super().__init__(ffmpeg_path, path, size, index.fps, pix_fmt=pix_fmt)
+        self.index = index
+
+    def _seek_args(self, index: int) -> Tuple[List[str], int]:
+        keyframe = self.index.keyframe_before(index)
+        return (["-ss", f"{self.index.seek_time(keyframe):.6f}"] if keyframe > 0 else []), keyframe
+
+    def _timing_args(self, first_index: int) -> List[str]:
+        # Tanpa duplikasi/drop frame, jadi output ke-n = frame ke-n di indeks
+        return ["-vsync", "passthrough"]
+
+    def _needs_seek(self, index: int) -> bool:
+        # Maju dalam GOP yang sama lebih murah daripada seek; lompat jika ada keyframe yang lebih dekat
+        return self.process is None or index <= self.pos or self.index.keyframe_before(index) > self.pos + 1
+
+class ChunkDecoder(threading.Thread):
+    # Stage decode: mengisi chunk (N, H, W, 3) dari pool buffer sendiri, urut sesuai peta indeks output -> sumber
+    def __init__(self, reader: FfmpegFrameReader, index_map: np.ndarray, chunk: int, pool_size: int, stop: threading.Event):
+        super().__init__(daemon=True, name=f"Decoder-{Path(reader.path).stem}")
+        self.reader = reader
+        self.index_map = index_map
+        self.total_frames = len(index_map)
+        self.chunk = chunk
+        self.stop = stop
+        self.free: queue.Queue = queue.Queue()
+        for _slot in range(pool_size):
+            self.free.put(np.empty((chunk, reader.height, reader.width, 3), dtype=np.uint8))
+        self.ready: queue.Queue = queue.Queue(maxsize=pool_size + 1)
+        # Salinan frame terakhir chunk sebelumnya, untuk frame duplikat atau sumber yang habis lebih awal
+        self._last = np.zeros((reader.height, reader.width, 3), dtype=np.uint8)
+
+    def run(self):
+        reader = self.reader
+        try:
+            for start in range(0, self.total_frames, self.chunk):
+                buf = _pipeline_get(self.free, self.stop)
+                n = min(self.chunk, self.total_frames - start)
+                # dup[j]: frame j disalin dari frame sebelumnya (indeks sumber berulang atau sumber habis);
+                # perbandingan isi dikerjakan thread compositor agar decoder tidak melambat
+                dup = np.zeros(n, dtype=bool)
+                for j in range(n):
+                    prev = buf[j - 1] if j else self._last
+                    index = int(self.index_map[start + j])
+                    if index == reader.pos or not reader.read(index, buf[j]):
+                        buf[j] = prev
+                        dup[j] = True
+                self._last[...] = buf[n - 1]
+                self.ready.put((start, n, buf, dup))
+            self.ready.put(None)
+        except PipelineStopped:
+            pass
+        except Exception as e:
+            self.ready.put(e)
+        finally:
+            reader.close()
+
+    def get(self):
+        item = _pipeline_get(self.ready, self.stop)
+        if isinstance(item, Exception): raise item
+        return item
+
+class RenderProfiler:
+    # Profil satu jendela frame render: cProfile per thread (.pstats) + sampler stack semua thread
+    # (.collapsed, format flamegraph.pl / speedscope). Thread memanggil attach() di titik aman
+    # karena cProfile di Python <= 3.11 hanya bisa dinyalakan/dimatikan dari thread-nya sendiri.
+    SAMPLE_INTERVAL_SEC = 0.005
+    DEFAULT_FRAMES = 300
+
+    def __init__(self, start_frame: int = 0, frame_count: int = DEFAULT_FRAMES):
+        self.start_frame, self.end_frame = start_frame, start_frame + max(1, frame_count)
+        self.active = threading.Event()
+        self.finished = False
+        self.stacks: collections.Counter = collections.Counter()
+        self.samples = 0
+        self.wall_sec = 0.0
+        self._profiles: List[cProfile.Profile] = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._sampler: Optional[threading.Thread] = None
+        self._started_at = 0.0
+
+    def update(self, frames_done: int):
+        # Dipanggil thread utama render dengan jumlah frame yang sudah terkirim ke writer
+        if not self.finished and not self.active.is_set() and self.start_frame <= frames_done < self.end_frame:
+            self._started_at = time.perf_counter()
+            self.active.set()
+            self._sampler = threading.Thread(target=self._sample_loop, daemon=True, name="ProfileSampler")
+            self._sampler.start()
+        elif self.active.is_set() and frames_done >= self.end_frame:
+            self.finish()
+        self.attach()
+
+    def attach(self):
+        prof = getattr(self._local, "profile", None)
+        if self.active.is_set() and prof is None:
+            prof = cProfile.Profile()
+            try:
+                prof.enable()
+            except ValueError:
+                # Python 3.12+: cProfile memakai sys.monitoring global, profiler pertama sudah mencakup semua thread
+                self._local.profile = False
+                return
+            self._local.profile = prof
+            with self._lock: self._profiles.append(prof)
+        elif not self.active.is_set() and prof:
+            prof.disable()
+            self._local.profile = False
+
+    def finish(self):
+        if not self.active.is_set(): return
+        self.active.clear()
+        self.finished = True
+        self.wall_sec = time.perf_counter() - self._started_at
+        self.attach()
+        if self._sampler: self._sampler.join()
+
+    def _sample_loop(self):
+        own = threading.get_ident()
+        while self.active.is_set():
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own: continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self.stacks[";".join([names.get(ident, str(ident))] + stack[::-1])] += 1
+            self.samples += 1
+            time.sleep(self.SAMPLE_INTERVAL_SEC)
+
+    def save(self, output_path: str, outcome: str = "") -> List[str]:
+        # Laporan ditaruh di samping file output: <nama>.profile.pstats / .collapsed / .txt;
+        # render yang batal/gagal diberi akhiran, mis. <nama>.profile.cancelled.txt
+        out = Path(output_path)
+        stem = out.with_name(f"{out.stem}.profile" + (f".{outcome}" if outcome else ""))
+        paths = []
+        with self._lock: profiles = [p for p in self._profiles if p.getstats()]
+        if profiles:
+            stats = pstats.Stats(*profiles)
+            stats.dump_stats(f"{stem}.pstats")
+            with open(f"{stem}.txt", 'w', encoding='utf-8') as f:
+                f.write(f"Frame {self.start_frame}-{self.end_frame}, {self.wall_sec:.2f} s wall, {self.samples} sampel stack\n\n")
+                stats.stream = f
+                stats.sort_stats("cumulative").print_stats(40)
+            paths += [f"{stem}.pstats", f"{stem}.txt"]
+        if self.stacks:
+            with open(f"{stem}.collapsed", 'w', encoding='utf-8') as f:
+                for stack, count in self.stacks.most_common(): f.write(f"{stack} {count}\n")
+            paths.append(f"{stem}.collapsed")
+        return paths
+
+class RenderEngine:
+    # Pipeline tiga stage: thread decoder per sumber -> pool compositor -> writer per target.
+    # Antrean dan pool buffer dibatasi agar memori tetap tetap; urutan frame dijaga oleh antrean future FIFO.
+    PROGRESS_INTERVAL_SEC = 0.25
+    CHUNK_BYTES = 24 * 1024 * 1024
+    MAX_CHUNK_FRAMES = 16
+    # cv2.resize dan np.copyto melepas GIL, jadi thread compositor berjalan paralel
+    COMPOSITE_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))
+
+    def __init__(self, job: RenderJob, ffmpeg_path: str, ffprobe_path: Optional[str], available_encoders: Optional[Dict[str, float]],
+                 cancel_event: threading.Event, progress_cb=None, status_cb=None, mask_cache: Optional[Dict] = None,
+                 profiler: Optional[RenderProfiler] = None):
+        self.job = draft_render_job(job) if job.export.draft_mode else job
+        self.profiler = profiler
+        self.ffmpeg_path = ffmpeg_path
+        self.ffprobe_path = ffprobe_path
+        self.available_encoders = available_encoders
+        self.cancel_event = cancel_event
+        self.progress_cb = progress_cb
+        self.status_cb = status_cb
+        self.mask_cache = mask_cache if mask_cache is not None else {}
+        self._last_progress = 0.0
+        self._start_time = 0.0
+        self._stop = threading.Event()
+        self._local = threading.local()
+        self._duplicates = [0, 0] # frame base/reaction yang identik dengan frame sebelumnya
+        self._run_start = [-1, -1]
+
+    def _status(self, text: str):
+        logger.info(text)
+        if self.status_cb: self.status_cb(text)
+
+    def _report_progress(self, frames_done: int, total_frames: int, force: bool = False):
+        now = time.perf_counter()
+        if not self.progress_cb or (not force and now - self._last_progress < self.PROGRESS_INTERVAL_SEC): return
+        self._last_progress = now
+        elapsed = now - self._start_time
+        self.progress_cb(frames_done, total_frames, frames_done / elapsed if elapsed > 0 else 0.0)
+
+    def _resolve_codec(self) -> str:
+        requested = self.job.export.video_codec
+        codec = resolve_codec(requested, self.available_encoders)
+        if requested not in (codec, AUTO_CODEC):
+            # Fallback jika encoder yang dipilih gagal saat probe
+            self._status(f"Warning: {requested} tidak berfungsi, fallback ke {codec}.")
+        return codec
+
+    def _thread_compositors(self) -> List[FrameCompositor]:
+        # FrameCompositor menyimpan buffer kerja sendiri, jadi setiap thread memakai instance terpisah
+        compositors = getattr(self._local, "compositors", None)
+        if compositors is None:
+            compositors = self._local.compositors = [
+                FrameCompositor.for_layout(t.project, t.pip_layout, self.job.shape_style, mask_cache=self.mask_cache, channel_order="RGB",
+                                           interpolation=cv2.INTER_LINEAR if self.job.export.draft_mode else None)
+                for t in self.job.targets]
+        return compositors
+
+    def _save_profile(self, outcome: str = ""):
+        self.profiler.finish()
+        try:
+            reports = self.profiler.save(self.job.targets[0].output_path, outcome)
+        except OSError as e:
+            logger.error(f"Gagal menyimpan laporan profil: {e}")
+            return
+        if reports: self._status(f"Laporan profil: {', '.join(Path(r).name for r in reports)}")
+
+    def _frame_runs(self, which: int, frames: np.ndarray, dup: np.ndarray, prev: Optional[np.ndarray], start: int) -> np.ndarray:
+        # Dipanggil berurutan oleh dispatcher: run[i] = indeks global frame pertama yang isinya identik dengan frame i
+        dup = mark_duplicate_frames(frames, dup, prev)
+        self._duplicates[which] += int(dup.sum())
+        runs = np.maximum.accumulate(np.where(dup, self._run_start[which], start + np.arange(len(frames))))
+        self._run_start[which] = int(runs[-1])
+        return runs
+
+    def _composite_chunk(self, base_item, pip_item, base_runs: np.ndarray, pip_runs: np.ndarray, out_pools: List[queue.Queue]):
+        start, n, base_buf = base_item[:3]
+        pip_buf = pip_item[2]
+        if self.profiler: self.profiler.attach()
+        outs = []
+        for compositor, pool in zip(self._thread_compositors(), out_pools):
+            out = _pipeline_get(pool, self._stop)
+            compositor.composite_batch(base_buf[:n], pip_buf[:n], out=out[:n], base_runs=base_runs, pip_runs=pip_runs, start=start)
+            outs.append(out)
+        return start, n, outs
+
+    def run(self) -> List[str]:
+        job = self.job
+        partials = [partial_output_path(t.output_path) for t in job.targets]
+        audio_path = str(Path(partials[0]).with_suffix(".audio.mka"))
+        writers: List[FfmpegVideoWriter] = []
+        decoders: List[ChunkDecoder] = []
+        outcome = "failed"
+        try:
+            base_info = probe_media(job.base_path, self.ffprobe_path)
+            reaction_info = probe_media(job.reaction_path, self.ffprobe_path)
+            base_fps, reaction_fps = media_fps(base_info), media_fps(reaction_info)
+
+            # --- Logika FPS ---
+            render_fps = base_fps
+            if job.export.target_fps != "Auto":
+                try:
+                    render_fps = int(job.export.target_fps)
+                except ValueError:
+                    logger.warning(f"Nilai FPS tidak valid: {job.export.target_fps}. Kembali ke FPS sumber.")
+            if job.export.draft_mode: render_fps = min(render_fps, job.export.draft_max_fps)
+
+            reaction_duration = reaction_info["duration"]
+            base_start, target_duration, reaction_start = render_range(job.timeline, base_info["duration"], reaction_duration)
+            loop_reaction = 0 < reaction_duration - reaction_start < target_duration
+
+            # --- Audio: filter graph FFmpeg (amix/volume + loop), hasilnya di-mux tanpa encode ulang ---
+            audio_cmd = build_audio_mix_command(
+                self.ffmpeg_path, job.base_path, job.reaction_path, base_info, reaction_info,
+                job.audio, target_duration, audio_path, job.export.audio_codec, job.export.audio_bitrate,
+                allow_passthrough=job.export.audio_passthrough, base_start=base_start, reaction_start=reaction_start)
+            if audio_cmd:
+                run_ffmpeg(audio_cmd)
+
+            codec = self._resolve_codec()
+            out_sizes = [c.out_size for c in self._thread_compositors()]
+            for size, partial in zip(out_sizes, partials):
+                writers.append(FfmpegVideoWriter(self.ffmpeg_path, partial, size, render_fps, codec, job.export, audio_path if audio_cmd else None))
+
+            total_frames = int(math.ceil(target_duration * render_fps - 1e-6))
+            base_size, reaction_size = media_frame_size(base_info), media_frame_size(reaction_info)
+            frame_bytes = max([w * h * 3 for w, h in out_sizes] + [base_size[0] * base_size[1] * 3, reaction_size[0] * reaction_size[1] * 3])
+            chunk = max(1, min(self.MAX_CHUNK_FRAMES, self.CHUNK_BYTES // frame_bytes))
+
+            # Peta indeks output -> frame sumber dihitung di depan (konversi fps, offset, loop); reader membuka sumber
+            # dengan -ss di frame pertama lalu hanya maju, membuang/menduplikasi frame menurut indeks
+            base_map = source_frame_map(total_frames, render_fps, base_fps, base_start)
+            reaction_map = source_frame_map(total_frames, render_fps, reaction_fps, reaction_start)
+
+            # Batas chunk yang sedang diproses: dispatcher menahan paling banyak `inflight` future,
+            # writer memegang QUEUE_SIZE + 1 chunk; pool dibuat sedikit lebih besar agar tidak pernah deadlock
+            inflight = self.COMPOSITE_WORKERS + 1
+            # Buffer sumber baru dikembalikan saat chunk-nya di-emit, agar frame terakhirnya masih utuh
+            # sebagai pembanding duplikat untuk chunk berikutnya (+1 buffer supaya decoder tetap bisa membaca di depan)
+            decoders = [ChunkDecoder(FfmpegFrameReader(self.ffmpeg_path, job.base_path, base_size, base_fps, step=frame_step(base_map)),
+                                     base_map, chunk, inflight + 3, self._stop),
+                        ChunkDecoder(FfmpegFrameReader(self.ffmpeg_path, job.reaction_path, reaction_size, reaction_fps, step=frame_step(reaction_map), loop=loop_reaction),
+                                     reaction_map, chunk, inflight + 3, self._stop)]
+            out_pools = []
+            for w, h in out_sizes:
+                pool = queue.Queue()
+                for _slot in range(inflight + FfmpegVideoWriter.QUEUE_SIZE + 3):
+                    pool.put(np.empty((chunk, h, w, 3), dtype=np.uint8))
+                out_pools.append(pool)
+
+            self._start_time = time.perf_counter()
+            for decoder in decoders: decoder.start()
+            pending = collections.deque()
+
+            def emit(entry):
+                future, (base_buf, pip_buf) = entry
+                start, n, outs = future.result()
+                decoders[0].free.put(base_buf)
+                decoders[1].free.put(pip_buf)
+                for writer, out, pool in zip(writers, outs, out_pools):
+                    writer.write(out[:n], on_done=lambda out=out, pool=pool: pool.put(out))
+                self._report_progress(start + n, total_frames)
+                if self.profiler: self.profiler.update(start + n)
+
+            if self.profiler: self.profiler.update(0)
+            prev = (None, None)
+            with ThreadPoolExecutor(max_workers=self.COMPOSITE_WORKERS, thread_name_prefix="Compositor") as executor:
+                try:
+                    while True:
+                        if self.cancel_event.is_set(): raise RenderCancelled()
+                        base_item, pip_item = decoders[0].get(), decoders[1].get()
+                        if base_item is None or pip_item is None: break
+                        start, n = base_item[:2]
+                        # Chunk sebelumnya masih di antrean `pending`, jadi buffernya belum dipakai ulang decoder
+                        base_runs = self._frame_runs(0, base_item[2][:n], base_item[3], prev[0], start)
+                        pip_runs = self._frame_runs(1, pip_item[2][:n], pip_item[3], prev[1], start)
+                        pending.append((executor.submit(self._composite_chunk, base_item, pip_item, base_runs, pip_runs, out_pools), (base_item[2], pip_item[2])))
+                        prev = (base_item[2][n - 1], pip_item[2][n - 1])
+                        while len(pending) > inflight: emit(pending.popleft())
+                    while pending:
+                        if self.cancel_event.is_set(): raise RenderCancelled()
+                        emit(pending.popleft())
+                except BaseException:
+                    # Hentikan semua stage agar worker yang menunggu buffer ikut keluar
+                    self._stop.set()
+                    raise
+
+            for writer in writers: writer.close()
+            logger.info(f"Frame duplikat dipakai ulang: base {self._duplicates[0]}, reaction {self._duplicates[1]} dari {total_frames}")
+            for target, partial in zip(job.targets, partials): os.replace(partial, target.output_path)
+            self._report_progress(total_frames, total_frames, force=True)
+            outcome = ""
+            return [t.output_path for t in job.targets]
+        except BaseException as e:
+            if isinstance(e, (RenderCancelled, KeyboardInterrupt)): outcome = "cancelled"
+            self._stop.set()
+            for writer in writers: writer.abort()
+            for partial in partials: Path(partial).unlink(missing_ok=True)
+            raise
+        finally:
+            self._stop.set()
+            if self.profiler: self._save_profile(outcome)
+            for decoder in decoders:
+                if decoder.is_alive(): decoder.join(timeout=5)
+            Path(audio_path).unlink(missing_ok=True)
+
+# --- Snapshot Project (Format File .json) ---
+@dataclass
+class ProjectSnapshot:
+    # Semua state yang ditulis "Simpan Project"; dipakai GUI maupun mode headless (watch folder, job server, worker)
+    project: ProjectState = field(default_factory=ProjectState)
+    pip_layout: PipLayoutState = field(default_factory=PipLayoutState)
+    shape_style: ShapeStyleState = field(default_factory=ShapeStyleState)
+    audio: AudioState = field(default_factory=AudioState)
+    export: ExportState = field(default_factory=ExportState)
+    timeline: TimelineState = field(default_factory=TimelineState)
+    # Sidik jari file sumber saat disimpan: {path: {"size": ..., "mtime_ns": ...}}
+    sources: Dict[str, Dict[str, int]] = field(default_factory=dict)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ProjectSnapshot":
+        return _dataclass_from_dict(cls, data)
+
+    @classmethod
+    def load(cls, path: str) -> "ProjectSnapshot":
+        with open(path, 'r', encoding='utf-8') as f: return cls.from_dict(json.load(f))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    def source_paths(self) -> List[str]:
+        return [p for p in (*self.project.video1_paths, self.project.video2_path) if p]
+
+    def record_sources(self):
+        self.sources = {p: source_fingerprint(p) for p in self.source_paths() if os.path.exists(p)}
+
+    def check_sources(self) -> Tuple[List[str], List[str]]:
+        # (hilang, berubah sejak disimpan); sumber yang berubah tetap dimuat, cache analisisnya otomatis dibangun ulang
+        missing, changed = [], []
+        for p in self.source_paths():
+            if not os.path.exists(p): missing.append(p)
+            elif p in self.sources and self.sources[p] != source_fingerprint(p): changed.append(p)
+        return missing, changed
+
+    def settings_hash(self) -> str:
+        # Sidik jari pengaturan render; hasil lama hanya dipakai ulang jika pengaturannya sama
+        project = asdict(self.project)
+        for key in ("video1_paths", "output_dir", "processing_mode", "frame_cache_enabled", "frame_cache_budget_mb"): project.pop(key, None)
+        settings = {"project": project, "pip_layout": asdict(self.pip_layout), "shape_style": asdict(self.shape_style), "audio": asdict(self.audio), "export": asdict(self.export),
+                    "reaction_offset_sec": self.timeline.reaction_offset_sec}
+        return hashlib.sha1(json.dumps(settings, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def layout_for_preset(self, preset: str, reaction_aspect: Optional[float] = None) -> Tuple[ProjectState, PipLayoutState]:
+        project = copy.deepcopy(self.project)
+        project.output_preset = preset
+        stored = self.project.preset_layouts.get(preset)
+        if stored:
+            project.output_resolution = stored["output_resolution"]
+            return project, _dataclass_from_dict(PipLayoutState, stored["pip_layout"])
+        # Preset yang belum pernah diatur: turunkan dari skala & posisi preset PiP saat ini
+        if not reaction_aspect: reaction_aspect = self.pip_layout.width / self.pip_layout.height if self.pip_layout.height > 0 else 1.0
+        project.output_resolution = default_resolution_for_preset(preset)
+        pip_layout = copy.deepcopy(self.pip_layout)
+        out_w, out_h = parse_resolution(project.output_resolution)
+        pip_layout.width, pip_layout.height = pip_size_for_scale(pip_layout.scale_percent, out_w, out_h, reaction_aspect)
+        pip_layout.x, pip_layout.y = pip_position_for_preset(pip_layout.pos_preset, out_w, out_h, pip_layout.width, pip_layout.height, (pip_layout.x, pip_layout.y))
+        return project, pip_layout
+
+    def build_render_job(self, base_path: str, output_path: str, reaction_aspect: Optional[float] = None, batch: bool = False) -> RenderJob:
+        targets = [RenderTarget(output_path, copy.deepcopy(self.project), copy.deepcopy(self.pip_layout))]
+        out = Path(output_path)
+        for preset in self.export.multi_output_presets:
+            if preset == self.project.output_preset: continue
+            project, pip_layout = self.layout_for_preset(preset, reaction_aspect)
+            targets.append(RenderTarget(str(out.with_name(f"{out.stem}_{PRESET_TAGS[preset]}{out.suffix}")), project, pip_layout))
+        timeline = copy.deepcopy(self.timeline)
+        if batch:
+            # In/out point milik video preview; offset reaction tetap berlaku untuk semua file batch
+            timeline.in_point_sec, timeline.out_point_sec = 0.0, None
+        return RenderJob(base_path, self.project.video2_path, targets, copy.deepcopy(self.shape_style), copy.deepcopy(self.audio), copy.deepcopy(self.export), timeline)
+
+    def batch_output_name(self, base_path: str) -> str:
+        return f"{Path(base_path).stem}_reaction{'_draft' if self.export.draft_mode else ''}.mp4"
+
+# --- Jurnal Batch (Persisten di Disk) ---
+class BatchJournal:
+    # Jurnal append-only (JSONL) di folder output. Setiap perubahan status item ditulis
+    # sebagai satu baris, sehingga batch bisa dilanjutkan setelah crash/cancel.
+    FILENAME = ".rvm_batch_journal.jsonl"
+
+    def __init__(self, output_dir: str):
+        self.path = Path(output_dir) / self.FILENAME
+        self.items: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._replay()
+
+    def _replay(self):
+        if not self.path.exists(): return
+        with open(self.path, 'rb') as f: data = f.read()
+        for line in data.splitlines():
+            try:
+                record = json.loads(line)
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                # Baris terakhir bisa terpotong jika proses mati saat menulis
+                logger.warning(f"Baris jurnal rusak diabaikan: {line[:80]!r}")
+                continue
+            self.items[record["source"]] = record
+        if data and not data.endswith(b"\n"):
+            # Potong sisa baris terakhir agar record berikutnya tidak tersambung ke baris rusak
+            with open(self.path, 'r+b') as f: f.truncate(data.rfind(b"\n") + 1)
+
+    def record(self, source: str, state: str, **extra):
+        record = {"source": source, "state": state, "time": time.time(), **extra}
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self.items[source] = record
+
+    def is_done(self, source: str, settings_hash: str) -> bool:
+        record = self.items.get(source)
+        if not record or record["state"] != "done": return False
+        if record.get("settings") != settings_hash: return False
+        outputs = record.get("outputs", [])
+        return bool(outputs) and all(Path(o).exists() for o in outputs)
+
+    def count_done(self, sources: List[str], settings_hash: str) -> int:
+        return sum(1 for s in sources if self.is_done(s, settings_hash))
+
+    def cleanup_stale_partials(self):
+        # Item yang masih "running" berarti proses sebelumnya mati di tengah render
+        for record in self.items.values():
+            if record["state"] == "running":
+                for partial in record.get("partials", []): Path(partial).unlink(missing_ok=True)
+
+    def reset(self):
+        with self._lock:
+            self.path.unlink(missing_ok=True)
+            self.items.clear()
+
+# --- Mode Headless (Watch Folder) ---
+def headless_capabilities() -> Tuple[str, Optional[str], Dict[str, float]]:
+    # Versi tanpa GUI dari _probe_capabilities
+    ffmpeg_path = shutil.which("ffmpeg")
+    if not ffmpeg_path: raise RuntimeError("FFmpeg tidak ditemukan di PATH sistem.")
+    try:
+        encoders = EncoderProbe(ffmpeg_path).load_or_probe()
+    except Exception as e:
+        logger.error(f"Gagal memeriksa encoder yang tersedia: {e}")
+        encoders = {}
+    return ffmpeg_path, find_ffprobe(ffmpeg_path), encoders
+
+def run_headless_render(project_path: str, base_path: str, output_dir: Optional[str] = None, profiler: Optional[RenderProfiler] = None) -> int:
+    snapshot = ProjectSnapshot.load(project_path)
+    output_path = Path(output_dir or snapshot.project.output_dir or Path(base_path).parent) / snapshot.batch_output_name(base_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    ffmpeg_path, ffprobe_path, encoders = headless_capabilities()
+    job = snapshot.build_render_job(base_path, str(output_path), batch=True)
+    try:
+        outputs = RenderEngine(job, ffmpeg_path, ffprobe_path, encoders, threading.Event(), profiler=profiler).run()
+    except KeyboardInterrupt:
+        logger.warning("Render dibatalkan.")
+        return 130
+    logger.info(f"Selesai: {', '.join(outputs)}")
+    return 0
+
+def _unique_path(path: Path) -> Path:
+    candidate, n = path, 1
+    while candidate.exists():
+        candidate = path.with_name(f"{path.stem}_{n}{path.suffix}")
+        n += 1
+    return candidate
+
+class WatchFolderDaemon:
+    # Memantau folder input; video baru dirender dengan project .json setelah ukurannya stabil,
+    # lalu dipindah ke done/ (beserta hasilnya) atau failed/ (beserta log error).
+    VIDEO_EXTS = {".mp4", ".mov", ".avi", ".mkv"}
+
+    def __init__(self, watch_dir: str, project_path: str, output_dir: Optional[str] = None, concurrency: int = 1,
+                 poll_sec: float = 2.0, settle_sec: float = 5.0):
+        self.watch_dir = Path(watch_dir).resolve()
+        self.project_path = Path(project_path)
+        self.done_dir = self.watch_dir / "done"
+        self.failed_dir = self.watch_dir / "failed"
+        self.output_dir = Path(output_dir).resolve() if output_dir else self.done_dir
+        if self.output_dir == self.watch_dir: raise ValueError("Folder output tidak boleh sama dengan folder yang dipantau.")
+        self.concurrency = max(1, concurrency)
+        self.poll_sec = poll_sec
+        self.settle_sec = settle_sec
+        self.stop_event = threading.Event()
+        self.mask_cache: Dict = {}
+        self.ffmpeg_path, self.ffprobe_path, self.available_encoders = headless_capabilities()
+        self._snapshot: Optional[ProjectSnapshot] = None
+        self._project_mtime: Optional[float] = None
+        self._seen: Dict[str, Tuple[int, float, float]] = {} # path -> (ukuran, mtime, sejak kapan tidak berubah)
+        self._active: set = set()
+        self._lock = threading.Lock()
+
+    def _current_snapshot(self) -> Optional[ProjectSnapshot]:
+        # Project dibaca ulang jika file-nya berubah; jika versi baru rusak, versi lama tetap dipakai.
+        # None = belum pernah berhasil dimuat; siklus poll ini dilewati dan dicoba lagi di siklus berikutnya.
+        try:
+            mtime = self.project_path.stat().st_mtime
+            if self._snapshot is None or mtime != self._project_mtime:
+                self._project_mtime = mtime
+                self._snapshot = ProjectSnapshot.load(str(self.project_path))
+                logger.info(f"Project dimuat: {self.project_path}")
+        except (OSError, ValueError, TypeError) as e:
+            if self._snapshot is None: logger.error(f"Gagal memuat project, dicoba lagi pada poll berikutnya: {e}")
+            else: logger.error(f"Gagal memuat ulang project, memakai versi sebelumnya: {e}")
+        return self._snapshot
+
+    def _stable_files(self) -> List[Path]:
+        now = time.monotonic()
+        ready, present = [], set()
+        for path in sorted(self.watch_dir.iterdir()):
+            if not path.is_file() or path.name.startswith(".") or path.suffix.lower() not in self.VIDEO_EXTS: continue
+            key = str(path)
+            present.add(key)
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            prev = self._seen.get(key)
+            if not prev or prev[:2] != (st.st_size, st.st_mtime):
+                # File baru atau masih ditulis: mulai ulang hitungan settle
+                self._seen[key] = (st.st_size, st.st_mtime, now)
+                continue
+            with self._lock:
+                if key in self._active: continue
+            if st.st_size > 0 and now - prev[2] >= self.settle_sec: ready.append(path)
+        for key in set(self._seen) - present: del self._seen[key]
+        return ready
+
+    def _process(self, source: Path, snapshot: ProjectSnapshot):
+        output_path = self.output_dir / snapshot.batch_output_name(str(source))
+        job = snapshot.build_render_job(str(source), str(output_path), batch=True)
+        try:
+            logger.info(f"Mulai render: {source.name}")
+            engine = RenderEngine(job, self.ffmpeg_path, self.ffprobe_path, self.available_encoders, self.stop_event, mask_cache=self.mask_cache)
+            outputs = engine.run()
+            self.done_dir.mkdir(parents=True, exist_ok=True)
+            shutil.move(str(source), _unique_path(self.done_dir / source.name))
+            logger.info(f"Selesai: {source.name} -> {', '.join(Path(o).name for o in outputs)}")
+        except RenderCancelled:
+            # Daemon dihentikan; file sumber dibiarkan agar diproses lagi saat daemon jalan kembali
+            logger.warning(f"Render dibatalkan: {source.name}")
+        except Exception as e:
+            logger.error(f"Render gagal: {source.name}: {e}", exc_info=True)
+            self.failed_dir.mkdir(parents=True, exist_ok=True)
+            target = _unique_path(self.failed_dir / source.name)
+            shutil.move(str(source), target)
+            with open(target.with_name(target.name + ".error.log"), 'w', encoding='utf-8') as f:
+                f.write(traceback.format_exc())
+        finally:
+            with self._lock: self._active.discard(str(source))
+
+    def run(self) -> int:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        logger.info(f"Memantau {self.watch_dir} (concurrency {self.concurrency}, poll {self.poll_sec}s, settle {self.settle_sec}s)")
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="WatchRender") as executor:
+            try:
+                while not self.stop_event.is_set():
+                    ready = self._stable_files()
+                    snapshot = self._current_snapshot() if ready else None
+                    for path in ready if snapshot else ():
+                        with self._lock:
+                            if len(self._active) >= self.concurrency: break
+                            self._active.add(str(path))
+                        executor.submit(self._process, path, snapshot)
+                    self.stop_event.wait(self.poll_sec)
+            except KeyboardInterrupt:
+                logger.info("Menghentikan watch folder...")
+            finally:
+                self.stop_event.set()
+        return 0
+
+# --- Server Job Render (HTTP Lokal) ---
+@dataclass
+class ServerJob:
+    job_id: str
+    base_path: str
+    output_path: str
+    snapshot: ProjectSnapshot
+    priority: int = 0
+    state: str = "queued" # queued | running | done | failed | cancelled
+    frames_done: int = 0
+    total_frames: int = 0
+    fps: float = 0.0
+    outputs: List[str] = field(default_factory=list)
+    error: str = ""
+    created: float = field(default_factory=time.time)
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    # Pengganti cancel_render_event milik GUI, satu per job
+    cancel_event: threading.Event = field(default_factory=threading.Event)
+
+    def summary(self) -> Dict[str, Any]:
+        progress = self.frames_done / self.total_frames * 100 if self.total_frames else 0.0
+        eta = (self.total_frames - self.frames_done) / self.fps if self.state == "running" and self.fps > 0 else None
+        return {"id": self.job_id, "state": self.state, "priority": self.priority, "base_path": self.base_path, "output_path": self.output_path,
+                "progress": round(progress, 1), "frames_done": self.frames_done, "total_frames": self.total_frames, "fps": round(self.fps, 1),
+                "eta_sec": round(eta, 1) if eta is not None else None, "outputs": self.outputs, "error": self.error,
+                "created": self.created, "started": self.started, "finished": self.finished}
+
+def is_loopback_host(host: str) -> bool:
+    if host == "localhost": return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+def path_within(path: Path, root: Path) -> bool:
+    # Keduanya sudah di-resolve (symlink & "..") sebelum dibandingkan
+    return path == root or root in path.parents
+
+class RenderJobServer:
+    # Antrean job render dengan prioritas (angka besar dulu, lalu FIFO) yang dikerjakan pool worker.
+    # Body POST /jobs = JSON hasil "Simpan Project" + base_path, output_path (opsional) dan priority (opsional).
+    # Selain loopback wajib token (header "Authorization: Bearer <token>"). Output hanya boleh ditulis ke
+    # output_root dari konfigurasi server; output_dir di body job diabaikan karena berasal dari klien.
+    def __init__(self, output_root: str, host: str = "127.0.0.1", port: int = 8765, workers: int = 1, token: Optional[str] = None):
+        if not output_root: raise ValueError("Server job memerlukan folder output (--output).")
+        if not is_loopback_host(host) and not token:
+            raise ValueError(f"Server job di alamat non-loopback ({host}) memerlukan token (--token atau RVM_SERVER_TOKEN).")
+        self.token = token
+        self.output_root = Path(output_root).resolve()
+        self.workers = max(1, workers)
+        self.ffmpeg_path, self.ffprobe_path, self.available_encoders = headless_capabilities()
+        self.jobs: Dict[str, ServerJob] = {}
+        self.queue: queue.PriorityQueue = queue.PriorityQueue()
+        self.mask_cache: Dict = {}
+        self.stop_event = threading.Event()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._started = time.time()
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+
+    def submit(self, data: Dict[str, Any]) -> ServerJob:
+        if not isinstance(data, dict) or not data.get("base_path"): raise ValueError("base_path wajib diisi")
+        snapshot = ProjectSnapshot.from_dict(data)
+        base_path = data["base_path"]
+        for path in (base_path, snapshot.project.video2_path):
+            if not path or not os.path.isfile(path): raise ValueError(f"File tidak ditemukan: {path!r}")
+        output_path = Path(data.get("output_path") or self.output_root / snapshot.batch_output_name(base_path)).resolve()
+        if not path_within(output_path.parent, self.output_root): raise ValueError(f"output_path harus berada di dalam {self.output_root}")
+        if output_path.suffix.lower() not in MP4_CONTAINER_SUFFIXES: raise ValueError(f"Ekstensi output tidak didukung: {output_path.suffix!r}")
+        job = ServerJob(str(next(self._ids)), base_path, str(output_path), snapshot, int(data.get("priority", 0)))
+        with self._lock: self.jobs[job.job_id] = job
+        self.queue.put((-job.priority, int(job.job_id), job.job_id))
+        logger.info(f"Job {job.job_id} masuk antrean (prioritas {job.priority}): {Path(base_path).name}")
+        return job
+
+    def cancel(self, job_id: str) -> Optional[ServerJob]:
+        job = self.jobs.get(job_id)
+        if not job: return None
+        job.cancel_event.set()
+        with self._lock:
+            # Job yang belum jalan langsung ditandai; yang sedang jalan dihentikan oleh RenderEngine
+            if job.state == "queued": job.state, job.finished = "cancelled", time.time()
+        return job
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock: jobs = list(self.jobs.values())
+        states = collections.Counter(job.state for job in jobs)
+        running = [job for job in jobs if job.state == "running"]
+        return {"uptime_sec": round(time.time() - self._started, 1), "workers": self.workers, "states": dict(states),
+                "render_fps": round(sum(job.fps for job in running), 1), "frames_rendered": sum(job.frames_done for job in jobs)}
+
+    def _on_progress(self, job: ServerJob, frames_done: int, total_frames: int, fps: float):
+        job.frames_done, job.total_frames, job.fps = frames_done, total_frames, fps
+
+    def _worker(self):
+        while not self.stop_event.is_set():
+            try:
+                _, _, job_id = self.queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            job = self.jobs[job_id]
+            with self._lock:
+                if job.state != "queued": continue
+                job.state, job.started = "running", time.time()
+            try:
+                Path(job.output_path).parent.mkdir(parents=True, exist_ok=True)
+                render_job = job.snapshot.build_render_job(job.base_path, job.output_path, batch=True)
+                engine = RenderEngine(render_job, self.ffmpeg_path, self.ffprobe_path, self.available_encoders, job.cancel_event,
+                                      progress_cb=lambda done, total, fps, job=job: self._on_progress(job, done, total, fps), mask_cache=self.mask_cache)
+                job.outputs = engine.run()
+                job.state = "done"
+            except RenderCancelled:
+                job.state = "cancelled"
+            except Exception as e:
+                logger.error(f"Job {job.job_id} gagal: {e}", exc_info=True)
+                job.state, job.error = "failed", str(e)
+            finally:
+                job.finished = time.time()
+                logger.info(f"Job {job.job_id}: {job.state}")
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                logger.debug(f"HTTP {self.address_string()} {format % args}")
+
+            def _reply(self, status: int, payload: Any):
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _parts(self) -> List[str]:
+                return [p for p in self.path.split("?")[0].split("/") if p]
+
+            def _authorized(self) -> bool:
+                if not server.token: return True
+                scheme, _sep, token = self.headers.get("Authorization", "").partition(" ")
+                if scheme.lower() == "bearer" and hmac.compare_digest(token.strip().encode('utf-8'), server.token.encode('utf-8')): return True
+                self._reply(401, {"error": "token tidak valid"})
+                return False
+
+            def do_GET(self):
+                if not self._authorized(): return
+                parts = self._parts()
+                if parts == ["jobs"]:
+                    with server._lock: jobs = list(server.jobs.values())
+                    return self._reply(200, [job.summary() for job in jobs])
+                if len(parts) == 2 and parts[0] == "jobs":
+                    job = server.jobs.get(parts[1])
+                    return self._reply(200, job.summary()) if job else self._reply(404, {"error": "job tidak ditemukan"})
+                if parts == ["stats"]: return self._reply(200, server.stats())
+                self._reply(404, {"error": "endpoint tidak dikenal"})
+
+            def do_POST(self):
+                if not self._authorized(): return
+                parts = self._parts()
+                if parts == ["jobs"]:
+                    try:
+                        data = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"null")
+                        # Satu job (objek) atau banyak sekaligus (list)
+                        jobs = [server.submit(item) for item in (data if isinstance(data, list) else [data])]
+                    except (ValueError, TypeError) as e:
+                        return self._reply(400, {"error": str(e)})
+                    return self._reply(201, [job.summary() for job in jobs] if isinstance(data, list) else jobs[0].summary())
+                if len(parts) == 3 and parts[0] == "jobs" and parts[2] == "cancel":
+                    job = server.cancel(parts[1])
+                    return self._reply(200, job.summary()) if job else self._reply(404, {"error": "job tidak ditemukan"})
+                self._reply(404, {"error": "endpoint tidak dikenal"})
+
+        return Handler
+
+    def run(self) -> int:
+        threads = [threading.Thread(target=self._worker, daemon=True, name=f"JobWorker_{i}") for i in range(self.workers)]
+        for thread in threads: thread.start()
+        host, port = self.httpd.server_address[:2]
+        logger.info(f"Server job render aktif di http://{host}:{port} ({self.workers} worker)")
+        try:
+            self.httpd.serve_forever()
+        except KeyboardInterrupt:
+            logger.info("Menghentikan server job...")
+        finally:
+            self.stop_event.set()
+            for job in list(self.jobs.values()): job.cancel_event.set()
+            self.httpd.server_close()
+            for thread in threads: thread.join()
+        return 0
+
+# --- Batch Terdistribusi (Folder Job Bersama) ---
+def _write_json_atomic(path: Path, data: Any):
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp, 'w', encoding='utf-8') as f: json.dump(data, f, indent=4)
+    os.replace(tmp, path)
+
+class SharedJobDir:
+    # Struktur folder di filesystem bersama (NFS/SMB), tanpa service pusat:
+    #   project.json        pengaturan render untuk semua worker
+    #   items/<id>.json     satu video per item (base_path, output_path)
+    #   leases/<id>.lease   klaim worker; mtime diperbarui oleh heartbeat
+    #   done/, failed/      status akhir per item
+    # Lease dianggap kedaluwarsa jika mtime-nya lebih tua dari lease_sec (jam antar host harus tersinkron, mis. NTP).
+    def __init__(self, root: str, lease_sec: float = 60.0):
+        self.root = Path(root)
+        self.lease_sec = lease_sec
+        self.project_path = self.root / "project.json"
+        self.items_dir, self.leases_dir = self.root / "items", self.root / "leases"
+        self.done_dir, self.failed_dir = self.root / "done", self.root / "failed"
+
+    def submit(self, snapshot: ProjectSnapshot, sources: List[str], output_dir: str) -> int:
+        for d in (self.items_dir, self.leases_dir, self.done_dir, self.failed_dir): d.mkdir(parents=True, exist_ok=True)
+        _write_json_atomic(self.project_path, snapshot.to_dict())
+        for source in sources:
+            source = os.path.abspath(source)
+            item_id = f"{Path(source).stem}-{hashlib.sha1(source.encode('utf-8')).hexdigest()[:8]}"
+            _write_json_atomic(self.items_dir / f"{item_id}.json", {"base_path": source, "output_path": str(Path(output_dir).resolve() / snapshot.batch_output_name(source))})
+        return len(sources)
+
+    def pending(self) -> List[str]:
+        finished = {p.stem for d in (self.done_dir, self.failed_dir) for p in d.glob("*.json")}
+        return sorted(p.stem for p in self.items_dir.glob("*.json") if p.stem not in finished)
+
+    def _lease_path(self, item_id: str) -> Path:
+        return self.leases_dir / f"{item_id}.lease"
+
+    def _lease_owner(self, item_id: str) -> Optional[str]:
+        try:
+            with open(self._lease_path(item_id), 'r', encoding='utf-8') as f: return json.load(f).get("worker")
+        except (OSError, ValueError):
+            return None
+
+    def try_lease(self, item_id: str, worker_id: str) -> bool:
+        lease = self._lease_path(item_id)
+        try:
+            # O_EXCL: hanya satu worker yang berhasil membuat file lease
+            fd = os.open(lease, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                if time.time() - lease.stat().st_mtime < self.lease_sec: return False
+            except FileNotFoundError:
+                return False
+            # Worker pemilik lease berhenti mengirim heartbeat: ambil alih lewat rename (hanya satu rename yang menang)
+            stale = lease.with_name(f"{lease.name}.{worker_id}.stale")
+            try:
+                os.rename(lease, stale)
+            except FileNotFoundError:
+                return False
+            if time.time() - stale.stat().st_mtime < self.lease_sec:
+                # Kalah balapan: yang ter-rename ternyata lease baru milik worker lain, kembalikan
+                try:
+                    os.link(stale, lease)
+                except FileExistsError:
+                    pass
+                stale.unlink(missing_ok=True)
+                return False
+            stale.unlink(missing_ok=True)
+            logger.warning(f"Lease {item_id} kedaluwarsa, diambil alih oleh {worker_id}")
+            return self.try_lease(item_id, worker_id)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({"worker": worker_id, "host": socket.gethostname(), "pid": os.getpid(), "time": time.time()}, f)
+        return True
+
+    def heartbeat(self, item_id: str, worker_id: str) -> bool:
+        # False jika lease sudah hilang/diambil worker lain
+        if self._lease_owner(item_id) != worker_id: return False
+        try:
+            os.utime(self._lease_path(item_id))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def release(self, item_id: str, worker_id: str):
+        if self._lease_owner(item_id) == worker_id: self._lease_path(item_id).unlink(missing_ok=True)
+
+    def finish(self, item_id: str, state: str, record: Dict[str, Any]):
+        _write_json_atomic((self.done_dir if state == "done" else self.failed_dir) / f"{item_id}.json", {"time": time.time(), **record})
+
+class DistributedWorker:
+    # Worker headless: klaim item lewat lease, render ke folder staging per worker, lalu publish ke folder output
+    # dengan os.replace (atomik, satu filesystem). Heartbeat yang gagal membatalkan render item tersebut.
+    POLL_SEC = 2.0
+
+    def __init__(self, job_dir: str, worker_id: Optional[str] = None, concurrency: int = 1, lease_sec: float = 60.0):
+        self.jobs = SharedJobDir(job_dir, lease_sec)
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.concurrency = max(1, concurrency)
+        self.stop_event = threading.Event()
+        self.mask_cache: Dict = {}
+        # Hanya kegagalan worker ini selama run() ini; failed/ dipakai bersama semua worker dan tidak pernah dikosongkan
+        self.failures = 0
+        self._lock = threading.Lock()
+        self.ffmpeg_path, self.ffprobe_path, self.available_encoders = headless_capabilities()
+
+    def _heartbeat_loop(self, item_id: str, lease_id: str, cancel_event: threading.Event, done: threading.Event):
+        interval = self.jobs.lease_sec / 4
+        next_beat = time.monotonic() + interval
+        while not done.wait(min(0.5, interval)):
+            if self.stop_event.is_set():
+                cancel_event.set()
+                return
+            if time.monotonic() < next_beat: continue
+            if not self.jobs.heartbeat(item_id, lease_id):
+                logger.error(f"Lease {item_id} hilang, render dihentikan")
+                cancel_event.set()
+                return
+            next_beat += interval
+
+    def _process(self, item_id: str, lease_id: str):
+        with open(self.jobs.items_dir / f"{item_id}.json", 'r', encoding='utf-8') as f: item = json.load(f)
+        final_path = Path(item["output_path"])
+        staging = final_path.parent / ".rvm_staging" / lease_id
+        cancel_event, done = threading.Event(), threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat_loop, args=(item_id, lease_id, cancel_event, done), daemon=True, name=f"Heartbeat_{item_id}")
+        heartbeat.start()
+        try:
+            snapshot = ProjectSnapshot.load(str(self.jobs.project_path))
+            staging.mkdir(parents=True, exist_ok=True)
+            job = snapshot.build_render_job(item["base_path"], str(staging / final_path.name), batch=True)
+            logger.info(f"[{lease_id}] render {item_id}")
+            staged = RenderEngine(job, self.ffmpeg_path, self.ffprobe_path, self.available_encoders, cancel_event, mask_cache=self.mask_cache).run()
+            done.set()
+            heartbeat.join()
+            if not self.jobs.heartbeat(item_id, lease_id): raise RenderCancelled()
+            outputs = []
+            for path in staged:
+                published = final_path.parent / Path(path).name
+                os.replace(path, published)
+                outputs.append(str(published))
+            self.jobs.finish(item_id, "done", {"worker": lease_id, "outputs": outputs})
+            logger.info(f"[{lease_id}] selesai {item_id}")
+        except RenderCancelled:
+            logger.warning(f"[{lease_id}] render {item_id} dibatalkan")
+        except Exception as e:
+            logger.error(f"[{lease_id}] render {item_id} gagal: {e}", exc_info=True)
+            self.jobs.finish(item_id, "failed", {"worker": lease_id, "error": str(e), "traceback": traceback.format_exc()})
+            with self._lock: self.failures += 1
+        finally:
+            done.set()
+            shutil.rmtree(staging, ignore_errors=True)
+            self.jobs.release(item_id, lease_id)
+
+    def _loop(self, slot: int):
+        lease_id = self.worker_id if self.concurrency == 1 else f"{self.worker_id}.{slot}"
+        while not self.stop_event.is_set():
+            pending = self.jobs.pending()
+            if not pending: return
+            # Mulai dari posisi berbeda per worker agar tidak semua berebut item pertama
+            offset = hash(lease_id) % len(pending)
+            for item_id in pending[offset:] + pending[:offset]:
+                if self.stop_event.is_set(): return
+                if self.jobs.try_lease(item_id, lease_id):
+                    self._process(item_id, lease_id)
+                    break
+            else:
+                # Semua item sisa sedang dipegang worker lain; tunggu selesai atau lease-nya kedaluwarsa
+                self.stop_event.wait(self.POLL_SEC)
+
+    def run(self) -> int:
+        logger.info(f"Worker {self.worker_id} memproses {self.jobs.root} ({self.concurrency} slot)")
+        threads = [threading.Thread(target=self._loop, args=(i,), daemon=True, name=f"DistWorker_{i}") for i in range(self.concurrency)]
+        for thread in threads: thread.start()
+        try:
+            for thread in threads:
+                while thread.is_alive(): thread.join(timeout=0.5)
+        except KeyboardInterrupt:
+            logger.info("Menghentikan worker...")
+            self.stop_event.set()
+            for thread in threads: thread.join()
+        return 1 if self.failures else 0
+
+def spawn_local_workers(job_dir: str, count: int, concurrency: int, lease_sec: float) -> int:
+    # Untuk uji coba di satu mesin: beberapa proses worker terpisah pada folder job yang sama
+    host = socket.gethostname()
+    procs = [subprocess.Popen([sys.executable, os.path.abspath(__file__), "--dist-worker", job_dir, "--worker-id", f"{host}-w{i}",
+                               "--concurrency", str(concurrency), "--lease", str(lease_sec)]) for i in range(count)]
+    try:
+        return max(proc.wait() for proc in procs)
+    except KeyboardInterrupt:
+        for proc in procs: proc.terminate()
+        return max(proc.wait() for proc in procs)
 
 # --- Aplikasi Utama ---
 class ReactionVideoMakerApp:
@@ -148,13 +2331,29 @@ class ReactionVideoMakerApp:
         self.v2_cap: Optional[cv2.VideoCapture] = None
         self.v1_meta: Dict[str, Any] = {}
         self.v2_meta: Dict[str, Any] = {}
-        self.preview_queue = queue.Queue(maxsize=2)
+        self.frame_caches: Dict[int, FrameCache] = {}
+        # Indeks keyframe + reader FFmpeg per sumber; selama belum siap preview memakai VideoCapture
+        self.frame_indexes: Dict[int, KeyframeIndex] = {}
+        self.frame_readers: Dict[int, IndexedFrameReader] = {}
+        # Peak audio per sumber untuk waveform timeline; zoom = (awal, rentang) detik base, rentang None = seluruh durasi
+        self.waveforms: Dict[int, WaveformPeaks] = {}
+        self.waveform_view: Tuple[float, Optional[float]] = (0.0, None)
+        # Sprite thumbnail keyframe per sumber: filmstrip + placeholder preview saat drag slider
+        self.thumbnail_strips: Dict[int, ThumbnailStrip] = {}
+        self._filmstrip_photo = None
         self.ui_update_queue = queue.Queue()
-        self.ffmpeg_path = self.find_ffmpeg()
-        self.is_nvenc_available = self._check_nvenc_availability() # Deteksi GPU
+        # Diisi oleh thread CapabilityProbe agar window tampil tanpa menunggu subprocess
+        self.ffmpeg_path: Optional[str] = None
+        self.ffprobe_path: Optional[str] = None
+        self.available_encoders: Dict[str, float] = {}
+        self.capabilities_ready = threading.Event()
+        self.diagnostics_window: Optional[tk.Toplevel] = None
+        # Diisi dari dialog Diagnostics: (frame awal, jumlah frame) atau None jika render tidak diprofil
+        self.profile_window: Optional[Tuple[int, int]] = None
         self.rendering_process: Optional[subprocess.Popen] = None
         self.cancel_render_event = threading.Event()
         self.mask_cache = {}
+        self.batch_journal: Optional[BatchJournal] = None
 
         # --- Drag & Resize PiP ---
         self.pip_interaction_mode = None
@@ -162,11 +2361,23 @@ class ReactionVideoMakerApp:
         self.drag_start_pos = (0, 0)
         self.original_pip_geom = (0, 0, 0, 0)
         self.aspect_ratio = 1.0
+        # --- Jalur tampilan preview: satu PhotoImage + satu item canvas, buffer dipakai ulang ---
         self.photo = None
+        self.preview_item = None
+        self._display_bgr: Optional[np.ndarray] = None
+        self._display_rgba: Optional[np.ndarray] = None
+        self._display_pil: Optional[Image.Image] = None
+        self._preview_frame_ready = False
+        self._overlay_key = None
+        # Frame sumber di playhead + layer base resolusi preview; drag PiP hanya mem-blend ulang PiP
+        self._preview_sources = None
+        self._preview_base_layer = None
+        self._preview_frame: Optional[np.ndarray] = None
 
         # --- UI Setup ---
         self._create_widgets()
         self._bind_events()
+        self.root.protocol("WM_DELETE_WINDOW", self._on_close)
         self.status_label.config(text=_("status_welcome"))
 
         # --- Start Background Threads ---
@@ -174,27 +2385,93 @@ class ReactionVideoMakerApp:
         self.preview_thread.start()
         self.root.after(100, self._update_preview_canvas)
         self.root.after(100, self._process_ui_updates)
+        threading.Thread(target=self._probe_capabilities, daemon=True, name="CapabilityProbe").start()
 
+    def _probe_capabilities(self, force: bool = False):
+        self.capabilities_ready.clear()
+        self.queue_ui_update(self._refresh_diagnostics)
+        self.ffmpeg_path = self.find_ffmpeg()
+        self.ffprobe_path = find_ffprobe(self.ffmpeg_path)
+        self.available_encoders = self._probe_encoders(force=force)
+        self.capabilities_ready.set()
+        self.queue_ui_update(self._on_capabilities_ready)
+        try:
+            cv2._load() # Pemanasan import OpenCV setelah window tampil
+        except ImportError as e:
+            logger.error(f"OpenCV tidak dapat di-import: {e}")
+
+    def _on_capabilities_ready(self):
+        if self.available_encoders:
+            self.codec_combo['values'] = [AUTO_CODEC] + [enc for enc in ENCODER_CANDIDATES if enc in self.available_encoders]
+        self._refresh_diagnostics()
         if not self.ffmpeg_path:
             self._show_ffmpeg_warning()
-            
-    def _check_nvenc_availability(self) -> bool:
-        if not self.ffmpeg_path:
-            return False
+
+    def _probe_encoders(self, force: bool = False) -> Dict[str, float]:
         try:
-            result = subprocess.run([self.ffmpeg_path, "-codecs"], capture_output=True, text=True, encoding='utf-8')
-            return "h264_nvenc" in result.stdout and "hevc_nvenc" in result.stdout
+            return EncoderProbe(self.ffmpeg_path).load_or_probe(force=force)
         except Exception as e:
-            logger.error(f"Gagal memeriksa ketersediaan NVENC: {e}")
-            return False
+            logger.error(f"Gagal memeriksa encoder yang tersedia: {e}")
+            return {}
 
     def _show_diagnostics(self):
-        nvenc_status = "Tersedia" if self.is_nvenc_available else "Tidak Tersedia"
-        messagebox.showinfo(
-            "Diagnostics",
-            f"FFmpeg Path: {self.ffmpeg_path or 'Tidak Ditemukan'}\n"
-            f"NVIDIA NVENC: {nvenc_status}"
-        )
+        if self.diagnostics_window and self.diagnostics_window.winfo_exists():
+            self.diagnostics_window.lift()
+            return
+        win = ttkb.Toplevel(self.root)
+        win.title("Diagnostics")
+        win.resizable(False, False)
+        frame = ttk.Frame(win, padding=15)
+        frame.pack(fill=BOTH, expand=True)
+        self.diag_ffmpeg_label = ttk.Label(frame, justify=LEFT)
+        self.diag_ffmpeg_label.pack(anchor=W)
+        ttk.Label(frame, text="Encoder berfungsi (fps uji):", font="-weight bold").pack(anchor=W, pady=(10, 2))
+        self.diag_encoders_label = ttk.Label(frame, justify=LEFT)
+        self.diag_encoders_label.pack(anchor=W)
+        self.diag_reprobe_btn = ttk.Button(frame, text="🔄 Probe Ulang", command=self._reprobe_capabilities, style="info.Outline.TButton")
+        self.diag_reprobe_btn.pack(fill=X, pady=(10, 0))
+
+        profile_frame = ttk.Labelframe(frame, text="Profil Render", padding=10)
+        profile_frame.pack(fill=X, pady=(10, 0))
+        start, count = self.profile_window or (0, RenderProfiler.DEFAULT_FRAMES)
+        self.profile_enabled_var = tk.BooleanVar(value=self.profile_window is not None)
+        self.profile_start_var = tk.IntVar(value=start)
+        self.profile_frames_var = tk.IntVar(value=count)
+        profile_check = ttk.Checkbutton(profile_frame, text="Profil render", variable=self.profile_enabled_var, bootstyle="round-toggle")
+        profile_check.pack(anchor=W)
+        ToolTip(profile_check, text=_("tooltip_profile_render"))
+        row = ttk.Frame(profile_frame)
+        row.pack(fill=X, pady=(5, 0))
+        ttk.Label(row, text="Mulai frame").pack(side=LEFT)
+        ttk.Spinbox(row, from_=0, to=10**7, textvariable=self.profile_start_var, width=8).pack(side=LEFT, padx=5)
+        ttk.Label(row, text="Jumlah").pack(side=LEFT)
+        ttk.Spinbox(row, from_=1, to=10**6, textvariable=self.profile_frames_var, width=8).pack(side=LEFT, padx=5)
+        for var in (self.profile_enabled_var, self.profile_start_var, self.profile_frames_var): var.trace_add("write", self._on_profile_settings_change)
+        self.diagnostics_window = win
+        self._refresh_diagnostics()
+
+    def _refresh_diagnostics(self):
+        if not self.diagnostics_window or not self.diagnostics_window.winfo_exists(): return
+        if not self.capabilities_ready.is_set():
+            self.diag_ffmpeg_label.config(text="FFmpeg Path: memeriksa...")
+            self.diag_encoders_label.config(text="  memeriksa encoder...")
+            self.diag_reprobe_btn.config(state=DISABLED)
+            return
+        encoder_lines = "\n".join(f"  {enc}: {fps:.0f} fps" for enc, fps in sorted(self.available_encoders.items(), key=lambda kv: -kv[1])) or "  (tidak ada)"
+        self.diag_ffmpeg_label.config(text=f"FFmpeg Path: {self.ffmpeg_path or 'Tidak Ditemukan'}")
+        self.diag_encoders_label.config(text=encoder_lines)
+        self.diag_reprobe_btn.config(state=NORMAL)
+
+    def _on_profile_settings_change(self, *_args):
+        # Disalin ke atribut biasa karena dibaca dari thread render
+        try:
+            window = (max(0, self.profile_start_var.get()), max(1, self.profile_frames_var.get()))
+        except tk.TclError:
+            return
+        self.profile_window = window if self.profile_enabled_var.get() else None
+
+    def _reprobe_capabilities(self):
+        threading.Thread(target=self._probe_capabilities, kwargs={"force": True}, daemon=True, name="CapabilityProbe").start()
 
     # ... (Metode inti lainnya seperti find_ffmpeg, queue_ui_update, dll. tidak berubah) ...
     def find_ffmpeg(self) -> Optional[str]:
@@ -233,8 +2510,7 @@ class ReactionVideoMakerApp:
         # ... (Preset & Resolusi tidak berubah)
         ttk.Label(toolbar, text="Preset:").pack(side=LEFT, padx=(5, 2))
         self.preset_var = tk.StringVar(value=self.project.output_preset)
-        presets = ["YouTube Video (16:9)", "YouTube Shorts (9:16)", "TikTok (9:16)", "IG Reels (9:16)", "IG Square (1:1)"]
-        preset_menu = ttk.Combobox(toolbar, textvariable=self.preset_var, values=presets, state="readonly", width=20)
+        preset_menu = ttk.Combobox(toolbar, textvariable=self.preset_var, values=OUTPUT_PRESETS, state="readonly", width=20)
         preset_menu.pack(side=LEFT, padx=2)
         preset_menu.bind("<<ComboboxSelected>>", self._on_preset_change)
         ttk.Label(toolbar, text="Resolusi:").pack(side=LEFT, padx=(10, 2))
@@ -261,7 +2537,7 @@ class ReactionVideoMakerApp:
         ToolTip(fps_combo, text=_("tooltip_fps"))
 
         # --- Kualitas CRF (BARU, Slider) ---
-        crf_frame = ttk.Labelframe(parent, text=f"Kualitas (CRF: {self.export.crf})", padding=(10, 5))
+        self.crf_frame = crf_frame = ttk.Labelframe(parent, text=f"Kualitas (CRF: {self.export.crf})", padding=(10, 5))
         crf_frame.pack(fill=X, pady=5)
         self.export_crf_var = tk.IntVar(value=self.export.crf)
         
@@ -296,10 +2572,40 @@ class ReactionVideoMakerApp:
         codec_frame.pack(fill=X, pady=5)
         ttk.Label(codec_frame, text="Video Codec:", width=18).pack(side=LEFT)
         self.export_codec_var = tk.StringVar(value=self.export.video_codec)
-        codecs = ["libx264", "libx265", "h264_nvenc", "hevc_nvenc"]
-        codec_combo = ttk.Combobox(codec_frame, textvariable=self.export_codec_var, values=codecs, state="readonly")
-        codec_combo.pack(fill=X, expand=True)
-        codec_combo.bind("<<ComboboxSelected>>", lambda e: setattr(self.export, 'video_codec', self.export_codec_var.get()))
+        codecs = [AUTO_CODEC] + ([enc for enc in ENCODER_CANDIDATES if enc in self.available_encoders] or ["libx264", "libx265", "h264_nvenc", "hevc_nvenc"])
+        self.codec_combo = ttk.Combobox(codec_frame, textvariable=self.export_codec_var, values=codecs, state="readonly")
+        self.codec_combo.pack(fill=X, expand=True)
+        self.codec_combo.bind("<<ComboboxSelected>>", lambda e: setattr(self.export, 'video_codec', self.export_codec_var.get()))
+
+        multi_frame = ttk.Labelframe(parent, text="Multi-Output (satu decode)", padding=(10, 5))
+        multi_frame.pack(fill=X, pady=5)
+        self.multi_output_vars = {}
+        for preset in OUTPUT_PRESETS:
+            var = tk.BooleanVar(value=preset in self.export.multi_output_presets)
+            ttk.Checkbutton(multi_frame, text=preset, variable=var, command=self._on_multi_output_change).pack(anchor=W)
+            self.multi_output_vars[preset] = var
+        ToolTip(multi_frame, text=_("tooltip_multi_output"))
+
+        self.export_passthrough_var = tk.BooleanVar(value=self.export.audio_passthrough)
+        passthrough_check = ttk.Checkbutton(parent, text="Audio passthrough (stream copy)", variable=self.export_passthrough_var, style="primary.Roundtoggle.Toolbutton",
+                                            command=lambda: setattr(self.export, 'audio_passthrough', self.export_passthrough_var.get()))
+        passthrough_check.pack(anchor=W, pady=5)
+        ToolTip(passthrough_check, text=_("tooltip_audio_passthrough"))
+
+        self.export_draft_var = tk.BooleanVar(value=self.export.draft_mode)
+        draft_check = ttk.Checkbutton(parent, text="Draft (review cepat)", variable=self.export_draft_var, style="warning.Roundtoggle.Toolbutton",
+                                      command=lambda: setattr(self.export, 'draft_mode', self.export_draft_var.get()))
+        draft_check.pack(anchor=W, pady=5)
+        ToolTip(draft_check, text=_("tooltip_draft_mode"))
+
+        layout_frame = ttk.Frame(parent)
+        layout_frame.pack(fill=X, pady=5)
+        ttk.Label(layout_frame, text="Layout MP4:", width=18).pack(side=LEFT)
+        self.export_mp4_layout_var = tk.StringVar(value=self.export.mp4_layout)
+        layout_combo = ttk.Combobox(layout_frame, textvariable=self.export_mp4_layout_var, values=MP4_LAYOUTS, state="readonly")
+        layout_combo.pack(fill=X, expand=True)
+        layout_combo.bind("<<ComboboxSelected>>", lambda e: setattr(self.export, 'mp4_layout', self.export_mp4_layout_var.get()))
+        ToolTip(layout_combo, text=_("tooltip_mp4_layout"))
 
         ttk.Separator(parent, orient=HORIZONTAL).pack(fill=X, pady=15)
         self.render_button = ttk.Button(parent, text="🚀 Render Video", command=self._start_render, style="success.TButton", state=DISABLED)
@@ -307,86 +2613,41 @@ class ReactionVideoMakerApp:
         self.cancel_button = ttk.Button(parent, text="❌ Cancel Render", command=self._cancel_render, style="danger.TButton", state=DISABLED)
         self.cancel_button.pack(fill=X, ipady=5)
 
+    def _snapshot(self) -> "ProjectSnapshot":
+        return ProjectSnapshot(copy.deepcopy(self.project), copy.deepcopy(self.pip_layout), copy.deepcopy(self.shape_style),
+                               copy.deepcopy(self.audio), copy.deepcopy(self.export), copy.deepcopy(self.timeline))
+
+    def _build_render_job(self, video1_path: str, output_path: str) -> RenderJob:
+        return self._snapshot().build_render_job(video1_path, output_path, reaction_aspect=self.aspect_ratio,
+                                                 batch=self.project.processing_mode == "Batch")
+
+    def _on_render_progress(self, output_path: str, frames_done: int, total_frames: int, fps: float):
+        progress = frames_done / total_frames * 100 if total_frames else 0
+        eta_sec = (total_frames - frames_done) / fps if fps > 0 else 0
+        self.queue_ui_update(self.file_progress_bar.config, value=progress)
+        self.queue_ui_update(self.status_label.config, text=_("status_render_eta", file=Path(output_path).name, progress=f"{progress:.0f}", eta=time.strftime('%H:%M:%S', time.gmtime(eta_sec))))
+
+    def _on_multi_output_change(self):
+        self.export.multi_output_presets = [preset for preset, var in self.multi_output_vars.items() if var.get()]
+
     def _render_single_video(self, video1_path: str, output_path: str, is_batch: bool = False):
         try:
             # ... (UI update awal tidak berubah)
             self.queue_ui_update(self.file_progress_bar.config, value=0)
             self.queue_ui_update(self.status_label.config, text=_("status_rendering", file=Path(output_path).name))
-            
-            v1_clip = mp.VideoFileClip(video1_path)
-            v2_clip = mp.VideoFileClip(self.project.video2_path)
-            
-            # --- Logika FPS (BARU) ---
-            render_fps = v1_clip.fps
-            if self.export.target_fps != "Auto":
-                try:
-                    render_fps = int(self.export.target_fps)
-                except ValueError:
-                    logger.warning(f"Nilai FPS tidak valid: {self.export.target_fps}. Kembali ke FPS sumber.")
-            
-            # ... (Looping/subclip video tidak berubah)
-            target_duration = v1_clip.duration
-            if v2_clip.duration < target_duration:
-                v2_clip = v2_clip.fx(mp.vfx.loop, duration=target_duration)
-                if v2_clip.audio: v2_clip.audio = v2_clip.audio.fx(audio_loop, duration=target_duration)
-            else:
-                v2_clip = v2_clip.subclip(0, target_duration)
-
-            def make_frame(t):
-                if self.cancel_render_event.is_set(): raise StopIteration("Render cancelled")
-                progress = (t / target_duration) * 100
-                self.queue_ui_update(self.file_progress_bar.config, value=progress)
-                frame1_rgb = v1_clip.get_frame(t)
-                frame2_rgb = v2_clip.get_frame(t)
-                frame1_bgr = cv2.cvtColor(frame1_rgb, cv2.COLOR_RGB2BGR)
-                frame2_bgr = cv2.cvtColor(frame2_rgb, cv2.COLOR_RGB2BGR)
-                composite_bgr = self._composite_single_frame(frame1_bgr, frame2_bgr)
-                return cv2.cvtColor(composite_bgr, cv2.COLOR_BGR2RGB)
-
-            final_clip = mp.VideoClip(make_frame, duration=target_duration)
-            final_audio = self._compose_audio(v1_clip.audio, v2_clip.audio)
-            if final_audio:
-                final_clip = final_clip.set_audio(final_audio)
-
-            # --- Logika Parameter FFmpeg (BARU) ---
-            codec = self.export.video_codec
-            ffmpeg_params = []
-            
-            # Fallback jika NVENC tidak tersedia
-            if "nvenc" in codec and not self.is_nvenc_available:
-                logger.warning(f"Codec {codec} tidak tersedia, fallback ke libx264.")
-                codec = "libx264"
-                self.queue_ui_update(self.status_label.config, text=f"Warning: {codec} tidak ada, fallback ke CPU.")
-            
-            # Atur parameter CRF/CQ berdasarkan codec
-            if "nvenc" in codec:
-                # NVENC menggunakan -cq atau -qp untuk VBR, bukan -crf
-                ffmpeg_params.extend(["-rc", "vbr", "-cq", str(self.export.crf)])
-            else: # CPU codecs (libx264, libx265)
-                ffmpeg_params.extend(["-crf", str(self.export.crf)])
-            
-            # Tambahkan preset
-            ffmpeg_params.extend(["-preset", self.export.preset])
-
-            final_clip.write_videofile(
-                output_path, 
-                fps=render_fps, # Menggunakan FPS yang sudah ditentukan
-                codec=codec,
-                audio_codec=self.export.audio_codec, 
-                audio_bitrate=self.export.audio_bitrate,
-                # preset=None, # Preset diatur manual via ffmpeg_params
-                threads=4,
-                ffmpeg_params=ffmpeg_params, 
-                logger=None
-            )
-            v1_clip.close()
-            v2_clip.close()
+
+            engine = RenderEngine(
+                self._build_render_job(video1_path, output_path), self.ffmpeg_path, self.ffprobe_path, self.available_encoders, self.cancel_render_event,
+                progress_cb=lambda done, total, fps: self._on_render_progress(output_path, done, total, fps),
+                status_cb=lambda text: self.queue_ui_update(self.status_label.config, text=text),
+                mask_cache=self.mask_cache, profiler=RenderProfiler(*self.profile_window) if self.profile_window else None)
+            engine.run()
 
             if not is_batch: self.queue_ui_update(self._on_render_finish, True, output_path)
             return True
-        except StopIteration:
+        except RenderCancelled:
             logger.warning(f"Render untuk {output_path} dibatalkan.")
-            if not is_batch: self.queue_ui_update(self._on_render_finish, False, output_path)
+            if not is_batch: self.queue_ui_update(self._on_render_finish, False, "")
             return False
         except Exception as e:
             logger.error(f"Error saat rendering {output_path}: {e}", exc_info=True)
@@ -416,12 +2677,37 @@ class ReactionVideoMakerApp:
         main_pane.add(sidebar_panel, weight=1)
 
     def _create_player_controls(self, parent):
+        # --- Filmstrip & Waveform Timeline ---
+        self.filmstrip_canvas = tk.Canvas(parent, height=THUMB_HEIGHT // 2, bg="#1c1c1c", highlightthickness=0)
+        self.filmstrip_canvas.pack(fill=X, padx=5, pady=(5, 0))
+        ToolTip(self.filmstrip_canvas, text=_("tooltip_filmstrip"))
+        self.waveform_canvas = tk.Canvas(parent, height=56, bg="#1c1c1c", highlightthickness=0)
+        self.waveform_canvas.pack(fill=X, padx=5)
+        self.waveform_canvas.bind("<Configure>", lambda e: self._draw_waveform())
+        ToolTip(self.waveform_canvas, text=_("tooltip_waveform"))
+        for strip in (self.filmstrip_canvas, self.waveform_canvas):
+            strip.bind("<ButtonPress-1>", self._on_waveform_press)
+            strip.bind("<B1-Motion>", self._on_waveform_drag)
+            strip.bind("<ButtonRelease-1>", self._on_scrub_end)
+            for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"): strip.bind(sequence, self._on_waveform_wheel)
         control_frame = ttk.Frame(parent, padding=5)
         control_frame.pack(fill=X)
         self.play_pause_btn = ttk.Button(control_frame, text="▶", command=self._toggle_play_pause, width=3)
         self.play_pause_btn.pack(side=LEFT, padx=(0, 5))
         self.time_label = ttk.Label(control_frame, text="00:00 / 00:00", width=15, anchor=E)
         self.time_label.pack(side=RIGHT, padx=(5, 0))
+        # --- Marker In/Out (rentang render) ---
+        clear_btn = ttk.Button(control_frame, text="✕", command=self._clear_range_markers, width=2, style="secondary.Outline.TButton")
+        clear_btn.pack(side=RIGHT, padx=(2, 0))
+        ToolTip(clear_btn, text=_("tooltip_clear_markers"))
+        out_btn = ttk.Button(control_frame, text="Out", command=self._set_out_point, width=4, style="secondary.Outline.TButton")
+        out_btn.pack(side=RIGHT, padx=(2, 0))
+        ToolTip(out_btn, text=_("tooltip_out_point"))
+        in_btn = ttk.Button(control_frame, text="In", command=self._set_in_point, width=4, style="secondary.Outline.TButton")
+        in_btn.pack(side=RIGHT, padx=(5, 0))
+        ToolTip(in_btn, text=_("tooltip_in_point"))
+        self.range_label = ttk.Label(control_frame, text="", anchor=E)
+        self.range_label.pack(side=RIGHT, padx=(5, 0))
         self.timeline_var = tk.DoubleVar()
         self.timeline_slider = ttk.Scale(control_frame, from_=0, to=100, variable=self.timeline_var, command=self._on_seek)
         self.timeline_slider.pack(fill=X, expand=True, side=LEFT)
@@ -482,6 +2768,14 @@ class ReactionVideoMakerApp:
         safe_area_slider.pack(fill=X)
         ToolTip(safe_area_slider, text=_("tooltip_safe_area"))
 
+        cache_frame = ttk.Labelframe(parent, text="Cache Frame Preview", padding=5)
+        cache_frame.pack(fill=X)
+        self.frame_cache_var = tk.BooleanVar(value=self.project.frame_cache_enabled)
+        cache_check = ttk.Checkbutton(cache_frame, text="Simpan frame di disk", variable=self.frame_cache_var, command=self._on_frame_cache_toggle, style="primary.Roundtoggle.Toolbutton")
+        cache_check.pack(side=LEFT)
+        ToolTip(cache_check, text=_("tooltip_frame_cache", budget=self.project.frame_cache_budget_mb))
+        ttk.Button(cache_frame, text="Kosongkan", command=self._clear_frame_cache, style="danger.Outline.TButton").pack(side=RIGHT)
+
         ttk.Separator(parent, orient=HORIZONTAL).pack(fill=X, pady=15)
         self.v1_title_label = ttk.Label(parent, text="Video 1 (Base)", font="-weight bold")
         self.v1_title_label.pack(anchor=W, pady=(10, 2))
@@ -494,6 +2788,18 @@ class ReactionVideoMakerApp:
         self.v2_path_label.pack(anchor=W)
         self.v2_info_label = ttk.Label(parent, text="Info: -")
         self.v2_info_label.pack(anchor=W)
+        offset_frame = ttk.Frame(parent)
+        offset_frame.pack(fill=X, pady=(5, 0))
+        ttk.Label(offset_frame, text="Offset Reaction (s):", width=18).pack(side=LEFT)
+        self.reaction_offset_var = tk.DoubleVar(value=self.timeline.reaction_offset_sec)
+        offset_spin = ttk.Spinbox(offset_frame, from_=-36000, to=36000, increment=0.1, textvariable=self.reaction_offset_var, command=self._on_reaction_offset_change, width=8)
+        offset_spin.pack(side=LEFT, fill=X, expand=True)
+        self.sync_button = ttk.Button(offset_frame, text="Auto", command=self._auto_sync_offset, width=5, style="info.Outline.TButton")
+        self.sync_button.pack(side=LEFT, padx=(5, 0))
+        ToolTip(self.sync_button, text=_("tooltip_auto_sync"))
+        offset_spin.bind("<Return>", self._on_reaction_offset_change)
+        offset_spin.bind("<FocusOut>", self._on_reaction_offset_change)
+        ToolTip(offset_spin, text=_("tooltip_reaction_offset"))
 
     def _populate_batch_tab(self, parent):
         controls_frame = ttk.Frame(parent)
@@ -607,6 +2913,9 @@ class ReactionVideoMakerApp:
         self.root.bind("<Home>", lambda e: self._seek_to_frame(0))
         self.root.bind("<End>", lambda e: self._seek_to_frame(self.timeline.total_frames - 1))
         self.root.bind("<s>", self._save_snapshot)
+        self.root.bind("<i>", self._set_in_point)
+        self.root.bind("<o>", self._set_out_point)
+        self.root.bind("<x>", self._clear_range_markers)
         self.root.bind("<Control-r>", self._start_render)
         self.canvas.bind("<Configure>", self._on_canvas_resize)
         self.canvas.bind("<ButtonPress-1>", self._on_pip_interaction_start)
@@ -659,6 +2968,17 @@ class ReactionVideoMakerApp:
             "frames": int(cap.get(cv2.CAP_PROP_FRAME_COUNT)),
         }
         meta["duration"] = meta["frames"] / meta["fps"] if meta["fps"] > 0 else 0
+        # Ukuran frame hasil decode (sudah termasuk rotasi otomatis) untuk cache frame
+        ret, first_frame = cap.read()
+        meta["frame_size"] = (first_frame.shape[1], first_frame.shape[0]) if ret else (meta["width"], meta["height"])
+        self._open_frame_cache(num, path, meta["frame_size"])
+        self._close_frame_reader(num)
+        self._invalidate_preview_sources()
+        threading.Thread(target=self._build_keyframe_index, args=(num, path), daemon=True, name=f"KeyframeIndex-{num}").start()
+        self.waveforms.pop(num, None)
+        threading.Thread(target=self._build_waveform, args=(num, path), daemon=True, name=f"Waveform-{num}").start()
+        self.thumbnail_strips.pop(num, None)
+        threading.Thread(target=self._build_thumbnails, args=(num, path), daemon=True, name=f"Thumbnails-{num}").start()
 
         if num == 1:
             if self.v1_cap: self.v1_cap.release()
@@ -683,22 +3003,162 @@ class ReactionVideoMakerApp:
         
         self.request_preview_update(force=True)
 
+    def _open_frame_cache(self, num: int, path: str, frame_size: Tuple[int, int]):
+        old = self.frame_caches.pop(num, None)
+        if old: old.close()
+        if not self.project.frame_cache_enabled: return
+        total_budget = self.project.frame_cache_budget_mb * 1024 * 1024
+        try:
+            self.frame_caches[num] = FrameCache(path, frame_size, total_budget // 2)
+            prune_frame_cache(total_budget, keep=tuple(c.data_path for c in self.frame_caches.values()))
+        except OSError as e:
+            logger.warning(f"Cache frame tidak dapat dibuat untuk {Path(path).name}: {e}")
+
+    def _build_keyframe_index(self, num: int, path: str):
+        # Thread background: ffprobe membaca seluruh paket sekali, hasilnya di-cache di disk
+        self.capabilities_ready.wait()
+        if not self.ffmpeg_path or not self.ffprobe_path: return
+        try:
+            index = load_keyframe_index(path, self.ffprobe_path)
+            size = media_frame_size(probe_media(path, self.ffprobe_path))
+        except (RuntimeError, OSError, ValueError) as e:
+            logger.warning(f"Indeks keyframe tidak tersedia untuk {Path(path).name}, preview memakai OpenCV: {e}")
+            return
+        self.queue_ui_update(self._on_keyframe_index_ready, num, path, index, size)
+
+    def _on_keyframe_index_ready(self, num: int, path: str, index: KeyframeIndex, size: Tuple[int, int]):
+        meta = self.v1_meta if num == 1 else self.v2_meta
+        if meta.get("path") != path: return # Sumber sudah diganti sebelum indeks selesai
+        self._close_frame_reader(num)
+        self._invalidate_preview_sources() # Penomoran frame kini mengikuti indeks, bukan OpenCV
+        self.frame_indexes[num] = index
+        self.frame_readers[num] = IndexedFrameReader(self.ffmpeg_path, path, size, index)
+        # Jumlah frame & durasi dari timestamp asli, bukan perkiraan OpenCV
+        meta.update(frames=index.frame_count, duration=index.duration, fps=index.fps)
+        if num == 1:
+            self.timeline.total_frames = index.frame_count
+            self.timeline.duration_sec = index.duration
+            self.timeline_slider.config(to=max(0, index.frame_count - 1))
+            self.timeline.current_frame = min(self.timeline.current_frame, max(0, index.frame_count - 1))
+            self._update_time_label()
+            self._update_range_label()
+        logger.info(f"Indeks keyframe siap: {Path(path).name} ({index.frame_count} frame, {len(index.keyframes)} keyframe)")
+        self.request_preview_update(force=True)
+
+    def _build_waveform(self, num: int, path: str):
+        # Thread background: peak audio di-cache di disk, buka ulang cukup memuat file .npz
+        self.capabilities_ready.wait()
+        if not self.ffmpeg_path: return
+        try:
+            if self.ffprobe_path and not probe_media(path, self.ffprobe_path).get("audio_codec"): return # Tanpa track audio
+            peaks = load_waveform_peaks(path, self.ffmpeg_path)
+        except (RuntimeError, OSError, ValueError) as e:
+            logger.warning(f"Waveform tidak tersedia untuk {Path(path).name}: {e}")
+            return
+        self.queue_ui_update(self._on_waveform_ready, num, path, peaks)
+
+    def _on_waveform_ready(self, num: int, path: str, peaks: WaveformPeaks):
+        meta = self.v1_meta if num == 1 else self.v2_meta
+        if meta.get("path") != path: return
+        self.waveforms[num] = peaks
+        self._draw_waveform()
+
+    def _build_thumbnails(self, num: int, path: str):
+        # Thread background: decode keyframe saja, sprite sheet di-cache di disk
+        self.capabilities_ready.wait()
+        if not self.ffmpeg_path or not self.ffprobe_path: return
+        try:
+            strip = load_thumbnail_strip(path, self.ffmpeg_path, self.ffprobe_path)
+        except (RuntimeError, OSError, ValueError) as e:
+            logger.warning(f"Thumbnail tidak tersedia untuk {Path(path).name}, drag slider memakai decode penuh: {e}")
+            return
+        self.queue_ui_update(self._on_thumbnails_ready, num, path, strip)
+
+    def _on_thumbnails_ready(self, num: int, path: str, strip: ThumbnailStrip):
+        meta = self.v1_meta if num == 1 else self.v2_meta
+        if meta.get("path") != path: return
+        self.thumbnail_strips[num] = strip
+        logger.info(f"Thumbnail siap: {Path(path).name} ({len(strip.tiles)} keyframe, tiap {strip.interval:g}s)")
+        self._draw_waveform()
+
+    def _close_frame_reader(self, num: int):
+        reader = self.frame_readers.pop(num, None)
+        if reader: reader.close()
+        self.frame_indexes.pop(num, None)
+
+    def _frame_time(self, num: int, frame: int) -> float:
+        index = self.frame_indexes.get(num)
+        if index: return index.time_of(frame)
+        fps = (self.v1_meta if num == 1 else self.v2_meta).get("fps", 0)
+        return frame / fps if fps > 0 else 0.0
+
+    def _frame_at(self, num: int, t: float) -> int:
+        index = self.frame_indexes.get(num)
+        if index: return index.frame_at(t)
+        fps = (self.v1_meta if num == 1 else self.v2_meta).get("fps", 0)
+        return int(t * fps + 1e-5) if fps > 0 else 0
+
+    def _decode_preview_frame(self, num: int, frame_index: int) -> Optional[np.ndarray]:
+        reader = self.frame_readers.get(num)
+        if reader:
+            frame = np.empty((reader.height, reader.width, 3), dtype=np.uint8)
+            return frame if reader.read(frame_index, frame) else None
+        cap = self.v1_cap if num == 1 else self.v2_cap
+        cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+        ret, frame = cap.read()
+        return frame if ret else None
+
+    def _read_preview_frame(self, num: int, frame_index: int) -> Optional[np.ndarray]:
+        # Frame yang pernah dilihat diambil dari memmap; selain itu decode lalu simpan versi kecilnya
+        cache = self.frame_caches.get(num)
+        if cache:
+            frame = cache.get(frame_index)
+            if frame is not None: return frame
+        frame = self._decode_preview_frame(num, frame_index)
+        if frame is None: return None
+        if not cache: return frame
+        return cache.put(frame_index, cv2.resize(frame, cache.size, interpolation=cv2.INTER_AREA))
+
+    def _on_frame_cache_toggle(self):
+        self.project.frame_cache_enabled = self.frame_cache_var.get()
+        self._reopen_frame_caches()
+
+    def _clear_frame_cache(self):
+        for cache in self.frame_caches.values(): cache.close()
+        self.frame_caches.clear()
+        prune_frame_cache(0)
+        logger.info("Cache frame preview dikosongkan.")
+        self._reopen_frame_caches()
+
+    def _reopen_frame_caches(self):
+        for num, cap, meta in ((1, self.v1_cap, self.v1_meta), (2, self.v2_cap, self.v2_meta)):
+            if cap: self._open_frame_cache(num, meta["path"], meta["frame_size"])
+
+    def _on_close(self):
+        for cache in self.frame_caches.values(): cache.close()
+        self.frame_caches.clear()
+        for num in list(self.frame_readers): self._close_frame_reader(num)
+        self.root.destroy()
+
     def _reset_timeline(self):
         self.timeline.is_playing = False
         self.timeline.current_frame = 0
         self.timeline.total_frames = self.v1_meta.get("frames", 0)
         self.timeline.duration_sec = self.v1_meta.get("duration", 0)
+        self.timeline.in_point_sec, self.timeline.out_point_sec = 0.0, None
         self.timeline_slider.config(to=self.timeline.total_frames - 1)
         self.timeline_var.set(0)
+        self.waveform_view = (0.0, None)
         self._update_time_label()
+        self._update_range_label()
         self.play_pause_btn.config(text="▶")
 
     def request_preview_update(self, force=False):
+        # Throttle ~60fps: event beruntun (drag, slider) digabung ke update yang sudah terjadwal
         if self._after_id_preview:
+            if not force: return
             self.root.after_cancel(self._after_id_preview)
-        
-        delay = 0 if force else 33 # Debounce by 33ms
-        self._after_id_preview = self.root.after(delay, self._generate_preview_frame)
+        self._after_id_preview = self.root.after(0 if force else 16, self._generate_preview_frame)
 
     def _generate_preview_frame(self):
         self._after_id_preview = None
@@ -706,40 +3166,94 @@ class ReactionVideoMakerApp:
             return
 
         try:
-            self.v1_cap.set(cv2.CAP_PROP_POS_FRAMES, self.timeline.current_frame)
-            self.v2_cap.set(cv2.CAP_PROP_POS_FRAMES, self.timeline.current_frame)
-            ret1, frame1 = self.v1_cap.read()
-            ret2, frame2 = self.v2_cap.read()
-            if not ret1:
-                self.v1_cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
-                ret1, frame1 = self.v1_cap.read()
-            if not ret2:
-                self.v2_cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
-                ret2, frame2 = self.v2_cap.read()
-
-            if ret1 and ret2:
-                composite_frame = self._composite_single_frame(frame1, frame2)
-                img = cv2.cvtColor(composite_frame, cv2.COLOR_BGR2RGB)
-                img_pil = Image.fromarray(img)
-                if not self.preview_queue.full():
-                    self.preview_queue.put(img_pil)
+            _, _, disp_w, disp_h, _ = self._get_preview_display_rect()
+            if disp_w <= 0 or disp_h <= 0: return
+            sources = self._get_preview_sources(self.timeline.current_frame, self._reaction_frame_for(self.timeline.current_frame), (disp_w, disp_h))
+            if sources is None: return
+            source_key, frame1, pip_src = sources
+
+            # Composite langsung di resolusi tampilan; layer base dipakai ulang selama frame & framing base sama
+            compositor = self._make_preview_compositor((disp_w, disp_h))
+            base_key = (source_key, disp_w, disp_h, self.project.fit_mode, self.project.output_resolution)
+            if self._preview_base_layer is None or self._preview_base_layer[0] != base_key:
+                self._preview_base_layer = (base_key, compositor.render_base(frame1[None])[0])
+            base_layer = self._preview_base_layer[1]
+            if self._preview_frame is None or self._preview_frame.shape != base_layer.shape:
+                self._preview_frame = np.empty_like(base_layer)
+            np.copyto(self._preview_frame, base_layer)
+            compositor.blend_pip(self._preview_frame[None], pip_src[None])
+            self._present_preview_frame(self._preview_frame)
         except Exception as e:
             logger.error(f"Error generating preview frame: {e}")
 
+    def _get_preview_sources(self, base_index: int, reaction_index: int, display_size: Tuple[int, int]):
+        # Decode hanya saat playhead berubah; reaction diperkecil sekali ke ukuran tampilan agar resize PiP saat drag murah
+        key = (base_index, reaction_index, self.v1_meta.get("path"), self.v2_meta.get("path"), display_size)
+        if self._preview_sources and self._preview_sources[0] == key: return self._preview_sources
+        frame1 = self._read_preview_frame(1, base_index)
+        frame2 = self._read_preview_frame(2, reaction_index)
+        if frame1 is None: frame1 = self._read_preview_frame(1, 0)
+        if frame2 is None: frame2 = self._read_preview_frame(2, 0)
+        if frame1 is None or frame2 is None: return None
+        h, w = frame2.shape[:2]
+        scale = min(display_size[0] / w, display_size[1] / h)
+        if scale < 1: frame2 = cv2.resize(frame2, (max(1, int(w * scale)), max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+        self._preview_sources = (key, frame1, frame2)
+        return self._preview_sources
+
+    def _invalidate_preview_sources(self):
+        self._preview_sources = None
+        self._preview_base_layer = None
+
+    def _make_preview_compositor(self, display_size: Tuple[int, int]) -> FrameCompositor:
+        project, pip_layout = scaled_layout(self.project, self.pip_layout, display_size)
+        out_w = parse_resolution(self.project.output_resolution)[0]
+        scale = display_size[0] / out_w
+        shape_style = dataclasses.replace(self.shape_style, stroke_width=int(round(self.shape_style.stroke_width * scale)), corner_radius=int(round(self.shape_style.corner_radius * scale)))
+        return FrameCompositor.for_layout(project, pip_layout, shape_style, mask_cache=self.mask_cache)
+
+    def _present_preview_frame(self, frame: np.ndarray):
+        # Resize + konversi warna langsung ke buffer tampilan; alokasi baru hanya saat ukuran tampilan berubah
+        _, _, disp_w, disp_h, _ = self._get_preview_display_rect()
+        if disp_w <= 0 or disp_h <= 0: return
+        if self._display_rgba is None or self._display_rgba.shape[:2] != (disp_h, disp_w):
+            self._display_bgr = np.empty((disp_h, disp_w, 3), dtype=np.uint8)
+            self._display_rgba = np.empty((disp_h, disp_w, 4), dtype=np.uint8)
+            # Image PIL berbagi memori dengan buffer RGBA (tanpa salinan)
+            self._display_pil = Image.frombuffer("RGBA", (disp_w, disp_h), self._display_rgba, "raw", "RGBA", 0, 1)
+        src = frame
+        if frame.shape[:2] != (disp_h, disp_w):
+            cv2.resize(frame, (disp_w, disp_h), dst=self._display_bgr, interpolation=cv2.INTER_AREA)
+            src = self._display_bgr
+        cv2.cvtColor(src, cv2.COLOR_BGR2RGBA, dst=self._display_rgba)
+        self._preview_frame_ready = True
+
     def _update_preview_canvas(self):
-        try:
-            img_pil = self.preview_queue.get_nowait()
-            disp_x, disp_y, disp_w, disp_h, _ = self._get_preview_display_rect()
-            if disp_w > 0 and disp_h > 0:
-                img_pil.thumbnail((disp_w, disp_h), Image.Resampling.LANCZOS)
-                self.photo = ImageTk.PhotoImage(image=img_pil)
-                self.canvas.delete("all")
-                self.canvas.create_image(disp_x, disp_y, anchor=NW, image=self.photo)
-        except queue.Empty:
-            pass
-        self.canvas.delete("overlays")
-        self._draw_overlays()
-        self.root.after(33, self._update_preview_canvas)
+        if self._preview_frame_ready:
+            self._preview_frame_ready = False
+            disp_x, disp_y, _, _, _ = self._get_preview_display_rect()
+            if self.photo is None or (self.photo.width(), self.photo.height()) != self._display_pil.size:
+                self.photo = ImageTk.PhotoImage(image=self._display_pil)
+                if self.preview_item is None:
+                    self.preview_item = self.canvas.create_image(disp_x, disp_y, anchor=NW, image=self.photo)
+                    self.canvas.tag_lower(self.preview_item)
+                else:
+                    self.canvas.itemconfig(self.preview_item, image=self.photo)
+            else:
+                self.photo.paste(self._display_pil)
+            self.canvas.coords(self.preview_item, disp_x, disp_y)
+        # Overlay hanya digambar ulang jika geometri PiP / safe area / ukuran tampilan berubah
+        overlay_key = self._get_overlay_key()
+        if overlay_key != self._overlay_key:
+            self._overlay_key = overlay_key
+            self.canvas.delete("overlays")
+            self._draw_overlays()
+        self.root.after(16, self._update_preview_canvas)
+
+    def _get_overlay_key(self):
+        display_rect = self._get_preview_display_rect()
+        pip_rect = self._get_pip_display_rect(display_rect[4]) if self.v2_cap and display_rect[4] else None
+        return display_rect, pip_rect, self.project.safe_area.enabled, self.project.safe_area.margin_percent
 
     def _draw_overlays(self):
         disp_x, disp_y, disp_w, disp_h, scale = self._get_preview_display_rect()
@@ -760,35 +3274,61 @@ class ReactionVideoMakerApp:
         return [(x, y), (x + w, y), (x, y + h), (x + w, y + h), (x + w / 2, y), (x + w / 2, y + h), (x, y + h / 2), (x + w, y + h / 2)]
 
     def _preview_playback_manager(self):
+        # Jadwal frame mengikuti timestamp asli (VFR) relatif terhadap jam saat play dimulai, jadi tidak drift
+        anchor = None
         while True:
             if not self.timeline.is_playing or self.timeline.is_scrubbing or not self.v1_meta:
+                anchor = None
                 time.sleep(0.05)
                 continue
 
             if self.timeline.current_frame >= self.timeline.total_frames -1:
                 self.queue_ui_update(self._toggle_play_pause)
                 self.timeline.current_frame = 0
+                anchor = None
                 continue
-            
+
+            if anchor is None or anchor[2] != self.timeline.current_frame: # Mulai play atau ada seek
+                anchor = (time.perf_counter(), self._frame_time(1, self.timeline.current_frame), self.timeline.current_frame)
             self.timeline.current_frame += 1
             self.queue_ui_update(self.timeline_var.set, self.timeline.current_frame)
             self.queue_ui_update(self._update_time_label)
             self.request_preview_update()
-            
-            playback_fps = self.v1_meta.get("fps", 30)
-            sleep_duration = 1.0 / playback_fps if playback_fps > 0 else 0.033
-            time.sleep(sleep_duration)
+
+            wall_start, media_start, _frame = anchor
+            anchor = (wall_start, media_start, self.timeline.current_frame)
+            delay = wall_start + (self._frame_time(1, self.timeline.current_frame) - media_start) - time.perf_counter()
+            time.sleep(delay if delay > 0 else 0.001)
 
     def _on_preset_change(self, event=None):
+        # Simpan layout preset lama agar multi-output & pergantian preset memakai layout masing-masing
+        self.project.preset_layouts[self.project.output_preset] = {"output_resolution": self.project.output_resolution, "pip_layout": asdict(self.pip_layout)}
         preset = self.preset_var.get()
         self.project.output_preset = preset
-        if "9:16" in preset: self.project.output_resolution = "1080x1920"
-        elif "1:1" in preset: self.project.output_resolution = "1080x1080"
-        else: self.project.output_resolution = "1920x1080"
+        stored = self.project.preset_layouts.get(preset)
+        if stored and self.v2_meta:
+            self.project.output_resolution = stored["output_resolution"]
+            self.pip_layout = _dataclass_from_dict(PipLayoutState, stored["pip_layout"])
+            self._sync_pip_controls()
+            self.resolution_var.set(self.project.output_resolution)
+            self._update_resolution_options()
+            self.request_preview_update(force=True)
+            return
+        self.project.output_resolution = default_resolution_for_preset(preset)
         self.resolution_var.set(self.project.output_resolution)
         self._update_resolution_options()
         self._on_resolution_change()
-        
+
+    def _sync_pip_controls(self):
+        self.pip_scale_var.set(self.pip_layout.scale_percent)
+        self.pip_scale_label.config(text=f"Ukuran PiP ({self.pip_layout.scale_percent:.0f}%)")
+        self.pip_rotation_var.set(self.pip_layout.rotation)
+        self.pip_opacity_var.set(self.pip_layout.opacity)
+        self.pip_lock_aspect_var.set(self.pip_layout.lock_aspect)
+        self.pip_shadow_enabled_var.set(self.pip_layout.shadow.enabled)
+        self.pip_rotation_label.config(text=f"Rotasi ({self.pip_layout.rotation:.0f}°)")
+        self.pip_opacity_label.config(text=f"Opacity ({self.pip_layout.opacity:.0f}%)")
+
     def _on_resolution_change(self, event=None):
         self.project.output_resolution = self.resolution_var.get()
         self._update_pip_geometry_from_scale(recalculate_pos=True)
@@ -812,8 +3352,8 @@ class ReactionVideoMakerApp:
 
     def _seek_relative(self, seconds):
         if not self.v1_meta: return
-        fps = self.v1_meta.get("fps", 30)
-        target_frame = self.timeline.current_frame + int(seconds * fps)
+        target_frame = self._frame_at(1, self._frame_time(1, self.timeline.current_frame) + seconds)
+        if target_frame == self.timeline.current_frame: target_frame += 1 if seconds > 0 else -1
         self._seek_to_frame(target_frame)
 
     def _seek_to_frame(self, frame_num):
@@ -825,7 +3365,39 @@ class ReactionVideoMakerApp:
 
     def _on_seek(self, value):
         if self.timeline.is_scrubbing:
-            self._seek_to_frame(float(value))
+            self._scrub_to_frame(float(value))
+
+    def _scrub_to_frame(self, frame_num):
+        # Selama drag preview memakai thumbnail keyframe (tanpa decode); decode penuh baru di _on_scrub_end
+        if self.timeline.total_frames == 0: return
+        if not self.thumbnail_strips.get(1) or not self.v2_cap or self.rendering_process:
+            self._seek_to_frame(frame_num)
+            return
+        self.timeline.current_frame = max(0, min(int(frame_num), self.timeline.total_frames - 1))
+        self.timeline_var.set(self.timeline.current_frame)
+        self._update_time_label()
+        if self._after_id_preview:
+            self.root.after_cancel(self._after_id_preview)
+            self._after_id_preview = None
+        self._present_scrub_placeholder()
+
+    def _present_scrub_placeholder(self):
+        _, _, disp_w, disp_h, _ = self._get_preview_display_rect()
+        if disp_w <= 0 or disp_h <= 0: return
+        base_frame = self.thumbnail_strips[1].thumbnail_at(self._frame_time(1, self.timeline.current_frame))
+        reaction_strip = self.thumbnail_strips.get(2)
+        if reaction_strip: pip_frame = reaction_strip.thumbnail_at(self._reaction_time_for(self.timeline.current_frame))
+        elif self._preview_sources: pip_frame = self._preview_sources[2] # Reaction terakhir yang sudah di-decode
+        else:
+            self.request_preview_update(force=True)
+            return
+        try:
+            compositor = self._make_preview_compositor((disp_w, disp_h))
+            frame = compositor.render_base(base_frame[None])[0]
+            compositor.blend_pip(frame[None], pip_frame[None])
+            self._present_preview_frame(frame)
+        except Exception as e:
+            logger.error(f"Error generating scrub placeholder: {e}")
 
     def _on_scrub_start(self, event=None):
         self.timeline.is_scrubbing = True
@@ -843,107 +3415,214 @@ class ReactionVideoMakerApp:
 
     def _update_time_label(self):
         if not self.v1_meta: return
-        fps = self.v1_meta.get('fps', 30)
-        if fps == 0: return
-        current_time_str = time.strftime('%M:%S', time.gmtime(self.timeline.current_frame / fps))
+        current_time_str = time.strftime('%M:%S', time.gmtime(self._frame_time(1, self.timeline.current_frame)))
         total_time_str = time.strftime('%M:%S', time.gmtime(self.timeline.duration_sec))
         self.time_label.config(text=f"{current_time_str} / {total_time_str}")
+        self._draw_waveform_playhead()
+
+    # --- Waveform Timeline ---
+    def _waveform_window(self) -> Tuple[float, float]:
+        duration = self.timeline.duration_sec
+        start, span = self.waveform_view
+        span = duration if span is None else min(span, duration)
+        return min(max(start, 0.0), max(duration - span, 0.0)), span
+
+    def _draw_waveform(self):
+        # Satu polygon per track: puncak atas lalu bawah, satu kolom per piksel lebar
+        canvas = self.waveform_canvas
+        canvas.delete("waveform")
+        self._draw_filmstrip()
+        w, h = canvas.winfo_width(), canvas.winfo_height()
+        start, span = self._waveform_window()
+        if w < 2 or h < 4 or span <= 0: return
+        edges = start + np.arange(w + 1) * (span / w)
+        reaction_edges = edges + self.timeline.reaction_offset_sec
+        reaction_duration = self.v2_meta.get("duration", 0)
+        if reaction_duration > 0: reaction_edges = np.where(reaction_edges >= 0, reaction_edges % reaction_duration, reaction_edges) # Loop seperti preview & render
+        band, xs = h / 2, np.arange(w) + 0.5
+        for row, (num, track_edges, color) in enumerate(((1, edges, "#3b8ed0"), (2, reaction_edges, "#e0a030"))):
+            peaks = self.waveforms.get(num)
+            if not peaks: continue
+            lo, hi = peaks.column_peaks(track_edges)
+            mid, amp = band * row + band / 2, band / 2 - 1
+            outline = np.concatenate((np.column_stack((xs, mid - hi * amp)), np.column_stack((xs[::-1], mid - lo[::-1] * amp))))
+            canvas.create_polygon(outline.ravel().tolist(), fill=color, outline=color, tags="waveform")
+        out_sec = self.timeline.duration_sec if self.timeline.out_point_sec is None else self.timeline.out_point_sec
+        for t in (self.timeline.in_point_sec, out_sec):
+            if 0 < t < self.timeline.duration_sec and start <= t <= start + span:
+                x = (t - start) / span * w
+                canvas.create_line(x, 0, x, h, fill="#7fdc7f", dash=(3, 2), tags="waveform")
+        self._draw_waveform_playhead()
+
+    def _draw_filmstrip(self):
+        # Tile thumbnail (setengah ukuran) disusun jadi satu gambar selebar canvas, mengikuti jendela zoom waveform
+        canvas = self.filmstrip_canvas
+        canvas.delete("filmstrip")
+        strip = self.thumbnail_strips.get(1)
+        w, h = canvas.winfo_width(), canvas.winfo_height()
+        start, span = self._waveform_window()
+        if not strip or w < 2 or span <= 0: return
+        tiles = strip.tiles[:, ::2, ::2]
+        tw = tiles.shape[2]
+        slots = -(-w // tw)
+        indices = [strip.index_at(start + (i + 0.5) * tw / w * span) for i in range(slots)]
+        row = tiles[indices].transpose(1, 0, 2, 3).reshape(tiles.shape[1], slots * tw, 3)[:, :w, ::-1]
+        self._filmstrip_photo = ImageTk.PhotoImage(image=Image.fromarray(np.ascontiguousarray(row)))
+        canvas.create_image(0, (h - row.shape[0]) // 2, anchor=NW, image=self._filmstrip_photo, tags="filmstrip")
+
+    def _draw_waveform_playhead(self):
+        canvas = self.waveform_canvas
+        canvas.delete("playhead")
+        start, span = self._waveform_window()
+        if span <= 0: return
+        t = self._frame_time(1, self.timeline.current_frame)
+        if self.timeline.is_playing and not start <= t < start + span:
+            # Saat play, tampilan yang di-zoom ikut bergeser satu halaman
+            self.waveform_view = (t, span)
+            self._draw_waveform()
+            return
+        x = (t - start) / span * canvas.winfo_width()
+        canvas.create_line(x, 0, x, canvas.winfo_height(), fill="white", width=1, tags="playhead")
+
+    def _waveform_time_at(self, x: float) -> float:
+        start, span = self._waveform_window()
+        return start + min(max(x / max(self.waveform_canvas.winfo_width(), 1), 0.0), 1.0) * span
+
+    def _on_waveform_press(self, event):
+        self._on_scrub_start()
+        self._on_waveform_drag(event)
+
+    def _on_waveform_drag(self, event):
+        if not self.v1_meta: return
+        self._scrub_to_frame(self._frame_at(1, self._waveform_time_at(event.x)))
+
+    def _on_waveform_wheel(self, event):
+        duration = self.timeline.duration_sec
+        if duration <= 0: return
+        direction = 1 if event.num == 4 or getattr(event, "delta", 0) > 0 else -1
+        start, old_span = self._waveform_window()
+        span = old_span
+        if event.state & 0x0001: # Shift: geser
+            start -= direction * span * 0.2
+        else: # Zoom di posisi kursor
+            anchor = self._waveform_time_at(event.x)
+            span = min(max(old_span * (0.8 ** direction), WAVEFORM_MIN_SPAN_SEC), duration)
+            start = anchor - (anchor - start) * span / old_span
+        self.waveform_view = (start, None if span >= duration else span)
+        self._draw_waveform()
+
+    def _reaction_frame_for(self, base_frame: int) -> int:
+        # Frame reaction yang tampil bersama frame base (offset + loop seperti saat render), lewat timestamp asli
+        if self.v1_meta.get("fps", 0) <= 0 or self.v2_meta.get("fps", 0) <= 0: return base_frame
+        return self._frame_at(2, self._reaction_time_for(base_frame))
+
+    def _reaction_time_for(self, base_frame: int) -> float:
+        t = max(0.0, self._frame_time(1, base_frame) + self.timeline.reaction_offset_sec)
+        reaction_duration = self.v2_meta.get("duration", 0)
+        return t % reaction_duration if reaction_duration > 0 else t
+
+    def _on_reaction_offset_change(self, event=None):
+        try:
+            offset = float(self.reaction_offset_var.get())
+        except (tk.TclError, ValueError):
+            self.reaction_offset_var.set(self.timeline.reaction_offset_sec)
+            return
+        self._set_reaction_offset(offset)
+
+    def _set_reaction_offset(self, offset: float):
+        self.timeline.reaction_offset_sec = offset
+        if offset < 0 and self.timeline.in_point_sec < -offset:
+            # Sebelum -offset belum ada gambar reaction; in point digeser agar terlihat di timeline (render_range juga membatasinya)
+            self.timeline.in_point_sec = -offset
+            if self.timeline.out_point_sec is not None and self.timeline.out_point_sec <= self.timeline.in_point_sec: self.timeline.out_point_sec = None
+        self._update_range_label()
+        self.request_preview_update(force=True)
+
+    def _auto_sync_offset(self):
+        if not self.v1_meta or not self.v2_meta: return
+        self.sync_button.config(state=DISABLED)
+        self.status_label.config(text="Mendeteksi offset dari audio...")
+        threading.Thread(target=self._detect_sync_offset, args=(self.v1_meta["path"], self.v2_meta["path"]), daemon=True, name="AudioSync").start()
+
+    def _detect_sync_offset(self, base_path: str, reaction_path: str):
+        # Peak audio yang sama dengan waveform timeline (biasanya sudah di cache), lalu korelasi onset via FFT
+        self.capabilities_ready.wait()
+        try:
+            offset, confidence = estimate_sync_offset(load_waveform_peaks(base_path, self.ffmpeg_path), load_waveform_peaks(reaction_path, self.ffmpeg_path))
+        except (RuntimeError, OSError, ValueError) as e:
+            self.queue_ui_update(self._on_sync_offset_detected, base_path, reaction_path, None, 0.0, str(e))
+            return
+        self.queue_ui_update(self._on_sync_offset_detected, base_path, reaction_path, offset, confidence, "")
+
+    def _on_sync_offset_detected(self, base_path: str, reaction_path: str, offset: Optional[float], confidence: float, error: str):
+        self.sync_button.config(state=NORMAL)
+        if self.v1_meta.get("path") != base_path or self.v2_meta.get("path") != reaction_path: return
+        if offset is None:
+            logger.warning(f"Sinkronisasi audio gagal: {error}")
+            self.status_label.config(text="Sinkronisasi audio gagal.")
+            messagebox.showerror("Auto Sync", f"Sinkronisasi audio gagal:\n{error}")
+            return
+        logger.info(f"Offset sinkron audio: {offset:+.3f}s (skor {confidence:.1f})")
+        if confidence < SYNC_MIN_CONFIDENCE:
+            self.status_label.config(text="Tidak ada kecocokan audio yang jelas; offset tidak diubah.")
+            messagebox.showwarning("Auto Sync", f"Audio kedua video tidak cocok dengan jelas (skor {confidence:.1f}, minimal {SYNC_MIN_CONFIDENCE:g}).\nOffset tidak diubah.")
+            return
+        self.reaction_offset_var.set(round(offset, 3))
+        self._set_reaction_offset(offset)
+        self.status_label.config(text=f"Offset reaction disetel ke {offset:+.3f}s dari audio (skor {confidence:.1f}).")
+
+    def _set_in_point(self, event=None):
+        if not self.v1_meta or self.v1_meta.get("fps", 0) <= 0: return
+        self.timeline.in_point_sec = self._frame_time(1, self.timeline.current_frame)
+        if self.timeline.out_point_sec is not None and self.timeline.out_point_sec <= self.timeline.in_point_sec:
+            self.timeline.out_point_sec = None
+        self._update_range_label()
+
+    def _set_out_point(self, event=None):
+        if not self.v1_meta or self.v1_meta.get("fps", 0) <= 0: return
+        # Out point inklusif: frame di playhead ikut dirender (sampai frame berikutnya dimulai)
+        next_frame = self.timeline.current_frame + 1
+        self.timeline.out_point_sec = self._frame_time(1, next_frame) if next_frame < self.timeline.total_frames else self.timeline.duration_sec
+        if self.timeline.in_point_sec >= self.timeline.out_point_sec:
+            self.timeline.in_point_sec = 0.0
+        self._update_range_label()
+
+    def _clear_range_markers(self, event=None):
+        self.timeline.in_point_sec, self.timeline.out_point_sec = 0.0, None
+        self._update_range_label()
+
+    def _update_range_label(self):
+        self._draw_waveform()
+        if self.timeline.in_point_sec <= 0 and self.timeline.out_point_sec is None:
+            self.range_label.config(text="")
+            return
+        out_sec = self.timeline.duration_sec if self.timeline.out_point_sec is None else self.timeline.out_point_sec
+        self.range_label.config(text=f"[{time.strftime('%M:%S', time.gmtime(self.timeline.in_point_sec))} – {time.strftime('%M:%S', time.gmtime(out_sec))}]")
 
     def _save_snapshot(self, event=None):
         path = filedialog.asksaveasfilename(defaultextension=".png", filetypes=[("PNG Image", "*.png")])
         if not path: return
         if not self.v1_cap or not self.v2_cap: return
-        self.v1_cap.set(cv2.CAP_PROP_POS_FRAMES, self.timeline.current_frame)
-        self.v2_cap.set(cv2.CAP_PROP_POS_FRAMES, self.timeline.current_frame)
-        ret1, frame1 = self.v1_cap.read()
-        ret2, frame2 = self.v2_cap.read()
-        if ret1 and ret2:
+        # Snapshot memakai frame resolusi penuh, bukan versi kecil dari cache frame
+        frame1 = self._decode_preview_frame(1, self.timeline.current_frame)
+        frame2 = self._decode_preview_frame(2, self._reaction_frame_for(self.timeline.current_frame))
+        if frame1 is not None and frame2 is not None:
             composite_frame = self._composite_single_frame(frame1, frame2)
             cv2.imwrite(path, composite_frame)
             logger.info(f"Snapshot saved to {path}")
 
-    def _composite_single_frame(self, base_frame, pip_frame):
-        out_w, out_h = self._get_output_dims()
-        base_resized = self._resize_with_aspect(base_frame, out_w, out_h, self.project.fit_mode)
-        output_frame = np.zeros((out_h, out_w, 3), dtype=np.uint8)
-        x_off, y_off = (out_w - base_resized.shape[1]) // 2, (out_h - base_resized.shape[0]) // 2
-        output_frame[y_off:y_off+base_resized.shape[0], x_off:x_off+base_resized.shape[1]] = base_resized
-        pip_w, pip_h = self.pip_layout.width, self.pip_layout.height
-        if pip_w <= 0 or pip_h <= 0: return output_frame
-        
-        pip_resized = cv2.resize(pip_frame, (pip_w, pip_h), interpolation=cv2.INTER_AREA)
-        
-        inner_mask = self._create_pip_mask((pip_w, pip_h))
-        full_mask = inner_mask.copy()
-        
-        final_pip_element = np.zeros((pip_h, pip_w, 3), dtype=np.uint8)
-
-        if self.shape_style.stroke_width > 0:
-            stroke_mask = self._create_pip_mask((pip_w, pip_h), is_stroke=True)
-            stroke_color_bgr = tuple(int(self.shape_style.stroke_color.lstrip('#')[i:i+2], 16) for i in (4, 2, 0))
-            final_pip_element[stroke_mask > 0] = stroke_color_bgr
-            full_mask = cv2.bitwise_or(inner_mask, stroke_mask)
-        
-        final_pip_element[inner_mask > 0] = pip_resized[inner_mask > 0]
-        
-        x, y = self.pip_layout.x, self.pip_layout.y
-        x1, y1 = max(x, 0), max(y, 0)
-        x2, y2 = min(x + pip_w, out_w), min(y + pip_h, out_h)
-        w_valid, h_valid = x2 - x1, y2 - y1
-
-        if w_valid > 0 and h_valid > 0:
-            pip_sub = final_pip_element[y1-y:y1-y+h_valid, x1-x:x1-x+w_valid]
-            mask_sub = full_mask[y1-y:y1-y+h_valid, x1-x:x1-x+w_valid]
-            roi = output_frame[y1:y2, x1:x2]
-            mask_inv = cv2.bitwise_not(mask_sub)
-            bg = cv2.bitwise_and(roi, roi, mask=mask_inv)
-            fg = cv2.bitwise_and(pip_sub, pip_sub, mask=mask_sub)
-            output_frame[y1:y2, x1:x2] = cv2.add(bg, fg)
-
-        return output_frame
-
-    def _create_pip_mask(self, size: Tuple[int, int], is_stroke=False) -> np.ndarray:
-        w, h = size
-        if w <= 0 or h <= 0: return np.zeros((h, w), dtype=np.uint8)
-        
-        stroke_width = self.shape_style.stroke_width if is_stroke else 0
-        cache_key = (w, h, is_stroke, self.shape_style.shape, self.shape_style.corner_radius, self.shape_style.polygon_sides, stroke_width)
-        if cache_key in self.mask_cache:
-            return self.mask_cache[cache_key]
-        
-        img = Image.new('L', (w, h), 0)
-        draw = ImageDraw.Draw(img)
-        shape = self.shape_style.shape
-        shape_box = [0, 0, w, h]
-
-        if shape == "Full (No Mask)": draw.rectangle(shape_box, fill=255)
-        elif shape == "Kotak (Square)":
-            min_dim = min(w, h)
-            offset_x, offset_y = (w - min_dim) // 2, (h - min_dim) // 2
-            draw.rectangle([offset_x, offset_y, w - offset_x, h - offset_y], fill=255)
-        elif shape == "Bulat (Circle)":
-            min_dim = min(w, h)
-            offset_x, offset_y = (w - min_dim) // 2, (h - min_dim) // 2
-            draw.ellipse([offset_x, offset_y, w - offset_x, h - offset_y], fill=255)
-        elif shape == "Rounded Rect": draw.rounded_rectangle(shape_box, radius=self.shape_style.corner_radius, fill=255)
-        elif shape == "Polygon":
-            sides, center_x, center_y, radius = self.shape_style.polygon_sides, w / 2, h / 2, min(w, h) / 2
-            points = [(center_x + radius * math.cos(math.radians(360/sides*i - 90)), center_y + radius * math.sin(math.radians(360/sides*i - 90))) for i in range(sides)]
-            draw.polygon(points, fill=255)
+    def _make_compositor(self) -> FrameCompositor:
+        return FrameCompositor.for_layout(self.project, self.pip_layout, self.shape_style, mask_cache=self.mask_cache)
 
-        mask = np.array(img)
-        
-        if is_stroke and self.shape_style.stroke_width > 0:
-            kernel = np.ones((3, 3), np.uint8)
-            dilated = cv2.dilate(mask, kernel, iterations=int(self.shape_style.stroke_width / 1.5))
-            result = cv2.subtract(dilated, mask)
-            self.mask_cache[cache_key] = result
-            return result
-        
-        self.mask_cache[cache_key] = mask
-        return mask
+    def _composite_single_frame(self, base_frame, pip_frame):
+        return self._make_compositor().composite(base_frame, pip_frame)
 
     def _start_render(self, event=None):
+        if not self.capabilities_ready.is_set():
+            # Probe FFmpeg/encoder masih berjalan di background; coba lagi sebentar lagi
+            self.status_label.config(text="Menunggu pemeriksaan FFmpeg/encoder selesai...")
+            self.root.after(250, self._start_render)
+            return
         if not self.ffmpeg_path:
             self._show_ffmpeg_warning()
             return
@@ -973,13 +3652,26 @@ class ReactionVideoMakerApp:
             self._on_render_finish(False, "")
             return
         self.project.output_dir = output_dir
-        
+
+        journal = BatchJournal(output_dir)
+        journal.cleanup_stale_partials()
+        sources = [self.batch_tree.item(item_id, 'values')[0] for item_id in self.batch_tree.get_children()]
+        done_count = journal.count_done(sources, self._settings_hash())
+        if done_count and not messagebox.askyesno("Resume Batch", _("confirm_resume_batch", done=done_count, total=len(sources))):
+            journal.reset()
+        self.batch_journal = journal
+
         render_thread = threading.Thread(target=self._render_batch, daemon=True, name="RenderBatchThread")
         render_thread.start()
 
+    def _settings_hash(self) -> str:
+        return self._snapshot().settings_hash()
+
     def _render_batch(self):
         items = self.batch_tree.get_children()
         total_videos = len(items)
+        journal = self.batch_journal
+        settings_hash = self._settings_hash()
         self.queue_ui_update(self.total_progress_bar.config, value=0)
 
         for i, item_id in enumerate(items):
@@ -988,13 +3680,24 @@ class ReactionVideoMakerApp:
                 break
             
             video1_path = self.batch_tree.item(item_id, 'values')[0]
-            self.queue_ui_update(self.batch_tree.set, item_id, column="status", value="Running")
-            
-            output_filename = f"{Path(video1_path).stem}_reaction.mp4"
+            output_filename = self._snapshot().batch_output_name(video1_path)
             output_path = str(Path(self.project.output_dir) / output_filename)
+
+            if journal.is_done(video1_path, settings_hash):
+                logger.info(f"Dilewati (sudah selesai di jurnal): {video1_path}")
+                self.queue_ui_update(self.batch_tree.set, item_id, column="status", value="Done")
+                self.queue_ui_update(self.total_progress_bar.config, value=(i + 1) / total_videos * 100)
+                continue
+
+            self.queue_ui_update(self.batch_tree.set, item_id, column="status", value="Running")
+            outputs = [t.output_path for t in self._build_render_job(video1_path, output_path).targets]
+            journal.record(video1_path, "running", outputs=outputs, partials=[partial_output_path(o) for o in outputs])
             
             success = self._render_single_video(video1_path, output_path, is_batch=True)
             
+            if success: journal.record(video1_path, "done", outputs=outputs, settings=settings_hash)
+            elif self.cancel_render_event.is_set(): journal.record(video1_path, "cancelled")
+            else: journal.record(video1_path, "failed")
             status = "Done" if success else "Failed"
             self.queue_ui_update(self.batch_tree.set, item_id, column="status", value=status)
             self.queue_ui_update(self.total_progress_bar.config, value=(i + 1) / total_videos * 100)
@@ -1011,11 +3714,11 @@ class ReactionVideoMakerApp:
                 if self.rendering_process:
                     self.rendering_process.terminate()
                 self.status_label.config(text=_("status_render_cancelled"))
-                self._on_render_finish(False, "")
+                # Tombol render diaktifkan lagi oleh thread render setelah encoder benar-benar berhenti
+                self.cancel_button.config(state=DISABLED)
 
     def _on_render_finish(self, success, output_path):
         self.rendering_process = None
-        self.cancel_render_event.clear()
         self.render_button.config(state=NORMAL if self.v1_cap and self.v2_cap else DISABLED)
         self.cancel_button.config(state=DISABLED)
         if success and not Path(output_path).is_dir():
@@ -1023,34 +3726,8 @@ class ReactionVideoMakerApp:
         elif not success and output_path:
              self.status_label.config(text=_("status_render_error"))
 
-    def _compose_audio(self, audio1, audio2):
-        if self.audio.v1_mute: audio1 = None
-        if self.audio.v2_mute: audio2 = None
-        if not audio1 and not audio2: return None
-        if not audio1: return audio2
-        if not audio2: return audio1
-        mode = self.audio.mode
-        if mode == "Base only": return audio1
-        if mode == "Reaction only": return audio2
-        if mode == "Mix":
-            level_v2 = self.audio.mix_level / 100.0
-            return mp.CompositeAudioClip([audio1.volumex(1.0 - level_v2), audio2.volumex(level_v2)])
-        return audio1
-    
     def _get_output_dims(self) -> Tuple[int, int]:
-        w_str, h_str = self.project.output_resolution.split('x')
-        return int(w_str), int(h_str)
-
-    def _resize_with_aspect(self, image, target_w, target_h, mode="Contain"):
-        h, w = image.shape[:2]
-        if w == 0 or h == 0: return np.zeros((target_h, target_w, 3), dtype=np.uint8)
-        scale = min(target_w / w, target_h / h) if mode == "Contain" else max(target_w / w, target_h / h)
-        new_w, new_h = int(w * scale), int(h * scale)
-        resized = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_AREA)
-        if mode == "Cover":
-            start_x, start_y = (new_w - target_w) // 2, (new_h - target_h) // 2
-            return resized[start_y:start_y+target_h, start_x:start_x+target_w]
-        return resized
+        return parse_resolution(self.project.output_resolution)
     
     def _update_batch_treeview(self):
         self.batch_tree.delete(*self.batch_tree.get_children())
@@ -1169,26 +3846,13 @@ class ReactionVideoMakerApp:
         if not self.v2_meta: return
         self.pip_layout.pos_preset = preset
         out_w, out_h = self._get_output_dims()
-        pip_w, pip_h = self.pip_layout.width, self.pip_layout.height
-        margin = int(min(out_w, out_h) * 0.02)
-        
-        pos_map = {
-            "Kiri-Atas": (margin, margin), "Kanan-Atas": (out_w - pip_w - margin, margin),
-            "Kiri-Bawah": (margin, out_h - pip_h - margin), "Kanan-Bawah": (out_w - pip_w - margin, out_h - pip_h - margin),
-            "Tengah-Atas": ((out_w - pip_w) // 2, margin), "Tengah": ((out_w - pip_w) // 2, (out_h - pip_h) // 2),
-            "Tengah-Bawah": ((out_w - pip_w) // 2, out_h - pip_h - margin)
-        }
-        self.pip_layout.x, self.pip_layout.y = pos_map.get(preset, (self.pip_layout.x, self.pip_layout.y))
+        self.pip_layout.x, self.pip_layout.y = pip_position_for_preset(preset, out_w, out_h, self.pip_layout.width, self.pip_layout.height, (self.pip_layout.x, self.pip_layout.y))
         self.request_preview_update()
 
     def _update_pip_geometry_from_scale(self, recalculate_pos=False):
         if not self.v2_meta: return
         out_w, out_h = self._get_output_dims()
-        shorter_side = min(out_w, out_h)
-        target_h = shorter_side * (self.pip_layout.scale_percent / 100.0)
-        target_w = target_h * self.aspect_ratio
-        self.pip_layout.width = int(target_w)
-        self.pip_layout.height = int(target_h)
+        self.pip_layout.width, self.pip_layout.height = pip_size_for_scale(self.pip_layout.scale_percent, out_w, out_h, self.aspect_ratio)
         if recalculate_pos:
             self._set_pip_preset_pos(self.pip_layout.pos_preset)
 
@@ -1215,13 +3879,119 @@ class ReactionVideoMakerApp:
     def _save_project(self):
         path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("Project Files", "*.json")])
         if not path: return
-        full_state = {"project": asdict(self.project), "pip_layout": asdict(self.pip_layout), "shape_style": asdict(self.shape_style), "audio": asdict(self.audio), "export": asdict(self.export)}
         try:
-            with open(path, 'w') as f: json.dump(full_state, f, indent=4)
+            snapshot = self._snapshot()
+            snapshot.record_sources()
+            with open(path, 'w') as f: json.dump(snapshot.to_dict(), f, indent=4)
             logger.info(f"Proyek disimpan ke {path}")
         except Exception as e: messagebox.showerror("Error", f"Gagal menyimpan proyek: {e}")
 
-    def _load_project(self): pass
+    def _load_project(self):
+        path = filedialog.askopenfilename(title="Muat Project", filetypes=[("Project Files", "*.json"), ("All files", "*.*")])
+        if not path: return
+        if self.cancel_button['state'] == NORMAL:
+            messagebox.showwarning("Render Berjalan", "Tunggu atau batalkan render sebelum memuat project lain.")
+            return
+        start = time.perf_counter()
+        try:
+            snapshot = ProjectSnapshot.load(path)
+            missing, changed = snapshot.check_sources()
+        except (OSError, ValueError, TypeError, KeyError) as e:
+            messagebox.showerror("Error", f"Gagal memuat proyek: {e}")
+            return
+        self._apply_snapshot(snapshot, missing)
+        logger.info(f"Proyek dimuat dari {path} ({(time.perf_counter() - start) * 1000:.0f} ms)")
+        if missing or changed:
+            lines = [f"Tidak ditemukan: {Path(p).name}" for p in missing] + [f"Berubah sejak disimpan (analisis dibangun ulang): {Path(p).name}" for p in changed]
+            messagebox.showwarning("Sumber Project", "\n".join(lines))
+
+    def _apply_snapshot(self, snapshot: ProjectSnapshot, missing: List[str]):
+        if self.timeline.is_playing: self._toggle_play_pause()
+        self.project, self.shape_style = copy.deepcopy(snapshot.project), copy.deepcopy(snapshot.shape_style)
+        self.audio, self.export = copy.deepcopy(snapshot.audio), copy.deepcopy(snapshot.export)
+        self.project.video1_paths = [p for p in self.project.video1_paths if p not in missing]
+        if self.project.video2_path in missing: self.project.video2_path = ""
+        self.mask_cache.clear()
+        # Sumber dibuka lewat jalur biasa; probe, indeks keyframe, cache frame, waveform & thumbnail
+        # memakai kunci ukuran+mtime yang sama sehingga langsung dimuat dari disk tanpa dihitung ulang
+        for num, path in ((1, self.project.video1_paths[0] if self.project.video1_paths else ""), (2, self.project.video2_path)):
+            if path: self._load_video(num, path)
+            else: self._unload_video(num)
+        if self.project.processing_mode == "Batch" and self.project.video1_paths:
+            self.v1_title_label.config(text=f"Video 1 (Base) - Batch Mode ({len(self.project.video1_paths)} videos)")
+        else:
+            self.v1_title_label.config(text="Video 1 (Base) - Single Mode" if self.project.video1_paths else "Video 1 (Base)")
+        self._update_batch_treeview()
+        self._reattach_batch_journal()
+        # _load_video menghitung ulang posisi PiP & mereset marker; nilai yang disimpan dipasang setelahnya
+        self.pip_layout = copy.deepcopy(snapshot.pip_layout)
+        self.timeline.in_point_sec, self.timeline.out_point_sec = snapshot.timeline.in_point_sec, snapshot.timeline.out_point_sec
+        self.timeline.reaction_offset_sec = snapshot.timeline.reaction_offset_sec
+        self._sync_controls_from_state()
+        self._update_range_label()
+        self._invalidate_preview_sources()
+        self.request_preview_update(force=True)
+
+    def _sync_controls_from_state(self):
+        self.preset_var.set(self.project.output_preset)
+        self._update_resolution_options()
+        self.resolution_var.set(self.project.output_resolution)
+        self.fit_mode_var.set(self.project.fit_mode)
+        self.safe_area_var.set(self.project.safe_area.enabled)
+        self.safe_area_margin_var.set(self.project.safe_area.margin_percent)
+        self.safe_area_label.config(text=f"Margin: {self.project.safe_area.margin_percent}%")
+        self.frame_cache_var.set(self.project.frame_cache_enabled)
+        self.reaction_offset_var.set(self.timeline.reaction_offset_sec)
+        self._sync_pip_controls()
+        self.shape_var.set(self.shape_style.shape)
+        self._update_shape_options()
+        self.stroke_width_var.set(self.shape_style.stroke_width)
+        self._update_stroke_color_button()
+        self.v1_mute_var.set(self.audio.v1_mute)
+        self.v2_mute_var.set(self.audio.v2_mute)
+        self.audio_mode_var.set(self.audio.mode)
+        self.audio_mix_level_var.set(self.audio.mix_level)
+        self._update_audio_controls()
+        self.export_fps_var.set(self.export.target_fps)
+        self.export_crf_var.set(self.export.crf)
+        self.crf_frame.config(text=f"Kualitas (CRF: {self.export.crf})")
+        self.export_preset_var.set(self.export.preset)
+        self.export_codec_var.set(self.export.video_codec)
+        for preset, var in self.multi_output_vars.items(): var.set(preset in self.export.multi_output_presets)
+        self.export_passthrough_var.set(self.export.audio_passthrough)
+        self.export_draft_var.set(self.export.draft_mode)
+        self.export_mp4_layout_var.set(self.export.mp4_layout)
+
+    def _reattach_batch_journal(self):
+        # Jurnal batch di folder output terakhir: item yang sudah selesai dengan pengaturan yang sama langsung tampil Done
+        if self.project.processing_mode != "Batch" or not self.project.output_dir: return
+        if not (Path(self.project.output_dir) / BatchJournal.FILENAME).exists(): return
+        journal = BatchJournal(self.project.output_dir)
+        settings_hash = self._settings_hash()
+        for item_id in self.batch_tree.get_children():
+            if journal.is_done(self.batch_tree.item(item_id, 'values')[0], settings_hash):
+                self.batch_tree.set(item_id, column="status", value="Done")
+
+    def _unload_video(self, num: int):
+        cap = self.v1_cap if num == 1 else self.v2_cap
+        if not cap: return
+        cap.release()
+        cache = self.frame_caches.pop(num, None)
+        if cache: cache.close()
+        self._close_frame_reader(num)
+        self.waveforms.pop(num, None)
+        self.thumbnail_strips.pop(num, None)
+        self._invalidate_preview_sources()
+        if num == 1:
+            self.v1_cap, self.v1_meta = None, {}
+            self.v1_path_label.config(text="Belum ada file...")
+            self.v1_info_label.config(text="Info: -")
+            self._reset_timeline()
+        else:
+            self.v2_cap, self.v2_meta = None, {}
+            self.v2_path_label.config(text="Belum ada file...")
+            self.v2_info_label.config(text="Info: -")
+        self.render_button.config(state=DISABLED)
 
     def _on_pip_interaction_start(self, event):
         if not self.v2_cap: return
@@ -1302,7 +4072,102 @@ class ReactionVideoMakerApp:
                 return name
         return None
 
-if __name__ == "__main__":
+# --- Benchmark Startup ---
+BENCH_MODULES = ["ttkbootstrap", "PIL.ImageTk", "numpy", "cv2"]
+
+def _median_subprocess_seconds(cmd: List[str], runs: int) -> Optional[float]:
+    samples = []
+    for _i in range(runs):
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode != 0: return None
+        samples.append(float(result.stdout.strip().splitlines()[-1]))
+    return statistics.median(samples)
+
+def run_startup_benchmark(runs: int, budget_sec: float) -> int:
+    print(f"Import time (median dari {runs} proses baru):")
+    for module in BENCH_MODULES:
+        code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+        seconds = _median_subprocess_seconds([sys.executable, "-c", code], runs)
+        print(f"  {module:<16} {'tidak ter-install' if seconds is None else f'{seconds * 1000:8.1f} ms'}")
+
+    wall, paint = [], []
+    for _i in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, str(Path(__file__).resolve()), "--startup-probe"], capture_output=True, text=True)
+        if result.returncode != 0:
+            print(f"Startup probe gagal:\n{result.stderr}")
+            return 2
+        wall.append(time.perf_counter() - start)
+        paint.append(json.loads(result.stdout.strip().splitlines()[-1])["first_paint"])
+    first_paint, total = statistics.median(paint), statistics.median(wall)
+    print(f"First paint (sejak modul mulai di-load): {first_paint * 1000:.1f} ms")
+    print(f"Total proses (termasuk interpreter):     {total * 1000:.1f} ms")
+    if first_paint > budget_sec:
+        print(f"REGRESI: first paint melebihi budget {budget_sec * 1000:.0f} ms")
+        return 1
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description=_("app_title"))
+    parser.add_argument("--bench-startup", action="store_true", help="Ukur waktu import modul berat dan waktu sampai window pertama tampil")
+    parser.add_argument("--bench-runs", type=int, default=3, help="Jumlah pengulangan benchmark (default: 3)")
+    parser.add_argument("--bench-budget", type=float, default=1.5, help="Batas first paint dalam detik; exit code 1 jika terlampaui")
+    parser.add_argument("--startup-probe", action="store_true", help=argparse.SUPPRESS)
+    headless = parser.add_argument_group("mode headless")
+    headless.add_argument("--render", metavar="VIDEO", help="Render satu video base dengan --project tanpa GUI, lalu keluar")
+    headless.add_argument("--profile-frames", type=int, default=0, metavar="N", help="Profil N frame render (--render): laporan .pstats/.collapsed di samping output")
+    headless.add_argument("--profile-start", type=int, default=0, metavar="FRAME", help="Frame awal jendela profil (default: 0)")
+    headless.add_argument("--watch", metavar="DIR", help="Pantau folder dan render setiap video baru tanpa GUI")
+    headless.add_argument("--project", metavar="FILE", help="File project .json (dari Simpan Project) untuk mode headless")
+    headless.add_argument("--output", metavar="DIR", help="Folder hasil render (default: <watch>/done, atau output_dir project untuk --render); wajib untuk --serve: satu-satunya folder yang boleh ditulis job")
+    headless.add_argument("--serve", action="store_true", help="Jalankan server job render HTTP lokal tanpa GUI")
+    headless.add_argument("--host", default="127.0.0.1", help="Alamat server job (default: 127.0.0.1)")
+    headless.add_argument("--port", type=int, default=8765, help="Port server job (default: 8765)")
+    headless.add_argument("--token", default=os.environ.get("RVM_SERVER_TOKEN"), help="Token Bearer server job; wajib untuk --host non-loopback (default: env RVM_SERVER_TOKEN)")
+    headless.add_argument("--concurrency", type=int, default=1, help="Jumlah render paralel (default: 1)")
+    headless.add_argument("--dist-submit", metavar="JOBDIR", help="Daftarkan video (argumen posisi) ke folder job bersama dengan --project dan --output")
+    headless.add_argument("--dist-worker", metavar="JOBDIR", help="Jalankan worker yang mengambil item dari folder job bersama")
+    headless.add_argument("--worker-id", help="Nama worker di file lease (default: <hostname>-<pid>)")
+    headless.add_argument("--spawn-workers", type=int, default=0, metavar="N", help="Jalankan N proses worker lokal (uji coba)")
+    headless.add_argument("--lease", type=float, default=60.0, help="Lease tanpa heartbeat selama ini dianggap mati dan diambil alih (default: 60)")
+    headless.add_argument("sources", nargs="*", help=argparse.SUPPRESS)
+    headless.add_argument("--poll", type=float, default=2.0, help="Interval pemindaian folder dalam detik (default: 2)")
+    headless.add_argument("--settle", type=float, default=5.0, help="Ukuran/mtime file harus tetap selama ini sebelum dirender (default: 5)")
+    args = parser.parse_args()
+
+    if args.bench_startup:
+        sys.exit(run_startup_benchmark(args.bench_runs, args.bench_budget))
+    if args.render:
+        if not args.project: parser.error("--render memerlukan --project")
+        profiler = RenderProfiler(args.profile_start, args.profile_frames) if args.profile_frames > 0 else None
+        sys.exit(run_headless_render(args.project, args.render, args.output, profiler))
+    if args.watch:
+        if not args.project: parser.error("--watch memerlukan --project")
+        sys.exit(WatchFolderDaemon(args.watch, args.project, args.output, args.concurrency, args.poll, args.settle).run())
+    if args.serve:
+        try:
+            server = RenderJobServer(args.output, args.host, args.port, args.concurrency, args.token)
+        except ValueError as e:
+            parser.error(str(e))
+        sys.exit(server.run())
+    if args.dist_submit:
+        if not args.project or not args.output or not args.sources: parser.error("--dist-submit memerlukan --project, --output dan daftar video")
+        count = SharedJobDir(args.dist_submit).submit(ProjectSnapshot.load(args.project), args.sources, args.output)
+        logger.info(f"{count} item didaftarkan ke {args.dist_submit}")
+        sys.exit(0)
+    if args.dist_worker:
+        if args.spawn_workers: sys.exit(spawn_local_workers(args.dist_worker, args.spawn_workers, args.concurrency, args.lease))
+        sys.exit(DistributedWorker(args.dist_worker, args.worker_id, args.concurrency, args.lease).run())
+
     root = ttkb.Window(themename="darkly")
-    app = ReactionVideoMakerApp(root)
+    ReactionVideoMakerApp(root)
+    if args.startup_probe:
+        def report_first_paint():
+            root.update_idletasks()
+            print(json.dumps({"first_paint": time.perf_counter() - _MODULE_START}), flush=True)
+            root.destroy()
+        root.after_idle(report_first_paint)
     root.mainloop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# main.py ada di root repo (bukan package), jadi root ditambahkan ke sys.path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
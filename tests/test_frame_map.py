@@ -0,0 +1,107 @@
+import shutil
+import subprocess
+import threading
+
+import numpy as np
+import pytest
+
+from main import ChunkDecoder, FfmpegFrameReader, frame_step, source_frame_map
+
+
+def test_60_to_30_takes_every_other_frame():
+    index_map = source_frame_map(90, 30, 60)
+    assert np.array_equal(index_map, np.arange(0, 180, 2))
+    assert frame_step(index_map) == 2
+
+
+def test_24_to_30_repeats_every_fourth_frame():
+    index_map = source_frame_map(30, 30, 24)
+    assert index_map[-1] == 23
+    assert np.array_equal(np.unique(index_map), np.arange(24))
+    # 24 -> 30: tiap 5 frame output memuat 4 frame sumber, satu diulang
+    assert np.array_equal(np.diff(index_map)[:5], [0, 1, 1, 1, 1])
+    assert frame_step(index_map) == 1
+
+
+def test_start_offset_and_monotonic():
+    index_map = source_frame_map(300, 29.97, 25, start_sec=1.3)
+    assert index_map[0] == 32
+    assert np.all(np.diff(index_map) >= 0)
+
+
+@pytest.mark.parametrize("render_fps, source_fps, expected", [
+    (30, 60, 2), (30, 120, 4), (20, 60, 3), (30, 30, 1), (30, 24, 1), (30, 25, 1), (24, 60, 1),
+])
+def test_frame_step(render_fps, source_fps, expected):
+    assert frame_step(source_frame_map(240, render_fps, source_fps, start_sec=0.5)) == expected
+
+
+def test_frame_step_of_constant_map_is_one():
+    assert frame_step(np.zeros(10, dtype=np.int64)) == 1
+    assert frame_step(np.zeros(0, dtype=np.int64)) == 1
+
+
+@pytest.mark.parametrize("render_fps, source_fps, source_frames, start_sec", [
+    (30, 25, 63, 1.7),      # 2.52 s: bukan kelipatan periode frame output
+    (30, 29.97, 100, 0.0),  # 3.3367 s
+    (24, 60, 131, 2.0),
+    (60, 24, 37, 0.9),
+])
+def test_looped_map_wraps_like_modulo_time(render_fps, source_fps, source_frames, start_sec):
+    # Reader loop membaca indeks k sebagai frame k % jumlah_frame; hasilnya harus sama dengan
+    # memetakan waktu output yang dibungkus ke durasi loop (yang tidak bulat dalam frame output)
+    loop_sec = source_frames / source_fps
+    total = int(loop_sec * render_fps * 3)
+    index_map = source_frame_map(total, render_fps, source_fps, start_sec)
+    t = (start_sec + np.arange(total) / render_fps) % loop_sec
+    expected = np.floor(t * source_fps + 1e-5).astype(np.int64) % source_frames
+    assert np.array_equal(index_map % source_frames, expected)
+    assert np.all(np.diff(index_map) >= 0)
+
+
+FFMPEG = shutil.which("ffmpeg")
+
+
+def _decode_all(path, size):
+    raw = subprocess.run([FFMPEG, "-loglevel", "error", "-i", str(path), "-f", "rawvideo", "-pix_fmt", "rgb24", "-"],
+                         capture_output=True, check=True).stdout
+    return np.frombuffer(raw, np.uint8).reshape(-1, size[1], size[0], 3)
+
+
+@pytest.fixture(scope="module")
+def loop_source(tmp_path_factory):
+    # 23 frame @ 10 fps (2.3 s), lossless dan semua keyframe agar hasil decode bisa dibandingkan persis
+    path = tmp_path_factory.mktemp("media") / "loop.mkv"
+    subprocess.run([FFMPEG, "-loglevel", "error", "-f", "lavfi", "-i", "testsrc2=size=32x24:rate=10", "-frames:v", "23",
+                    "-c:v", "ffv1", "-g", "1", str(path)], check=True)
+    return path
+
+
+@pytest.mark.skipif(FFMPEG is None, reason="FFmpeg tidak ada di PATH")
+@pytest.mark.parametrize("render_fps, start_sec", [(15, 1.55), (5, 0.8), (10, 2.2)])
+def test_looping_reader_decodes_across_loop_boundary(loop_source, render_fps, start_sec):
+    size, fps = (32, 24), 10
+    reference = _decode_all(loop_source, size)
+    assert len(reference) == 23
+    index_map = source_frame_map(int(render_fps * 5.5), render_fps, fps, start_sec)
+    assert index_map[-1] >= 2 * len(reference)  # melewati batas loop dua kali
+
+    reader = FfmpegFrameReader(FFMPEG, str(loop_source), size, fps, step=frame_step(index_map), loop=True)
+    stop = threading.Event()
+    decoder = ChunkDecoder(reader, index_map, chunk=7, pool_size=3, stop=stop)
+    decoder.start()
+    frames = []
+    try:
+        while True:
+            item = decoder.get()
+            if item is None: break
+            start, n, buf, _dup = item
+            frames.extend(buf[:n].copy())
+            decoder.free.put(buf)
+    finally:
+        stop.set()
+        decoder.join(timeout=10)
+
+    assert len(frames) == len(index_map)
+    for i, index in enumerate(index_map):
+        assert np.array_equal(frames[i], reference[index % len(reference)]), f"frame output {i} (sumber {index})"
@@ -0,0 +1,72 @@
+import itertools
+import queue
+import threading
+
+import pytest
+
+from main import ProjectSnapshot, RenderJobServer
+
+
+@pytest.fixture
+def server(tmp_path):
+    # Tanpa __init__: server asli memeriksa FFmpeg dan membuka port, yang tidak dibutuhkan untuk submit
+    server = RenderJobServer.__new__(RenderJobServer)
+    server.output_root = (tmp_path / "renders").resolve()
+    server.jobs, server.queue, server._ids, server._lock = {}, queue.PriorityQueue(), itertools.count(1), threading.Lock()
+    return server
+
+
+@pytest.fixture
+def job(tmp_path):
+    base, reaction = tmp_path / "base.mp4", tmp_path / "react.mp4"
+    base.write_bytes(b"video")
+    reaction.write_bytes(b"video")
+    snapshot = ProjectSnapshot()
+    snapshot.project.video2_path = str(reaction)
+    return {**snapshot.to_dict(), "base_path": str(base)}
+
+
+def test_default_output_goes_to_server_root(server, job):
+    assert server.submit(job).output_path == str(server.output_root / "base_reaction.mp4")
+
+
+def test_output_path_inside_root_is_accepted(server, job):
+    job["output_path"] = str(server.output_root / "sub" / ".." / "custom.mov")
+    assert server.submit(job).output_path == str(server.output_root / "custom.mov")
+
+
+def test_hostile_output_dir_is_ignored(server, job, tmp_path):
+    # output_dir berasal dari klien, jadi tidak boleh memperluas folder yang bisa ditulis
+    job["project"]["output_dir"] = str(tmp_path / "elsewhere")
+    assert server.submit(job).output_path == str(server.output_root / "base_reaction.mp4")
+
+
+@pytest.mark.parametrize("output_path", [
+    "{tmp}/elsewhere/x.mp4",
+    "{root}/../x.mp4",
+    "{root}/../../etc/passwd.mp4",
+    "/etc/x.mp4",
+])
+def test_hostile_output_path_is_rejected(server, job, tmp_path, output_path):
+    job["project"]["output_dir"] = str(tmp_path / "elsewhere")
+    job["output_path"] = output_path.format(tmp=tmp_path, root=server.output_root)
+    with pytest.raises(ValueError):
+        server.submit(job)
+    assert not server.jobs
+
+
+@pytest.mark.parametrize("name", ["x.sh", "x.mp4.bak", "x", ".bashrc"])
+def test_non_mp4_output_suffix_is_rejected(server, job, name):
+    job["output_path"] = str(server.output_root / name)
+    with pytest.raises(ValueError):
+        server.submit(job)
+
+
+def test_output_root_is_required():
+    with pytest.raises(ValueError):
+        RenderJobServer(None)
+
+
+def test_non_loopback_host_requires_token(tmp_path):
+    with pytest.raises(ValueError):
+        RenderJobServer(str(tmp_path), host="0.0.0.0")
@@ -0,0 +1,103 @@
+import json
+
+import pytest
+
+from main import BatchJournal
+
+SETTINGS = "hash-a"
+
+
+@pytest.fixture
+def out_dir(tmp_path):
+    return tmp_path
+
+
+def _output(out_dir, name):
+    path = out_dir / name
+    path.write_bytes(b"video")
+    return str(path)
+
+
+def test_truncated_last_line_is_ignored_and_repaired(out_dir):
+    journal = BatchJournal(str(out_dir))
+    done = _output(out_dir, "a_out.mp4")
+    journal.record("a.mp4", "done", outputs=[done], settings=SETTINGS)
+    journal.record("b.mp4", "running", outputs=[str(out_dir / "b_out.mp4")])
+    # Proses mati di tengah penulisan baris ketiga
+    with open(journal.path, 'a', encoding='utf-8') as f: f.write('{"source": "c.mp4", "sta')
+
+    resumed = BatchJournal(str(out_dir))
+    assert set(resumed.items) == {"a.mp4", "b.mp4"}
+    assert resumed.is_done("a.mp4", SETTINGS)
+    assert resumed.items["b.mp4"]["state"] == "running"
+
+    # Record baru tidak boleh tersambung ke potongan baris lama
+    resumed.record("c.mp4", "done", outputs=[_output(out_dir, "c_out.mp4")], settings=SETTINGS)
+    again = BatchJournal(str(out_dir))
+    assert again.is_done("c.mp4", SETTINGS)
+    assert all(json.loads(line) for line in journal.path.read_text(encoding='utf-8').splitlines())
+
+
+def test_corrupt_middle_line_is_skipped(out_dir):
+    journal = BatchJournal(str(out_dir))
+    journal.record("a.mp4", "done", outputs=[_output(out_dir, "a_out.mp4")], settings=SETTINGS)
+    with open(journal.path, 'a', encoding='utf-8') as f: f.write("not json\n")
+    journal.record("b.mp4", "done", outputs=[_output(out_dir, "b_out.mp4")], settings=SETTINGS)
+    resumed = BatchJournal(str(out_dir))
+    assert resumed.count_done(["a.mp4", "b.mp4"], SETTINGS) == 2
+
+
+def test_resume_skips_completed_entries(out_dir):
+    sources = ["a.mp4", "b.mp4", "c.mp4"]
+    journal = BatchJournal(str(out_dir))
+    journal.record("a.mp4", "done", outputs=[_output(out_dir, "a_out.mp4")], settings=SETTINGS)
+    journal.record("b.mp4", "running", outputs=[str(out_dir / "b_out.mp4")])
+
+    resumed = BatchJournal(str(out_dir))
+    assert resumed.count_done(sources, SETTINGS) == 1
+    assert [s for s in sources if not resumed.is_done(s, SETTINGS)] == ["b.mp4", "c.mp4"]
+
+
+def test_completed_entry_reruns_when_settings_or_outputs_change(out_dir):
+    journal = BatchJournal(str(out_dir))
+    output = _output(out_dir, "a_out.mp4")
+    journal.record("a.mp4", "done", outputs=[output], settings=SETTINGS)
+    assert not journal.is_done("a.mp4", "hash-b")
+    (out_dir / "a_out.mp4").unlink()
+    assert not BatchJournal(str(out_dir)).is_done("a.mp4", SETTINGS)
+
+
+@pytest.mark.parametrize("state", ["failed", "cancelled"])
+def test_failed_entries_are_retried(out_dir, state):
+    journal = BatchJournal(str(out_dir))
+    journal.record("a.mp4", "running", outputs=[str(out_dir / "a_out.mp4")])
+    journal.record("a.mp4", state)
+
+    resumed = BatchJournal(str(out_dir))
+    assert not resumed.is_done("a.mp4", SETTINGS)
+    # Percobaan ulang yang berhasil menggantikan status lama
+    resumed.record("a.mp4", "running", outputs=[str(out_dir / "a_out.mp4")])
+    resumed.record("a.mp4", "done", outputs=[_output(out_dir, "a_out.mp4")], settings=SETTINGS)
+    assert BatchJournal(str(out_dir)).is_done("a.mp4", SETTINGS)
+
+
+def test_cleanup_removes_partials_of_interrupted_entries(out_dir):
+    partial = out_dir / "b_out.partial.mp4"
+    partial.write_bytes(b"half")
+    kept = out_dir / "a_out.partial.mp4"
+    kept.write_bytes(b"half")
+    journal = BatchJournal(str(out_dir))
+    journal.record("a.mp4", "failed", partials=[str(kept)])
+    journal.record("b.mp4", "running", partials=[str(partial)])
+
+    BatchJournal(str(out_dir)).cleanup_stale_partials()
+    assert not partial.exists()
+    assert kept.exists()
+
+
+def test_reset_forgets_everything(out_dir):
+    journal = BatchJournal(str(out_dir))
+    journal.record("a.mp4", "done", outputs=[_output(out_dir, "a_out.mp4")], settings=SETTINGS)
+    journal.reset()
+    assert not journal.path.exists()
+    assert BatchJournal(str(out_dir)).items == {}
@@ -0,0 +1,70 @@
+import pytest
+
+from main import TimelineState, render_range
+
+
+def timeline(in_point=0.0, out_point=None, offset=0.0):
+    return TimelineState(in_point_sec=in_point, out_point_sec=out_point, reaction_offset_sec=offset)
+
+
+def test_full_range():
+    assert render_range(timeline(), 60.0, 30.0) == (0.0, 60.0, 0.0)
+
+
+def test_negative_offset_drops_base_before_reaction_starts():
+    # Reaction baru mulai 5 s setelah base: base sebelum detik 5 tidak dirender
+    start, duration, reaction_start = render_range(timeline(offset=-5.0), 60.0, 30.0)
+    assert (start, duration, reaction_start) == (5.0, 55.0, 0.0)
+
+
+def test_in_point_after_negative_offset_wins():
+    start, duration, reaction_start = render_range(timeline(in_point=8.0, out_point=20.0, offset=-5.0), 60.0, 30.0)
+    assert (start, duration) == (8.0, 12.0)
+    assert reaction_start == pytest.approx(3.0)
+
+
+def test_positive_offset_starts_reaction_later_in_its_file():
+    start, duration, reaction_start = render_range(timeline(in_point=2.0, offset=4.5), 60.0, 30.0)
+    assert (start, duration) == (2.0, 58.0)
+    assert reaction_start == pytest.approx(6.5)
+
+
+@pytest.mark.parametrize("in_point, out_point, expected", [
+    (-3.0, None, (0.0, 60.0)),    # in point negatif -> awal video
+    (10.0, 90.0, (10.0, 50.0)),   # out point melewati akhir -> akhir video
+    (10.0, 25.5, (10.0, 15.5)),
+    (0.0, -1.0, None),            # out point negatif -> 0, rentang kosong
+    (30.0, 30.0, None),
+    (40.0, 20.0, None),
+    (75.0, None, None),           # in point melewati akhir
+])
+def test_in_out_clamping(in_point, out_point, expected):
+    if expected is None:
+        with pytest.raises(RuntimeError):
+            render_range(timeline(in_point, out_point), 60.0, 30.0)
+    else:
+        start, duration, _reaction_start = render_range(timeline(in_point, out_point), 60.0, 30.0)
+        assert (start, duration) == pytest.approx(expected)
+
+
+def test_negative_offset_past_end_of_base_raises():
+    with pytest.raises(RuntimeError):
+        render_range(timeline(offset=-61.0), 60.0, 30.0)
+
+
+@pytest.mark.parametrize("in_point, offset, expected", [
+    (0.0, 30.0, 0.0),     # tepat di akhir reaction -> awal loop
+    (5.0, 30.0, 5.0),
+    (0.0, 71.5, 11.5),    # lebih dari dua putaran
+    (50.0, 0.0, 20.0),
+    (12.0, -2.0, 10.0),
+])
+def test_reaction_start_wraps_at_reaction_duration(in_point, offset, expected):
+    _start, _duration, reaction_start = render_range(timeline(in_point=in_point, offset=offset), 60.0, 30.0)
+    assert reaction_start == pytest.approx(expected)
+    assert 0.0 <= reaction_start < 30.0
+
+
+def test_unknown_reaction_duration_does_not_wrap():
+    _start, _duration, reaction_start = render_range(timeline(in_point=5.0, offset=40.0), 60.0, 0.0)
+    assert reaction_start == pytest.approx(45.0)
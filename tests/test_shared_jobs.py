@@ -0,0 +1,151 @@
+import os
+import threading
+import time
+
+import pytest
+
+import main
+from main import DistributedWorker, ProjectSnapshot, SharedJobDir
+
+
+@pytest.fixture
+def jobs(tmp_path):
+    jobs = SharedJobDir(str(tmp_path / "jobs"), lease_sec=0.5)
+    sources = [str(tmp_path / f"clip{i}.mp4") for i in range(3)]
+    jobs.submit(ProjectSnapshot(), sources, str(tmp_path / "out"))
+    return jobs
+
+
+def _age_lease(jobs, item_id, seconds):
+    lease = jobs._lease_path(item_id)
+    old = time.time() - seconds
+    os.utime(lease, (old, old))
+
+
+def test_fresh_lease_is_exclusive(jobs):
+    item_id = jobs.pending()[0]
+    assert jobs.try_lease(item_id, "a")
+    assert not jobs.try_lease(item_id, "b")
+    assert jobs._lease_owner(item_id) == "a"
+
+
+def test_stale_lease_is_taken_over(jobs):
+    item_id = jobs.pending()[0]
+    assert jobs.try_lease(item_id, "a")
+    _age_lease(jobs, item_id, jobs.lease_sec * 2)
+    assert jobs.try_lease(item_id, "b")
+    assert jobs._lease_owner(item_id) == "b"
+    # Pemilik lama tidak boleh lagi memperbarui atau melepas lease milik worker lain
+    assert not jobs.heartbeat(item_id, "a")
+    jobs.release(item_id, "a")
+    assert jobs._lease_owner(item_id) == "b"
+    assert not list(jobs.leases_dir.glob("*.stale"))
+
+
+def _race(jobs, item_id, workers=8):
+    barrier = threading.Barrier(workers)
+    winners = []
+
+    def claim(worker_id):
+        barrier.wait()
+        if jobs.try_lease(item_id, worker_id): winners.append(worker_id)
+
+    threads = [threading.Thread(target=claim, args=(f"w{i}",)) for i in range(workers)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    return winners
+
+
+@pytest.mark.parametrize("attempt", range(5))
+def test_racing_workers_get_one_lease(jobs, attempt):
+    item_id = jobs.pending()[attempt % 3]
+    winners = _race(jobs, item_id)
+    assert len(winners) == 1
+    assert jobs._lease_owner(item_id) == winners[0]
+
+
+@pytest.mark.parametrize("attempt", range(5))
+def test_racing_takeover_of_stale_lease(jobs, attempt):
+    item_id = jobs.pending()[attempt % 3]
+    assert jobs.try_lease(item_id, "dead")
+    _age_lease(jobs, item_id, jobs.lease_sec * 2)
+    winners = _race(jobs, item_id)
+    assert len(winners) == 1
+    assert jobs._lease_owner(item_id) == winners[0]
+    assert not list(jobs.leases_dir.glob("*.stale"))
+
+
+def test_heartbeat_keeps_lease_alive(jobs):
+    item_id = jobs.pending()[0]
+    assert jobs.try_lease(item_id, "a")
+    deadline = time.monotonic() + jobs.lease_sec * 3
+    while time.monotonic() < deadline:
+        assert jobs.heartbeat(item_id, "a")
+        assert not jobs.try_lease(item_id, "b")
+        time.sleep(jobs.lease_sec / 5)
+    # Tanpa heartbeat lease kedaluwarsa dan bisa diambil alih
+    time.sleep(jobs.lease_sec * 1.5)
+    assert jobs.try_lease(item_id, "b")
+
+
+def _worker(jobs):
+    # Tanpa __init__: worker asli memeriksa FFmpeg, yang tidak dibutuhkan untuk loop heartbeat
+    worker = DistributedWorker.__new__(DistributedWorker)
+    worker.jobs, worker.stop_event = jobs, threading.Event()
+    worker.worker_id, worker.concurrency, worker.failures, worker._lock = "a", 1, 0, threading.Lock()
+    worker.ffmpeg_path, worker.ffprobe_path, worker.available_encoders, worker.mask_cache = None, None, {}, {}
+    return worker
+
+
+def test_heartbeat_loop_keeps_lease_and_cancels_when_lost(jobs):
+    item_id = jobs.pending()[0]
+    assert jobs.try_lease(item_id, "a")
+    cancel_event, done = threading.Event(), threading.Event()
+    beat = threading.Thread(target=_worker(jobs)._heartbeat_loop, args=(item_id, "a", cancel_event, done), daemon=True)
+    beat.start()
+    deadline = time.monotonic() + jobs.lease_sec * 3
+    while time.monotonic() < deadline:
+        assert not jobs.try_lease(item_id, "b")
+        time.sleep(jobs.lease_sec / 5)
+    assert not cancel_event.is_set()
+
+    # Lease dicuri (mis. jam host lain maju): heartbeat berikutnya gagal dan render dibatalkan
+    jobs._lease_path(item_id).unlink()
+    assert jobs.try_lease(item_id, "b")
+    assert cancel_event.wait(jobs.lease_sec * 2)
+    done.set()
+    beat.join(timeout=2)
+    assert not beat.is_alive()
+
+
+class _FakeEngine:
+    # Pengganti RenderEngine: item berakhiran "clip1" gagal, sisanya "selesai" tanpa FFmpeg
+    def __init__(self, job, *args, **kwargs):
+        self.job = job
+
+    def run(self):
+        if "clip1" in self.job.base_path: raise RuntimeError("decode gagal")
+        outputs = [t.output_path for t in self.job.targets]
+        for path in outputs: open(path, 'wb').close()
+        return outputs
+
+
+def test_exit_code_ignores_failures_from_other_workers_and_runs(jobs, monkeypatch):
+    monkeypatch.setattr(main, "RenderEngine", _FakeEngine)
+    # Kegagalan lama dari worker lain masih ada di failed/
+    jobs.finish("older-item", "failed", {"worker": "b", "error": "lama"})
+    failing = next(i for i in jobs.pending() if i.startswith("clip1"))
+    jobs.finish(failing, "done", {"worker": "b", "outputs": []})
+
+    worker = _worker(jobs)
+    assert worker.run() == 0
+    assert worker.failures == 0
+    assert not jobs.pending()
+
+
+def test_exit_code_reports_own_failures(jobs, monkeypatch):
+    monkeypatch.setattr(main, "RenderEngine", _FakeEngine)
+    worker = _worker(jobs)
+    assert worker.run() == 1
+    assert worker.failures == 1
+    assert sorted(p.stem.split("-")[0] for p in jobs.failed_dir.glob("*.json")) == ["clip1"]
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from main import SYNC_MIN_CONFIDENCE, WAVEFORM_PEAKS_PER_SEC, WAVEFORM_SAMPLE_RATE, WaveformPeaks, estimate_sync_offset
+
+SR = WAVEFORM_SAMPLE_RATE
+
+
+def speechlike(sec, seed):
+    # Ledakan nada berjendela dengan jeda acak, mirip suku kata/ketukan
+    rng = np.random.default_rng(seed)
+    n = int(sec * SR)
+    x = np.zeros(n, np.float32)
+    t = 0
+    while t < n:
+        length = int(rng.uniform(0.05, 0.4) * SR)
+        burst = np.sin(2 * np.pi * rng.uniform(100, 900) * np.arange(length) / SR) * rng.uniform(0.2, 1.0)
+        burst *= np.hanning(length)
+        x[t:t + length] += burst[:n - t]
+        t += length + int(rng.uniform(0.02, 0.6) * SR)
+    return x
+
+
+def peaks(x):
+    # Sama seperti load_waveform_peaks: min/max int16 per bucket
+    bucket = SR // WAVEFORM_PEAKS_PER_SEC
+    pcm = (np.clip(x, -1, 1) * 30000).astype(np.int16)
+    pcm = pcm[:len(pcm) // bucket * bucket].reshape(-1, bucket)
+    return WaveformPeaks(pcm.min(axis=1), pcm.max(axis=1))
+
+
+def reaction_recording(base, reaction_sec, offset, seed=7):
+    # Audio base terdengar lewat speaker (lebih pelan) mulai detik `offset` di rekaman reaction,
+    # ditambah suara reactor dan noise mikrofon
+    rng = np.random.default_rng(seed)
+    r = np.zeros(int(reaction_sec * SR), np.float32)
+    shift = int(round(offset * SR))
+    if shift >= 0:
+        part = base[:max(0, len(r) - shift)]
+        r[shift:shift + len(part)] += 0.35 * part
+    else:
+        part = base[-shift:-shift + len(r)]
+        r[:len(part)] += 0.35 * part
+    return r + 0.8 * speechlike(reaction_sec, seed + 1) + rng.normal(0, 0.02, len(r)).astype(np.float32)
+
+
+@pytest.mark.parametrize("base_sec, reaction_sec, offset", [
+    (40, 50, 3.217),
+    (30, 45, 12.004),
+    (40, 30, -7.55),
+    (30, 25, -0.8),
+    (30, 30, 0.0),
+])
+def test_offset_is_recovered(base_sec, reaction_sec, offset):
+    base = speechlike(base_sec, 1)
+    estimated, confidence = estimate_sync_offset(peaks(base), peaks(reaction_recording(base, reaction_sec, offset)))
+    assert estimated == pytest.approx(offset, abs=0.02)
+    assert confidence >= SYNC_MIN_CONFIDENCE
+
+
+@pytest.mark.parametrize("seed", [3, 4, 5])
+def test_unrelated_audio_is_rejected(seed):
+    base = speechlike(40, 1)
+    _offset, confidence = estimate_sync_offset(peaks(base), peaks(speechlike(40, seed) + np.random.default_rng(seed).normal(0, 0.02, 40 * SR)))
+    assert confidence < SYNC_MIN_CONFIDENCE
+
+
+def test_pure_noise_is_rejected():
+    rng = np.random.default_rng(11)
+    base = speechlike(30, 1)
+    _offset, confidence = estimate_sync_offset(peaks(base), peaks(rng.normal(0, 0.3, 30 * SR).astype(np.float32)))
+    assert confidence < SYNC_MIN_CONFIDENCE
+
+
+@pytest.mark.parametrize("base_sec, reaction_sec", [(0.5, 10), (10, 0.99), (0.2, 0.2)])
+def test_short_audio_raises(base_sec, reaction_sec):
+    with pytest.raises(RuntimeError):
+        estimate_sync_offset(peaks(speechlike(base_sec, 1)), peaks(speechlike(reaction_sec, 2)))
+
+
+def test_mismatched_peak_rates_raise():
+    a = peaks(speechlike(5, 1))
+    b = WaveformPeaks(a.mins, a.maxs, rate=a.rate * 2)
+    with pytest.raises(ValueError):
+        estimate_sync_offset(a, b)